@@ -0,0 +1,348 @@
+"""
+Approximate nearest-neighbor (IVF) index over GNN embeddings for interactive gene queries.
+
+The unit-normalized embeddings are clustered by spherical k-means into about 4 sqrt(N) inverted
+lists, and stored grouped by list, so the cosine top-k of a query only scores the members of
+the nprobe lists whose centroids are closest to it: a few hundred inner products instead of a
+pass over all N genes, let alone the N x N similarity matrix. The default nprobe is calibrated
+at build time as the smallest value whose recall@k against the exact blocked search reaches
+a target on a sample of genes. Indexes are saved next to the embeddings of an EmbeddingStore
+entry and rebuilt when the stored embeddings change.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from embedding_store import EmbeddingStore
+from link_prediction import normalize_embeddings
+
+DEFAULT_RECALL = 0.95 # recall@k the default nprobe is calibrated to
+
+
+def embeddings_hash(embeddings: np.ndarray) -> str:
+    """Content hash of an embedding matrix (float32 bytes)"""
+    return hashlib.sha256(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes()).hexdigest()
+
+
+def _top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    # k best columns of every row, best first
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((len(scores), 0), dtype=np.intp), np.empty((len(scores), 0), dtype=scores.dtype)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def _assign(z: np.ndarray, centroids: np.ndarray, block_size: int = 4096) -> np.ndarray:
+    # closest centroid (largest inner product) of every row, in row blocks
+    return np.concatenate([np.argmax(z[start:start + block_size] @ centroids.T, axis=1)
+                           for start in range(0, len(z), block_size)] + [np.empty(0, dtype=np.intp)])
+
+
+def spherical_kmeans(z: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Unit-norm centroids of k clusters of unit vectors (k-means on cosine similarity)
+    --------------------------
+    Args:
+        z (np.ndarray): N x D unit-norm rows.
+        k (int): Number of clusters (<= N).
+        iterations (int): Maximum number of Lloyd iterations.
+        seed (int): Seed of the initial centroids and of the re-seeding of empty clusters.
+    Returns:
+        np.ndarray: k x D float32 centroids
+    """
+    rng = np.random.default_rng(seed)
+    centroids = z[rng.choice(len(z), k, replace=False)].copy()
+    labels = None
+    for _ in range(iterations):
+        updated = _assign(z, centroids)
+        if labels is not None and np.array_equal(updated, labels):
+            break
+        labels = updated
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, z)
+        empty = np.flatnonzero(np.bincount(labels, minlength=k) == 0)
+        sums[empty] = z[rng.choice(len(z), len(empty), replace=False)] # re-seed empty clusters
+        centroids = normalize_embeddings(sums)
+    return centroids
+
+
+class IVFIndex:
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        ids: np.ndarray,
+        vectors: np.ndarray,
+        names: np.ndarray = None,
+        nprobe: int = 8
+    ):
+        """
+        Inverted-file index over unit-norm embeddings (use build() or load())
+        --------------------------
+        Args:
+            centroids (np.ndarray): L x D unit-norm list centroids.
+            offsets (np.ndarray): L + 1 offsets of the lists in ids / vectors.
+            ids (np.ndarray): Node index of every stored vector, grouped by list.
+            vectors (np.ndarray): N x D unit-norm embeddings in the order of ids.
+            names (np.ndarray): Gene name of every node index (0..N-1 if None).
+            nprobe (int): Number of lists scanned per query by default.
+        """
+        self.centroids = centroids
+        self.offsets = offsets
+        self.ids = ids
+        self.vectors = vectors
+        self.num_nodes = len(ids)
+        self.names = np.asarray(names, dtype=object) if names is not None else np.arange(self.num_nodes).astype(str).astype(object)
+        self.nprobe = nprobe
+        self.metadata = dict()
+        self.positions = np.empty(self.num_nodes, dtype=np.int64) # stored row of every node
+        self.positions[ids] = np.arange(self.num_nodes)
+        self._name2idx = None
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        names: list[str] = None,
+        nlist: int = None,
+        iterations: int = 20,
+        train_size: int = 256,
+        seed: int = 0,
+        target_recall: float = DEFAULT_RECALL,
+        k: int = 10
+    ) -> 'IVFIndex':
+        """
+        Cluster the embeddings into inverted lists and calibrate the default nprobe
+        --------------------------
+        Args:
+            embeddings (np.ndarray): N x D embedding matrix (may be a np.memmap).
+            names (list[str]): Gene name of every row.
+            nlist (int): Number of inverted lists (default: about 4 sqrt(N)).
+            iterations (int): Maximum number of k-means iterations.
+            train_size (int): k-means is trained on at most train_size points per list.
+            seed (int): Seed of the training sample, k-means and calibration queries.
+            target_recall (float): Recall@k the default nprobe reaches (no calibration if None).
+            k (int): Number of neighbors the calibration measures recall at.
+        Returns:
+            IVFIndex: Index over the embeddings
+        """
+        z = normalize_embeddings(embeddings)
+        n = len(z)
+        nlist = max(1, min(n, nlist or int(round(4 * np.sqrt(n)))))
+        rng = np.random.default_rng(seed)
+        sample = z[np.sort(rng.choice(n, min(n, train_size * nlist), replace=False))]
+        centroids = spherical_kmeans(sample, nlist, iterations, seed)
+        labels = _assign(z, centroids)
+        ids = np.argsort(labels, kind='stable')
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+        index = cls(centroids, offsets, ids.astype(np.int64), z[ids], names)
+        if target_recall is not None:
+            index.nprobe = index.calibrate(target_recall, k, seed=seed)
+        return index
+
+    def save(self, path: str | os.PathLike, **metadata):
+        """Write the index (and JSON-serializable metadata) to a .npz file"""
+        path = Path(path)
+        tmp = path.with_name(path.stem + '.tmp.npz')
+        np.savez(tmp, centroids=self.centroids, offsets=self.offsets, ids=self.ids, vectors=self.vectors,
+                 names=self.names.astype(str), nprobe=self.nprobe, metadata=json.dumps(metadata))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> 'IVFIndex':
+        """Read an index written by save(), its metadata in .metadata"""
+        with np.load(path) as data:
+            index = cls(data['centroids'], data['offsets'], data['ids'], data['vectors'],
+                        data['names'].astype(object), int(data['nprobe']))
+            index.metadata = json.loads(str(data['metadata']))
+        return index
+
+    @property
+    def nlist(self) -> int:
+        """Number of inverted lists"""
+        return len(self.centroids)
+
+    def index_of(self, gene) -> int:
+        """Node index of a gene name (integers are returned unchanged)"""
+        if isinstance(gene, (int, np.integer)):
+            return int(gene)
+        if self._name2idx is None:
+            self._name2idx = {name: idx for idx, name in enumerate(self.names)}
+        return self._name2idx[gene]
+
+    def vector(self, node: int) -> np.ndarray:
+        """Unit-norm embedding of a node index"""
+        return self.vectors[self.positions[node]]
+
+    def _candidates(self, lists: np.ndarray) -> np.ndarray:
+        starts, stops = self.offsets[lists], self.offsets[lists + 1]
+        lengths = stops - starts
+        # stored rows of all members of the lists, without a Python loop over the lists
+        return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    def search(self, queries: np.ndarray, k: int = 10, nprobe: int = None, exclude: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate cosine top-k of query vectors
+        --------------------------
+        Args:
+            queries (np.ndarray): Q x D query embeddings (or a single D vector).
+            k (int): Number of neighbors per query.
+            nprobe (int): Number of lists scanned per query (index default if None).
+            exclude (np.ndarray): Node index left out of every query's result (e.g. the query
+                gene itself), -1 for none.
+        Returns:
+            tuple: (Q x k int64 node indices, Q x k float32 similarities), best first, padded
+                with -1 / -inf when the scanned lists hold fewer than k nodes
+        """
+        q = normalize_embeddings(np.atleast_2d(queries))
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        exclude = np.full(len(q), -1) if exclude is None else np.asarray(exclude)
+        probed = _top_k(q @ self.centroids.T, nprobe)[0]
+        indices = np.full((len(q), k), -1, dtype=np.int64)
+        scores = np.full((len(q), k), -np.inf, dtype=np.float32)
+        for i in range(len(q)):
+            rows = self._candidates(probed[i])
+            ids = self.ids[rows]
+            similarity = self.vectors[rows] @ q[i]
+            similarity[ids == exclude[i]] = -np.inf
+            top, top_scores = _top_k(similarity[None, :], k)
+            found = np.isfinite(top_scores[0])
+            indices[i, :found.sum()] = ids[top[0][found]]
+            scores[i, :found.sum()] = top_scores[0][found]
+        return indices, scores
+
+    def exact_search(self, queries: np.ndarray, k: int = 10, exclude: np.ndarray = None, block_size: int = 512) -> tuple[np.ndarray, np.ndarray]:
+        """Exact cosine top-k over all nodes, one block of queries at a time (same output as search)"""
+        q = normalize_embeddings(np.atleast_2d(queries))
+        exclude = np.full(len(q), -1) if exclude is None else np.asarray(exclude)
+        k = min(k, self.num_nodes)
+        indices = np.empty((len(q), k), dtype=np.int64)
+        scores = np.empty((len(q), k), dtype=np.float32)
+        for start in range(0, len(q), block_size):
+            stop = min(start + block_size, len(q))
+            similarity = q[start:stop] @ self.vectors.T
+            excluded = exclude[start:stop]
+            rows = np.flatnonzero(excluded >= 0)
+            similarity[rows, self.positions[excluded[rows]]] = -np.inf
+            top, top_scores = _top_k(similarity, k)
+            indices[start:stop], scores[start:stop] = self.ids[top], top_scores
+        return indices, scores
+
+    def neighbors(self, genes: list, k: int = 10, nprobe: int = None, exact: bool = False) -> pd.DataFrame:
+        """
+        Most similar genes of one gene or a list of genes (each query gene itself excluded)
+        --------------------------
+        Args:
+            genes (list): Gene names or node indices (or a single one).
+            k (int): Number of neighbors per gene.
+            nprobe (int): Number of lists scanned per query (index default if None).
+            exact (bool): Score all genes instead of the probed lists.
+        Returns:
+            pd.DataFrame: Columns query, rank (1 = most similar), neighbor, node, similarity
+        """
+        genes = [genes] if isinstance(genes, (str, int, np.integer)) else list(genes)
+        nodes = np.array([self.index_of(gene) for gene in genes], dtype=np.int64)
+        queries = self.vectors[self.positions[nodes]]
+        if exact:
+            indices, scores = self.exact_search(queries, k, exclude=nodes)
+        else:
+            indices, scores = self.search(queries, k, nprobe, exclude=nodes)
+        found = indices >= 0
+        return pd.DataFrame({
+            'query': np.repeat(self.names[nodes], found.sum(axis=1)),
+            'rank': np.nonzero(found)[1] + 1,
+            'neighbor': self.names[indices[found]],
+            'node': indices[found],
+            'similarity': scores[found]
+        })
+
+    def recall(self, k: int = 10, nprobe: int = None, sample_size: int = 1000, seed: int = 0) -> float:
+        """
+        Mean recall@k of search() against exact_search() for a sample of the indexed genes
+        queried by their own embedding (themselves excluded)
+        --------------------------
+        Args:
+            k (int): Number of neighbors compared.
+            nprobe (int): Number of lists scanned (index default if None).
+            sample_size (int): Number of query genes (all genes if larger than N).
+            seed (int): Seed of the query sample.
+        Returns:
+            float: Fraction of the exact top-k found by the approximate search
+        """
+        rng = np.random.default_rng(seed)
+        nodes = np.sort(rng.choice(self.num_nodes, min(sample_size, self.num_nodes), replace=False))
+        queries = self.vectors[self.positions[nodes]]
+        k = min(k, self.num_nodes - 1)
+        exact = self.exact_search(queries, k, exclude=nodes)[0]
+        approximate = self.search(queries, k, nprobe, exclude=nodes)[0]
+        hits = sum(len(np.intersect1d(a[a >= 0], e)) for a, e in zip(approximate, exact))
+        return hits / max(exact.size, 1)
+
+    def calibrate(self, target_recall: float = DEFAULT_RECALL, k: int = 10, sample_size: int = 1000, seed: int = 0) -> int:
+        """Smallest nprobe (doubling, then bisection) whose recall@k reaches target_recall"""
+        low, high = 0, 1
+        while high < self.nlist and self.recall(k, high, sample_size, seed) < target_recall:
+            low, high = high, min(2 * high, self.nlist)
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self.recall(k, middle, sample_size, seed) >= target_recall:
+                high = middle
+            else:
+                low = middle
+        return high
+
+
+def search_batches(index: IVFIndex, queries: np.ndarray, k: int = 10, nprobe: int = None, block_size: int = 1024, n_jobs: int = None) -> tuple[np.ndarray, np.ndarray]:
+    """IVFIndex.search of many queries, blocks of queries in parallel threads"""
+    queries = np.atleast_2d(queries)
+    starts = range(0, len(queries), block_size)
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        blocks = list(pool.map(lambda start: index.search(queries[start:start + block_size], k, nprobe), starts))
+    if not blocks:
+        return np.empty((0, k), dtype=np.int64), np.empty((0, k), dtype=np.float32)
+    return np.concatenate([block[0] for block in blocks]), np.concatenate([block[1] for block in blocks])
+
+
+def load_index(
+    store: EmbeddingStore,
+    threshold: float,
+    params: dict,
+    names: list[str] = None,
+    **build_kwargs
+) -> IVFIndex:
+    """
+    IVF index of a stored embedding entry, built on first use and saved next to it
+    ({key}.ivf.npz); rebuilt when the stored embeddings no longer match its hash
+    --------------------------
+    Args:
+        store (EmbeddingStore): Embedding store.
+        threshold (float): Network threshold of the entry.
+        params (dict): Hyperparameters of the entry (as stored, including the data hash).
+        names (list[str]): Gene name of every embedding row.
+        **build_kwargs: Further arguments of IVFIndex.build().
+    Returns:
+        IVFIndex: Index of the entry's embeddings, None if the entry does not exist
+    """
+    entry = store.load(threshold, params)
+    if entry is None:
+        return None
+    path = store.index_path(threshold, params)
+    data_hash = embeddings_hash(entry['embeddings'])
+    if path.exists():
+        index = IVFIndex.load(path)
+        if index.metadata.get('sha256') == data_hash:
+            return index
+    index = IVFIndex.build(entry['embeddings'], names, **build_kwargs)
+    index.save(path, sha256=data_hash, threshold=float(threshold))
+    index.metadata = {'sha256': data_hash, 'threshold': float(threshold)}
+    return index
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Latency and recall@k of IVF nearest-neighbor queries against the exact blocked search
+(ann_index.py), for single genes and gene batches
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+import ann_index as ann
+import link_prediction as lp
+
+
+def latency_ms(func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--genes', type=int, default=11088)
+    parser.add_argument('--dim', type=int, default=64)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--batch', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    # embeddings concentrated around a few directions, like the trained GNN embeddings
+    rng = np.random.default_rng(42)
+    centers = rng.standard_normal((30, args.dim))
+    embeddings = (centers[rng.integers(0, 30, args.genes)] + 0.6 * rng.standard_normal((args.genes, args.dim))).astype(np.float32)
+
+    start = time.perf_counter()
+    index = ann.IVFIndex.build(embeddings, k=args.k)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    exact = lp.predict_links(embeddings, top_k=args.k)['row_top_indices'] # every gene at once
+    all_pairs_time = time.perf_counter() - start
+    print(f"{args.genes} genes, {index.nlist} lists: build {build_time:.2f}s (calibrated nprobe {index.nprobe}), "
+          f"exact top-{args.k} of all genes {all_pairs_time:.2f}s")
+
+    genes = rng.choice(args.genes, args.repeats, replace=False)
+    batch = rng.choice(args.genes, args.batch, replace=False)
+    print(f"{'nprobe':>7} {'recall':>7} {'1 gene ms':>10} {f'{args.batch} genes ms':>13}")
+    for nprobe in sorted(set(args.nprobe + [index.nprobe])):
+        found = index.search(index.vectors[index.positions[genes]], args.k, nprobe, exclude=genes)[0]
+        recall = np.mean([len(np.intersect1d(a, e)) / args.k for a, e in zip(found, exact[genes])])
+        single = latency_ms(lambda: index.neighbors(int(genes[0]), args.k, nprobe), args.repeats)
+        batched = latency_ms(lambda: index.neighbors(batch, args.k, nprobe), max(1, args.repeats // 10))
+        print(f"{nprobe:>7} {recall:>7.3f} {single:>10.2f} {batched:>13.2f}")
+    single = latency_ms(lambda: index.neighbors(int(genes[0]), args.k, exact=True), args.repeats)
+    batched = latency_ms(lambda: index.neighbors(batch, args.k, exact=True), max(1, args.repeats // 10))
+    print(f"{'exact':>7} {1.0:>7.3f} {single:>10.2f} {batched:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Compare cluster_selection.select_num_clusters with the per-k KMeans + silhouette_score loop of
+run_basic_gnn_comparison and gnn_minimal.ipynb on synthetic embeddings
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+import cluster_selection as cs
+
+
+def legacy_selection(features: np.ndarray, k_values: range) -> tuple[int, float]:
+    scores = []
+    for k in k_values:
+        labels = KMeans(n_clusters=k, random_state=42).fit_predict(features)
+        scores.append((k, silhouette_score(features, labels)))
+    return max(scores, key=lambda x: x[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--samples', type=int, nargs='+', default=[2000, 5000, 11000])
+    parser.add_argument('--dim', type=int, default=32)
+    parser.add_argument('--centers', type=int, default=6)
+    parser.add_argument('--sample-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    k_values = range(2, 11)
+    print(f"{'N':>6} {'legacy s':>9} {'shared s':>9} {'warm s':>7} {'sampled s':>10} {'k legacy/shared/warm/sampled':>29} {'max |ds|':>9} {'bound':>6}")
+    for n in args.samples:
+        centers = rng.normal(0, 4, (args.centers, args.dim))
+        features = (centers[rng.integers(args.centers, size=n)] + rng.normal(0, 1, (n, args.dim))).astype(np.float32)
+
+        start = time.perf_counter()
+        legacy_k, legacy_score = legacy_selection(features, k_values)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        shared = cs.select_num_clusters(features, k_values)
+        shared_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        warm = cs.select_num_clusters(features, k_values, warm_start=True)
+        warm_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sampled = cs.select_num_clusters(features, k_values, sample_size=min(args.sample_size, n))
+        sampled_time = time.perf_counter() - start
+
+        ks = f"{legacy_k}/{shared['optimal_clusters']}/{warm['optimal_clusters']}/{sampled['optimal_clusters']}"
+        diff = abs(shared['silhouette_score'] - legacy_score)
+        print(f"{n:>6} {legacy_time:>9.2f} {shared_time:>9.2f} {warm_time:>7.2f} {sampled_time:>10.2f} {ks:>29} {diff:>9.1e} {sampled['error_bound']:>6.3f}")
+
+
+if __name__ == '__main__':
+    main()
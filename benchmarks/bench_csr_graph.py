@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Compare building a thresholded network as a CSRGraph with threshold_weighted_adjacency_list +
+construct_network (NetworkX) at thresholds 0.9 through 0.5: construction time and peak traced
+Python/NumPy memory
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+import network_utils as ne
+from csr_graph import CSRGraph
+from bench_thresholding import synthetic_correlation
+
+
+def measure(func, *args):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def legacy_graph(ppi_mat, threshold, names):
+    return ne.construct_network(ne.threshold_weighted_adjacency_list(ppi_mat, threshold), 'TEC', names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--genes', type=int, default=5000)
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.9, 0.8, 0.7, 0.6, 0.5])
+    args = parser.parse_args()
+
+    ppi_mat = np.abs(synthetic_correlation(args.genes)).astype(np.float32)
+    names = [f'G{i}' for i in range(args.genes)]
+    print(f"{'threshold':>9} {'edges':>10} {'nx s':>8} {'nx MB':>8} {'csr s':>8} {'csr MB':>8}")
+    for threshold in args.thresholds:
+        graph, legacy_time, legacy_peak = measure(legacy_graph, ppi_mat, threshold, names)
+        num_edges = graph.number_of_edges()
+        del graph
+        csr, csr_time, csr_peak = measure(CSRGraph.from_matrix, ppi_mat, threshold, names)
+        assert csr.num_edges == num_edges
+        print(f"{threshold:>9.2f} {num_edges:>10} {legacy_time:>8.2f} {legacy_peak:>8.0f} {csr_time:>8.3f} {csr_peak:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
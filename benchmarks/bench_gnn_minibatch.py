@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Compare full-batch training of TEC_GNN with neighbor-sampled mini-batch training across
+thresholds: seconds per epoch, throughput (nodes/s), peak memory and embedding quality (ROC AUC
+of the decoder on all observed edges against as many sampled non-edges)
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+def run(mode, matrix_path, threshold, epochs, batch_size, fanouts):
+    import torch
+    import tec_gnn
+
+    torch.manual_seed(42)
+    x, edge_index, adj = tec_gnn.prepare_graph(np.load(matrix_path, mmap_mode='r'), threshold, build_edge_index=mode == 'full')
+    model = tec_gnn.TEC_GNN(input_dim=x.size(1))
+    if mode == 'full':
+        history = tec_gnn.train_gnn(model, x, edge_index, epochs=epochs, log_every=epochs + 1)
+        embeddings = tec_gnn.compute_embeddings(model, x, edge_index)
+        nodes_per_second = x.size(0) * epochs / history['training_time']
+    else:
+        history = tec_gnn.train_gnn_sampled(model, x, adj, epochs=epochs, batch_size=batch_size, fanouts=tuple(fanouts), log_every=epochs + 1)
+        embeddings = tec_gnn.compute_embeddings_layerwise(model, x, adj)
+        nodes_per_second = history['nodes_per_second']
+
+    upper = adj.tocoo()
+    pos_pairs = torch.tensor(np.vstack([upper.row, upper.col])[:, upper.row < upper.col], dtype=torch.long)
+    neg_pairs = tec_gnn.sample_negative_pairs(pos_pairs, x.size(0), pos_pairs.size(1), torch.Generator().manual_seed(0))
+    return {
+        'mode': mode,
+        'edges': adj.nnz // 2,
+        'epoch_seconds': float(np.median(history['epoch_times'])),
+        'nodes_per_second': nodes_per_second,
+        'peak_memory_mb': history['peak_memory_mb'],
+        'auc': tec_gnn.edge_auc(embeddings, pos_pairs, neg_pairs)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--genes', type=int, default=4000)
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.85, 0.75, 0.6, 0.5])
+    parser.add_argument('--full-epochs', type=int, default=100)
+    parser.add_argument('--epochs', type=int, default=10, help='mini-batch epochs')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--fanouts', type=int, nargs='+', default=[10, 10])
+    parser.add_argument('--max-full-edges', type=int, default=2000000, help='skip full-batch training above this edge count')
+    parser.add_argument('--child', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--matrix', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--threshold', type=float, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        epochs = args.full_epochs if args.child == 'full' else args.epochs
+        print(json.dumps(run(args.child, args.matrix, args.threshold, epochs, args.batch_size, args.fanouts)))
+        return
+
+    from bench_thresholding import synthetic_correlation
+    import network_utils as ne
+
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        matrix_path = tmp / f'corr_{args.genes}.npy'
+        corr = synthetic_correlation(args.genes).astype(np.float32)
+        np.save(matrix_path, corr)
+        print(f"{'threshold':>9} {'edges':>9} {'mode':>8} {'s/epoch':>8} {'nodes/s':>9} {'peak MB':>8} {'AUC':>6}")
+        for threshold in args.thresholds:
+            edges = len(ne.upper_triangle_edges(corr, threshold, inclusive=False)[0])
+            for mode in ('full', 'sampled'):
+                if mode == 'full' and edges > args.max_full_edges:
+                    print(f"{threshold:>9.2f} {edges:>9} {mode:>8} {'skipped':>8}")
+                    continue
+                # separate processes so each peak RSS is measured in isolation
+                out = subprocess.run(
+                    [sys.executable, __file__, '--child', mode, '--matrix', str(matrix_path), '--threshold', str(threshold),
+                     '--full-epochs', str(args.full_epochs), '--epochs', str(args.epochs),
+                     '--batch-size', str(args.batch_size), '--fanouts', *map(str, args.fanouts)],
+                    check=True, capture_output=True, text=True
+                )
+                row = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{threshold:>9.2f} {row['edges']:>9} {mode:>8} {row['epoch_seconds']:>8.3f} "
+                      f"{row['nodes_per_second']:>9.0f} {row['peak_memory_mb']:>8.0f} {row['auc']:>6.3f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Compare batched_jaccard_similarity (sparse matrices aligned on a shared gene index) with the
+per-node NetworkX jaccard_similarity for a full TEC vs RNA neighborhood comparison at several
+thresholds, network construction included
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+import network_utils as ne
+from bench_thresholding import synthetic_correlation
+
+
+def legacy_jaccard(tec_abs, rna_abs, threshold, names):
+    tec_graph = ne.construct_network(ne.threshold_weighted_adjacency_list(tec_abs, threshold), 'TEC', names)
+    rna_graph = ne.construct_network(ne.threshold_weighted_adjacency_list(rna_abs, threshold), 'RNA', names)
+    matching_nodes = {tec_graph.nodes[n]['name'] for n in tec_graph} & {rna_graph.nodes[n]['name'] for n in rna_graph}
+    node2idx = {name: idx for idx, name in enumerate(names)}
+    return ne.jaccard_similarity(tec_graph, rna_graph, matching_nodes, node2idx)
+
+
+def batched_jaccard(tec_abs, rna_abs, threshold, names):
+    tec_adj = ne.threshold_sparse(tec_abs, threshold, weighted=False)
+    rna_adj = ne.threshold_sparse(rna_abs, threshold, weighted=False)
+    return ne.batched_jaccard_similarity(tec_adj, rna_adj, names, names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--genes', type=int, default=5000)
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.9, 0.8, 0.7, 0.6, 0.5])
+    args = parser.parse_args()
+
+    tec_abs = np.abs(synthetic_correlation(args.genes, seed=1)).astype(np.float32)
+    rna_abs = np.abs(synthetic_correlation(args.genes, seed=2)).astype(np.float32)
+    names = [f'G{i}' for i in range(args.genes)]
+    print(f"{'threshold':>9} {'genes':>7} {'legacy s':>9} {'batched s':>10} {'max diff':>9}")
+    for threshold in args.thresholds:
+        start = time.perf_counter()
+        legacy = legacy_jaccard(tec_abs, rna_abs, threshold, names)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        batched = batched_jaccard(tec_abs, rna_abs, threshold, names)
+        batched_time = time.perf_counter() - start
+        genes = sorted(legacy)
+        max_diff = np.abs(batched[genes].to_numpy() - np.array([legacy[g] for g in genes])).max() if genes else 0.0
+        print(f"{threshold:>9.2f} {len(genes):>7} {legacy_time:>9.2f} {batched_time:>10.3f} {max_diff:>9.1e}")
+
+
+if __name__ == '__main__':
+    main()
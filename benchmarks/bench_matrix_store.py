@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Measure cold start, warm start and peak RSS of the memory-mapped matrix store against the
+original pattern of re-reading the HDF5 file in every analysis
+"""
+
+import argparse
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+import matrix_store as ms
+
+from bench_thresholding import synthetic_correlation
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    scale = 1024 ** 2 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def workload(mode, h5_path, analyses):
+    """Load TEC and RNA once per analysis, the way run_remaining_notebooks.main() does"""
+    start = time.perf_counter()
+    checksum = 0.0
+    held = []
+    for _ in range(analyses):
+        if mode == 'legacy':
+            with pd.HDFStore(h5_path) as store:
+                tec = store['TEC']
+                rna = store['RNA']
+            np_tec = np.abs(tec.to_numpy())
+            np_rna = np.abs(rna.to_numpy())
+        else:
+            np_tec = ms.load_matrix('TEC', h5_path=h5_path)
+            np_rna = ms.load_matrix('RNA', h5_path=h5_path)
+        checksum += float(np_tec[::97].sum() + np_rna[::97].sum()) # touch the data
+        held.append((np_tec, np_rna)) # results from earlier analyses stay alive until main() returns
+    return {'mode': mode, 'seconds': time.perf_counter() - start, 'peak_rss_mb': peak_rss_mb()}
+
+
+def run_child(mode, h5_path, analyses):
+    out = subprocess.run(
+        [sys.executable, __file__, '--child', mode, '--h5', str(h5_path), '--analyses', str(analyses)],
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--h5', type=str, default=None, help='HDF5 file (default: synthetic data)')
+    parser.add_argument('--genes', type=int, default=4000, help='size of the synthetic matrices')
+    parser.add_argument('--analyses', type=int, default=5, help='number of analyses loading the data')
+    parser.add_argument('--child', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(workload(args.child, args.h5, args.analyses)))
+        return
+
+    tmp = None
+    h5_path = Path(args.h5) if args.h5 else None
+    if h5_path is None:
+        tmp = Path(tempfile.mkdtemp())
+        h5_path = tmp / 'gene_network_data.h5'
+        genes = [f'G{i}' for i in range(args.genes)]
+        with pd.HDFStore(h5_path, 'w') as store:
+            store['TEC'] = pd.DataFrame(synthetic_correlation(args.genes, seed=1), index=genes, columns=genes)
+            store['RNA'] = pd.DataFrame(synthetic_correlation(args.genes, seed=2), index=genes, columns=genes)
+        print(f"Synthetic HDF5: {args.genes} genes, {h5_path.stat().st_size / 1024**2:.0f} MB")
+
+    try:
+        shutil.rmtree(ms.cache_dir_for(h5_path), ignore_errors=True)
+        rows = [
+            run_child('legacy', h5_path, args.analyses),
+            {**run_child('store', h5_path, args.analyses), 'mode': 'store (cold)'},
+            {**run_child('store', h5_path, args.analyses), 'mode': 'store (warm)'},
+        ]
+        print(f"{'mode':>14} {'seconds':>9} {'peak RSS (MB)':>14}")
+        for row in rows:
+            print(f"{row['mode']:>14} {row['seconds']:>9.2f} {row['peak_rss_mb']:>14.0f}")
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Compare the bit-parallel BFS engine of path_lengths.py (exact and sampled sources) with
+nx.average_shortest_path_length on the largest component, as computed in supp_table6.ipynb
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+import path_lengths as pl
+from bench_thresholding import synthetic_correlation
+from csr_graph import CSRGraph
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--genes', type=int, default=3000)
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.8, 0.6, 0.5])
+    parser.add_argument('--sources', type=int, default=300)
+    parser.add_argument('--jobs', type=int, default=None)
+    args = parser.parse_args()
+
+    ppi_mat = np.abs(synthetic_correlation(args.genes)).astype(np.float32)
+    print(f"{'threshold':>9} {'nodes':>6} {'nx s':>8} {'exact s':>8} {'sampled s':>9} {'average':>8} {'sampled 95% CI':>18} {'diameter':>8}")
+    for threshold in args.thresholds:
+        component = CSRGraph.from_matrix(ppi_mat, threshold).largest_component()
+        adj = component.to_sparse()
+
+        start = time.perf_counter()
+        nx_average = nx.average_shortest_path_length(component.to_networkx())
+        nx_time = time.perf_counter() - start
+        start = time.perf_counter()
+        exact = pl.shortest_path_stats(adj, n_jobs=args.jobs)
+        exact_time = time.perf_counter() - start
+        start = time.perf_counter()
+        sampled = pl.shortest_path_stats(adj, num_sources=args.sources, n_jobs=args.jobs)
+        sampled_time = time.perf_counter() - start
+
+        assert exact['average_shortest_path_length'] == nx_average
+        interval = f"{sampled['ci_low']:.3f}-{sampled['ci_high']:.3f}" if not sampled['exact'] else 'exact'
+        print(f"{threshold:>9.2f} {component.num_nodes:>6} {nx_time:>8.2f} {exact_time:>8.2f} {sampled_time:>9.2f} "
+              f"{nx_average:>8.4f} {interval:>18} {exact['diameter']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Time and memory-profile every analysis hot path on synthetic correlation matrices of increasing
+size (see synthetic_data.py) and write the results as JSON, optionally comparing them with the
+JSON of an earlier run to flag regressions
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import scipy
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO))
+import cluster_selection as cs
+import communities as cm
+import link_prediction as lp
+import network_utils as ne
+import powerlaw_bootstrap as pb
+import triangles
+from csr_graph import CSRGraph
+
+from synthetic_data import expression_profiles, synthetic_matrix
+
+STAGES = ('threshold', 'threshold_sweep', 'graph_construction', 'connected_components', 'clustering',
+          'communities', 'jaccard', 'powerlaw_fit', 'cluster_selection', 'link_prediction')
+SWEEP_THRESHOLDS = [0.9, 0.85, 0.8, 0.75, 0.7, 0.65, 0.6, 0.55, 0.5]
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    scale = 1024 ** 2 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def measure(func, repeats=1):
+    """
+    Best time over repeats and the traced peak allocation (NumPy and Python objects) of one more
+    run; tracemalloc slows down allocation-heavy code, so the timed runs are not traced
+    """
+    seconds = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        seconds = min(seconds, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def stage_functions(corr, profiles, threshold):
+    """Hot paths in pipeline order, each returning summary info (results later stages need are kept in state)"""
+    genes = np.array([f'G{i}' for i in range(corr.shape[0])], dtype=object)
+    state = dict()
+
+    def threshold_stage():
+        state['adj'] = ne.threshold_sparse(corr, threshold, weighted=False, inclusive=False)
+        return {'edges': state['adj'].nnz // 2}
+
+    def sweep_stage():
+        sweep = ne.threshold_sweep(corr, SWEEP_THRESHOLDS, inclusive=False)
+        return {'edges': dict(zip(map(str, sweep['threshold']), sweep['edges']))}
+
+    def graph_stage():
+        graph = CSRGraph.from_sparse(state['adj'], genes)
+        return {'connected_nodes': int(len(graph.connected_nodes()))}
+
+    def components_stage():
+        stats = ne.graph_stats(state['adj'])
+        state['degrees'] = stats['degrees']
+        return {'components': stats['components'], 'largest_component': int(stats['component_sizes'][0]),
+                'max_degree': int(stats['degrees'].max())}
+
+    def clustering_stage():
+        return {'average_clustering': triangles.average_clustering(state['adj'])}
+
+    def communities_stage():
+        labels = cm.louvain(state['adj'], seed=0)
+        return {'modularity': cm.modularity(state['adj'], labels), 'communities': int(labels.max()) + 1}
+
+    def jaccard_stage():
+        lower = state['lower_adj']
+        similarity = ne.batched_jaccard_similarity(state['adj'], lower, genes, genes)
+        return {'mean_jaccard': float(similarity.mean())}
+
+    def powerlaw_stage():
+        fit = pb.fit_discrete_power_law(state['degrees'])
+        return {'alpha': float(fit['alpha']), 'xmin': float(fit['xmin'])}
+
+    def cluster_stage():
+        selection = cs.select_num_clusters(profiles, range(2, 11))
+        return {'optimal_clusters': selection['optimal_clusters'], 'silhouette': selection['silhouette_score']}
+
+    def link_stage():
+        links = lp.predict_links(profiles, threshold=0.8, top_k=10, global_top_k=100000)
+        return {'num_above_threshold': links['num_above_threshold'], 'mean_similarity': links['mean_similarity']}
+
+    def prepare_jaccard():
+        # second network for the comparison: the same genes one threshold step lower (not timed)
+        state['lower_adj'] = ne.threshold_sparse(corr, threshold - 0.05, weighted=False, inclusive=False)
+
+    functions = dict(zip(STAGES, (threshold_stage, sweep_stage, graph_stage, components_stage, clustering_stage,
+                                  communities_stage, jaccard_stage, powerlaw_stage, cluster_stage, link_stage)))
+    return functions, {'jaccard': prepare_jaccard}
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'generator': {name: parameter.default for name, parameter in inspect.signature(expression_profiles).parameters.items()
+                      if parameter.default is not inspect.Parameter.empty}
+    }
+
+
+def compare(results, baseline_path, tolerance, min_seconds):
+    """Print time ratios against a baseline run, return the regressed (genes, threshold, stage) keys"""
+    with open(baseline_path, 'r') as f:
+        report = json.load(f)
+    baseline = {(row['genes'], row['threshold'], row['stage']): row for row in report['results']}
+    if report['metadata'].get('generator') != json.loads(json.dumps(metadata()['generator'])):
+        print("Warning: the baseline was generated with different synthetic data parameters")
+    regressions = []
+    print(f"\n{'genes':>6} {'threshold':>9} {'stage':>22} {'baseline s':>11} {'now s':>9} {'ratio':>6}")
+    for row in results:
+        key = (row['genes'], row['threshold'], row['stage'])
+        if key not in baseline:
+            continue
+        ratio = row['seconds'] / max(baseline[key]['seconds'], 1e-9)
+        slower = row['seconds'] - baseline[key]['seconds'] > min_seconds # ignore timer noise of very short stages
+        flag = ' REGRESSION' if ratio > 1 + tolerance and slower else ''
+        if flag:
+            regressions.append(key)
+        print(f"{key[0]:>6} {key[1]:>9} {key[2]:>22} {baseline[key]['seconds']:>11.3f} {row['seconds']:>9.3f} {ratio:>6.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--genes', type=int, nargs='+', default=[1000, 5000, 11088, 20000])
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.75])
+    parser.add_argument('--stages', type=str, nargs='+', default=list(STAGES), choices=STAGES)
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', type=str, default=None, help='keep the generated matrices here for later runs')
+    parser.add_argument('--output', type=str, default='bench_suite.json')
+    parser.add_argument('--compare', type=str, default=None, help='JSON of an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='relative slowdown reported as a regression')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='absolute slowdown reported as a regression')
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir) if args.data_dir else Path(tempfile.mkdtemp())
+    data_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    try:
+        print(f"{'genes':>6} {'threshold':>9} {'stage':>22} {'seconds':>9} {'peak MB':>8}")
+        for genes in args.genes:
+            corr = synthetic_matrix(data_dir / f'synthetic_{genes}_{args.seed}.npy', genes, args.seed)
+            profiles = expression_profiles(genes, args.seed)
+            for threshold in args.thresholds:
+                functions, preparations = stage_functions(corr, profiles, threshold)
+                # the threshold and components stages feed the others, so they always run first
+                required = {'threshold'} | ({'connected_components'} if 'powerlaw_fit' in args.stages else set())
+                for stage in STAGES:
+                    if stage not in args.stages and stage not in required:
+                        continue
+                    if stage in preparations:
+                        preparations[stage]()
+                    info, seconds, peak = measure(functions[stage], args.repeats)
+                    results.append({'genes': genes, 'threshold': threshold, 'stage': stage,
+                                    'seconds': seconds, 'peak_mb': peak, 'info': info})
+                    print(f"{genes:>6} {threshold:>9} {stage:>22} {seconds:>9.3f} {peak:>8.0f}")
+            del corr
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {'metadata': {**metadata(), 'seed': args.seed, 'peak_rss_mb': peak_rss_mb()}, 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=float)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance, args.min_seconds)
+        if regressions:
+            print(f"{len(regressions)} stage(s) slower than the baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
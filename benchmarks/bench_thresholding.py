@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark the sparse thresholding engine against the original per-cell Python loops
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+import network_utils as ne
+
+
+def legacy_threshold_adjacency_list(ppi_mat, threshold):
+    """Original O(N^2) Python loop implementation, kept as the benchmark reference"""
+    result = []
+    for i in range(ppi_mat.shape[0]):
+        curr = []
+        for j in range(ppi_mat.shape[1]):
+            if ppi_mat[i, j] >= threshold and i != j:
+                curr.append(j)
+        result.append(curr)
+    return result
+
+
+def legacy_threshold_weighted_adjacency_list(ppi_mat, threshold):
+    """Original O(N^2) Python loop implementation, kept as the benchmark reference"""
+    result = []
+    for i in range(ppi_mat.shape[0]):
+        curr = []
+        for j in range(ppi_mat.shape[1]):
+            if ppi_mat[i, j] >= threshold and i != j:
+                curr.append((j, float(ppi_mat[i, j])))
+        result.append(curr)
+    return result
+
+
+def synthetic_correlation(n_genes, n_samples=40, n_modules=20, seed=42):
+    """Absolute correlation matrix of genes sharing module-level signals"""
+    rng = np.random.default_rng(seed)
+    modules = rng.integers(0, n_modules, size=n_genes)
+    signal = rng.standard_normal((n_modules, n_samples))
+    loading = rng.uniform(0.2, 3.0, size=(n_genes, 1))
+    expr = loading * signal[modules] + rng.standard_normal((n_genes, n_samples))
+    corr = np.abs(np.corrcoef(expr))
+    return (corr + corr.T) / 2 # corrcoef is only symmetric up to rounding
+
+
+def timed(func, *args, repeats=1):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--genes', type=int, default=2000, help='matrix size N')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.9, 0.75, 0.5])
+    parser.add_argument('--repeats', type=int, default=3, help='repeats for the sparse engine')
+    args = parser.parse_args()
+
+    mat = synthetic_correlation(args.genes)
+    print(f"Synthetic matrix: {mat.shape[0]} x {mat.shape[1]}")
+    print(f"{'threshold':>9} {'edges':>10} {'legacy (s)':>11} {'sparse (s)':>11} {'views (s)':>10} {'speedup':>8}")
+    for thresh in args.thresholds:
+        legacy_time, legacy = timed(legacy_threshold_weighted_adjacency_list, mat, thresh)
+        sparse_time, adj = timed(ne.threshold_sparse, mat, thresh, repeats=args.repeats)
+        view_time, view = timed(ne.threshold_weighted_adjacency_list, mat, thresh, repeats=args.repeats)
+        assert view == legacy, f"weighted adjacency list mismatch at threshold {thresh}"
+        assert ne.threshold_adjacency_list(mat, thresh) == legacy_threshold_adjacency_list(mat, thresh)
+        print(f"{thresh:>9} {adj.nnz // 2:>10} {legacy_time:>11.3f} {sparse_time:>11.4f} "
+              f"{view_time:>10.4f} {legacy_time / sparse_time:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Seeded generator of block-structured, symmetric gene correlation matrices at any scale.
+
+Genes belong to modules whose sizes follow a power law (plus a background of unassigned genes)
+and to a few broad expression programs; every gene mixes its module signal, its program signal
+and private noise over a small number of samples, and the matrix is the sample correlation of
+those profiles. The defaults are calibrated on the TEC network at 11,088 genes: about 32k edges
+over 4.8k genes at 0.75, 240k at 0.6 and 1.0M at 0.5 (TEC: 27k over 3.8k genes, 323k and
+1.2M), with a heavy-tailed degree distribution (discrete power-law alpha of 2-3 at 0.75).
+Module sizes scale with N, so the edge density stays about the same at other sizes. Matrices
+are written block by block to a memory-mapped .npy file, so N = 20,000 never holds more than one
+block of rows in memory. Run as a script to write an HDF5 file in the layout of
+data/gene_network_data.h5 for end-to-end runs of run_remaining_notebooks.py (written to
+data/synthetic_network_data.h5 by default; an existing file is only replaced with --force).
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+
+def expression_profiles(
+    n_genes: int,
+    seed: int = 42,
+    n_samples: int = 40,
+    member_fraction: float = 0.7,
+    min_module: float = 0.00135,
+    max_module: float = 0.015,
+    size_exponent: float = 2.0,
+    n_programs: int = 5,
+    program_loading: float = 0.55,
+    module_loading: tuple = (1.0, 1.0),
+    gene_loading: float = 5.0
+) -> np.ndarray:
+    """
+    Centered, unit-norm expression profiles whose inner products are the gene correlations
+    --------------------------
+    Args:
+        n_genes (int): Number of genes N.
+        seed (int): Random seed.
+        n_samples (int): Number of samples per profile (sampling noise of the correlations).
+        member_fraction (float): Fraction of genes assigned to a module.
+        min_module (float): Smallest module size as a fraction of N (15 genes at 11,088).
+        max_module (float): Largest module size as a fraction of N.
+        size_exponent (float): Power-law exponent of the module sizes.
+        n_programs (int): Number of broad expression programs shared across modules.
+        program_loading (float): Maximum share of a gene's variance from its program.
+        module_loading (tuple): Beta(a, b) distribution of the coherence of a module (share
+            of variance its genes take from the module signal).
+        gene_loading (float): Genes take Beta(gene_loading, 1) of their module's coherence.
+    Returns:
+        np.ndarray: N x n_samples float64 profiles
+    """
+    rng = np.random.default_rng(seed)
+    num_members = int(member_fraction * n_genes)
+    # module sizes scale with N, so the network density is the same at every size
+    smallest, largest = max(2, int(min_module * n_genes)), max(2, int(max_module * n_genes))
+    sizes = []
+    while sum(sizes) < num_members:
+        size = int(smallest * (1 - rng.random()) ** (-1 / (size_exponent - 1))) # Pareto module size
+        sizes.append(min(size, largest, num_members - sum(sizes)))
+    modules = np.full(n_genes, -1)
+    modules[rng.permutation(n_genes)[:num_members]] = np.repeat(np.arange(len(sizes)), sizes)
+    members = modules >= 0
+
+    # module coherence varies, so only a few modules stay dense at high thresholds
+    coherence = rng.beta(*module_loading, size=len(sizes))
+    module_share = np.zeros(n_genes)
+    module_share[members] = coherence[modules[members]] * rng.beta(gene_loading, 1, size=num_members)
+    program_share = rng.uniform(0, program_loading, size=n_genes)
+    programs = rng.integers(0, n_programs, size=n_genes)
+    module_signal = rng.standard_normal((len(sizes), n_samples))
+    program_signal = rng.standard_normal((n_programs, n_samples))
+
+    noise_share = np.clip(1 - module_share - program_share, 0, None)
+    profiles = rng.standard_normal((n_genes, n_samples)) * np.sqrt(noise_share)[:, None]
+    profiles += np.sqrt(program_share)[:, None] * program_signal[programs]
+    profiles[members] += np.sqrt(module_share[members])[:, None] * module_signal[modules[members]]
+    profiles -= profiles.mean(axis=1, keepdims=True)
+    profiles /= np.linalg.norm(profiles, axis=1, keepdims=True)
+    return profiles
+
+
+def correlation_blocks(profiles: np.ndarray, absolute: bool = True, block_size: int = 1024):
+    """Yield (start, float32 block of rows) of the correlation matrix of the profiles"""
+    for start in range(0, len(profiles), block_size):
+        block = profiles[start:start + block_size] @ profiles.T
+        if absolute:
+            np.abs(block, out=block)
+        block[np.arange(len(block)), np.arange(start, start + len(block))] = 1.0
+        yield start, block.astype(np.float32)
+
+
+def synthetic_matrix(path: str | Path, n_genes: int, seed: int = 42, absolute: bool = True, block_size: int = 1024, **kwargs) -> np.memmap:
+    """
+    Write the (absolute) correlation matrix of n_genes synthetic genes to a .npy file, reusing
+    the file if it already exists
+    --------------------------
+    Args:
+        path (str | Path): Target .npy file.
+        n_genes (int): Number of genes N.
+        seed (int): Random seed.
+        absolute (bool): Store absolute correlations, as matrix_store.load_matrix returns them.
+        block_size (int): Number of rows computed per block.
+        **kwargs: Generator parameters of expression_profiles.
+    Returns:
+        np.memmap: Read-only N x N float32 matrix
+    """
+    path = Path(path)
+    if not path.exists():
+        tmp = path.with_suffix('.tmp.npy')
+        out = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32, shape=(n_genes, n_genes))
+        for start, block in correlation_blocks(expression_profiles(n_genes, seed, **kwargs), absolute, block_size):
+            out[start:start + len(block)] = block
+        out.flush()
+        del out
+        tmp.replace(path)
+    return np.load(path, mmap_mode='r')
+
+
+def write_h5(path: str | Path, n_genes: int, seed: int = 42, **kwargs):
+    """Write TEC and RNA tables (signed correlations, genes G0..GN-1) in the layout of gene_network_data.h5"""
+    import pandas as pd
+
+    genes = [f'G{i}' for i in range(n_genes)]
+    with pd.HDFStore(path, mode='w') as store:
+        for offset, name in enumerate(('TEC', 'RNA')):
+            profiles = expression_profiles(n_genes, seed + offset, **kwargs)
+            matrix = np.empty((n_genes, n_genes), dtype=np.float64)
+            for start, block in correlation_blocks(profiles, absolute=False):
+                matrix[start:start + len(block)] = block
+            store[name] = pd.DataFrame(matrix, index=genes, columns=genes)
+            del matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--genes', type=int, default=11088)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=str, default='data/synthetic_network_data.h5')
+    parser.add_argument('--force', action='store_true', help='Overwrite an existing output file')
+    args = parser.parse_args()
+    if Path(args.output).exists() and not args.force:
+        parser.error(f'{args.output} already exists, pass --force to overwrite it')
+    write_h5(args.output, args.genes, args.seed)
+    print(f"Wrote {args.genes} x {args.genes} TEC and RNA tables to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Choose the number of KMeans clusters by silhouette score without recomputing pairwise distances.
+
+The silhouettes of every candidate k are scored together: pairwise distances are computed once,
+one block of rows at a time across a thread pool, and each block is reduced against a stacked
+one-hot matrix of all labelings, which gives the per-cluster distance sums for every k at once.
+With sample_size set, only a fixed-seed subsample of rows is scored (against all points, so each
+sampled silhouette is exact) and a distribution-free error bound is reported for the mean.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.metrics.pairwise import euclidean_distances
+
+
+def silhouette_samples_multi(
+    features: np.ndarray,
+    labelings: list[np.ndarray],
+    rows: np.ndarray = None,
+    block_size: int = 1024,
+    n_jobs: int = None
+) -> np.ndarray:
+    """
+    Silhouette coefficient of the given rows under several labelings, sharing one pass over the
+    pairwise distances (matches sklearn.metrics.silhouette_samples)
+    --------------------------
+    Args:
+        features (np.ndarray): N x D feature matrix.
+        labelings (list[np.ndarray]): Cluster labels (0..k-1) of all N points, one array per labeling.
+        rows (np.ndarray): Rows to score (all rows if None).
+        block_size (int): Number of rows whose distances are computed per block.
+        n_jobs (int): Number of worker threads (default: all CPUs).
+    Returns:
+        np.ndarray: len(labelings) x len(rows) silhouette coefficients
+    """
+    features = np.asarray(features, dtype=np.float64)
+    n = features.shape[0]
+    rows = np.arange(n) if rows is None else np.asarray(rows)
+    labelings = [np.unique(labels, return_inverse=True)[1] for labels in labelings]
+    offsets = np.cumsum([0] + [labels.max() + 1 for labels in labelings])
+    one_hot = np.zeros((n, offsets[-1]), dtype=np.float64)
+    for labels, offset in zip(labelings, offsets[:-1]):
+        one_hot[np.arange(n), offset + labels] = 1
+    sizes = one_hot.sum(axis=0)
+
+    def score_block(start):
+        block = rows[start:start + block_size]
+        cluster_sums = euclidean_distances(features[block], features) @ one_hot # distance sum to every cluster
+        scores = np.empty((len(labelings), len(block)))
+        for j, (labels, offset) in enumerate(zip(labelings, offsets[:-1])):
+            sums = cluster_sums[:, offset:offsets[j + 1]]
+            counts = sizes[offset:offsets[j + 1]]
+            own = labels[block]
+            own_size = counts[own]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                a = sums[np.arange(len(block)), own] / (own_size - 1)
+                means = sums / counts
+                means[np.arange(len(block)), own] = np.inf
+                b = means.min(axis=1)
+                s = (b - a) / np.maximum(a, b)
+            s[own_size == 1] = 0 # singleton clusters score 0, as in sklearn
+            scores[j] = np.nan_to_num(s)
+        return scores
+
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        blocks = list(pool.map(score_block, range(0, len(rows), block_size)))
+    return np.concatenate(blocks, axis=1) if blocks else np.zeros((len(labelings), 0))
+
+
+def _warm_start_centers(features: np.ndarray, centers: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Previous centers plus one new center, the best of several k-means++ (D^2 weighted) candidates"""
+    closest = euclidean_distances(features, centers, squared=True).min(axis=1)
+    total = closest.sum()
+    if total == 0:
+        return np.vstack([centers, features[rng.integers(len(features))]])
+    n_trials = 2 + int(np.log(len(centers) + 1)) # as sklearn's greedy k-means++
+    trials = rng.choice(len(features), size=n_trials, p=closest / total)
+    potentials = np.minimum(closest, euclidean_distances(features[trials], features, squared=True)).sum(axis=1)
+    return np.vstack([centers, features[trials[np.argmin(potentials)]]])
+
+
+def select_num_clusters(
+    features: np.ndarray,
+    k_values: range = range(2, 11),
+    sample_size: int = None,
+    confidence: float = 0.95,
+    warm_start: bool = False,
+    random_state: int = 42,
+    block_size: int = 1024,
+    n_jobs: int = None
+) -> dict:
+    """
+    Fit KMeans for every k and pick the k with the highest mean silhouette
+    --------------------------
+    Args:
+        features (np.ndarray): N x D feature matrix.
+        k_values (range): Candidate numbers of clusters (values >= N are skipped).
+        sample_size (int): Score a fixed-seed subsample of this many rows (all rows if None).
+        confidence (float): Confidence level of the subsample error bound.
+        warm_start (bool): Initialize KMeans for k from the centers found for k - 1 plus one
+            greedy k-means++ center, instead of a fresh k-means++ initialization (faster
+            convergence, but the selected k can differ from independent runs).
+        random_state (int): Seed of KMeans, the warm-start centers and the subsample.
+        block_size (int): Number of rows whose distances are computed per block.
+        n_jobs (int): Number of worker threads for the silhouette pass (default: all CPUs).
+    Returns:
+        dict: 'optimal_clusters', 'silhouette_score', 'labels' (of the optimal k), 'scores'
+            ({k: silhouette}), 'sample_size' and 'error_bound' (Hoeffding half-width of the
+            subsampled means at the given confidence, 0.0 when every row is scored)
+    """
+    features = np.asarray(features, dtype=np.float64)
+    n = features.shape[0]
+    rng = np.random.default_rng(random_state)
+    candidates = [k for k in k_values if 2 <= k < n]
+
+    labelings, fitted = [], []
+    centers = None
+    for k in candidates:
+        if warm_start and centers is not None and len(centers) == k - 1:
+            kmeans = KMeans(n_clusters=k, init=_warm_start_centers(features, centers, rng), n_init=1, random_state=random_state)
+        else:
+            kmeans = KMeans(n_clusters=k, random_state=random_state)
+        labels = kmeans.fit_predict(features)
+        centers = kmeans.cluster_centers_
+        if len(np.unique(labels)) >= 2:
+            labelings.append(labels)
+            fitted.append(k)
+    if not fitted:
+        return {'optimal_clusters': 1, 'silhouette_score': 0.0, 'labels': np.zeros(n, dtype=np.int32),
+                'scores': dict(), 'sample_size': 0, 'error_bound': 0.0}
+
+    rows = None
+    error_bound = 0.0
+    if sample_size is not None and sample_size < n:
+        rows = np.sort(np.random.default_rng(random_state).choice(n, size=sample_size, replace=False))
+        # silhouettes lie in [-1, 1]: Hoeffding bound on the mean of sample_size draws
+        error_bound = float(np.sqrt(2 * np.log(2 / (1 - confidence)) / sample_size))
+    scores = silhouette_samples_multi(features, labelings, rows, block_size, n_jobs).mean(axis=1)
+
+    best = int(np.argmax(scores))
+    return {
+        'optimal_clusters': fitted[best],
+        'silhouette_score': float(scores[best]),
+        'labels': labelings[best],
+        'scores': {k: float(score) for k, score in zip(fitted, scores)},
+        'sample_size': n if rows is None else len(rows),
+        'error_bound': error_bound
+    }
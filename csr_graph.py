@@ -0,0 +1,213 @@
+"""
+Compact, array-backed undirected graph for the thresholded co-expression networks.
+
+A CSRGraph stores each node's neighbors and edge weights in CSR arrays (indptr / indices /
+weights) next to the gene-name array, so building a network is a handful of vectorized
+operations instead of one NetworkX add_edge call per directed entry. The operations the
+analyses need (degrees, neighbors, components, subgraphs, name lookups) work on the arrays
+directly; to_networkx() builds the equivalent nx.Graph lazily for NetworkX-only algorithms.
+"""
+
+import numpy as np
+import networkx as nx
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+import communities as cm
+import network_utils as ne
+
+
+class CSRGraph:
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        weights: np.ndarray = None,
+        names: np.ndarray = None,
+        name: str = '',
+        node_ids: np.ndarray = None
+    ):
+        """
+        Graph over nodes 0..N-1 whose neighbors of node i are indices[indptr[i]:indptr[i+1]]
+        --------------------------
+        Args:
+            indptr (np.ndarray): N + 1 row pointers.
+            indices (np.ndarray): Neighbor indices, every undirected edge stored in both directions.
+            weights (np.ndarray): Edge weights aligned with indices (1 for all edges if None).
+            names (np.ndarray): Gene name of every node.
+            name (str): Name of the network.
+            node_ids (np.ndarray): Node ids in the parent graph (for subgraphs), defaults to 0..N-1.
+        """
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.ones(len(self.indices), dtype=np.float32) if weights is None else np.asarray(weights)
+        n = len(self.indptr) - 1
+        self.names = np.asarray(names, dtype=object) if names is not None else np.arange(n).astype(str).astype(object)
+        self.name = name
+        self.node_ids = np.arange(n) if node_ids is None else np.asarray(node_ids)
+        self._name2idx = None
+        self._nx_graph = None
+
+    @classmethod
+    def from_sparse(cls, adj: sp.spmatrix, names: list[str] = None, name: str = '') -> 'CSRGraph':
+        """
+        Build a graph from a symmetric sparse adjacency matrix, dropping self-loops
+        --------------------------
+        Args:
+            adj (sp.spmatrix): Symmetric sparse adjacency matrix (e.g. from threshold_sparse).
+            names (list[str]): Gene name of every node.
+            name (str): Name of the network.
+        Returns:
+            CSRGraph: Graph with the same edges and weights
+        """
+        adj = sp.csr_matrix(adj)
+        if adj.diagonal().any():
+            adj = sp.csr_matrix(adj - sp.diags(adj.diagonal()))
+            adj.eliminate_zeros()
+        adj.sort_indices()
+        return cls(adj.indptr, adj.indices, adj.data, names, name)
+
+    @classmethod
+    def from_matrix(
+        cls,
+        ppi_mat: np.ndarray,
+        threshold: float,
+        names: list[str] = None,
+        name: str = '',
+        inclusive: bool = True,
+        block_size: int = 1024
+    ) -> 'CSRGraph':
+        """
+        Threshold a symmetric weighted adjacency matrix straight into a graph, the array-backed
+        equivalent of threshold_weighted_adjacency_list followed by construct_network
+        --------------------------
+        Args:
+            ppi_mat (np.ndarray): Symmetric weighted adjacency matrix (may be a np.memmap).
+            threshold (float): Minimum weight to include an edge.
+            names (list[str]): Gene name of every node.
+            name (str): Name of the network.
+            inclusive (bool): Keep weights >= threshold if True, otherwise weights > threshold.
+            block_size (int): Number of matrix rows processed per block.
+        Returns:
+            CSRGraph: Thresholded network
+        """
+        adj = ne.threshold_sparse(ppi_mat, threshold, inclusive=inclusive, block_size=block_size)
+        return cls.from_sparse(adj, names, name)
+
+    @property
+    def num_nodes(self) -> int:
+        """Number of nodes, isolated nodes included"""
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self) -> int:
+        """Number of undirected edges"""
+        return len(self.indices) // 2
+
+    def degree(self, node: int = None):
+        """Degree of a node, or of every node as an array if node is None"""
+        degrees = np.diff(self.indptr)
+        return degrees if node is None else int(degrees[node])
+
+    def weighted_degree(self, node: int = None):
+        """Sum of edge weights of a node, or of every node as an array if node is None"""
+        if node is not None:
+            return float(self.weights[self.indptr[node]:self.indptr[node + 1]].sum(dtype=np.float64))
+        rows = np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+        return np.bincount(rows, weights=self.weights, minlength=self.num_nodes)
+
+    def neighbors(self, node: int) -> np.ndarray:
+        """Neighbor indices of a node"""
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def neighbor_weights(self, node: int) -> np.ndarray:
+        """Edge weights aligned with neighbors(node)"""
+        return self.weights[self.indptr[node]:self.indptr[node + 1]]
+
+    def connected_nodes(self) -> np.ndarray:
+        """Indices of the nodes with at least one edge (the nodes kept by construct_network)"""
+        return np.flatnonzero(np.diff(self.indptr))
+
+    def index_of(self, gene: str) -> int:
+        """Node index of a gene name"""
+        if self._name2idx is None:
+            self._name2idx = {curr_name: idx for idx, curr_name in enumerate(self.names)}
+        return self._name2idx[gene]
+
+    def name_of(self, node: int) -> str:
+        """Gene name of a node index"""
+        return self.names[node]
+
+    def to_sparse(self) -> sp.csr_matrix:
+        """Symmetric sparse adjacency matrix (shares the graph's arrays)"""
+        return sp.csr_matrix((self.weights, self.indices, self.indptr), shape=(self.num_nodes, self.num_nodes))
+
+    def stats(self) -> dict:
+        """Degree and connected-component statistics, see network_utils.graph_stats"""
+        return ne.graph_stats(self.to_sparse())
+
+    def jaccard_similarity(self, other: 'CSRGraph', genes: list[str] = None) -> pd.Series:
+        """Jaccard similarity of gene neighborhoods against another graph, see network_utils.batched_jaccard_similarity"""
+        return ne.batched_jaccard_similarity(self.to_sparse(), other.to_sparse(), self.names, other.names, genes)
+
+    def components(self) -> list[np.ndarray]:
+        """
+        Connected components with at least one edge, largest first
+        --------------------------
+        Returns:
+            list[np.ndarray]: Sorted node indices of every multi-node component
+        """
+        num_components, labels = csgraph.connected_components(self.to_sparse(), directed=False)
+        sizes = np.bincount(labels, minlength=num_components)
+        order = np.argsort(labels, kind='stable')
+        members = np.split(order, np.cumsum(sizes)[:-1])
+        ranked = sorted((c for c in range(num_components) if sizes[c] >= 2), key=lambda c: -sizes[c])
+        return [members[c] for c in ranked]
+
+    def communities(self, resolution: float = 1.0, seed: int = None, **kwargs) -> np.ndarray:
+        """Louvain community of every node (-1 for nodes without edges), see communities.louvain"""
+        return cm.louvain(self.to_sparse(), resolution=resolution, seed=seed, **kwargs)
+
+    def subgraph(self, nodes: np.ndarray) -> 'CSRGraph':
+        """
+        Induced subgraph over a set of nodes, relabelled 0..len(nodes)-1 in sorted order
+        --------------------------
+        Args:
+            nodes (np.ndarray): Node indices to keep.
+        Returns:
+            CSRGraph: Subgraph whose node_ids map back to the ids of this graph
+        """
+        nodes = np.unique(np.asarray(nodes, dtype=np.int64))
+        adj = self.to_sparse()[nodes][:, nodes].tocsr()
+        adj.sort_indices()
+        return CSRGraph(adj.indptr, adj.indices, adj.data, self.names[nodes], self.name, self.node_ids[nodes])
+
+    def largest_component(self) -> 'CSRGraph':
+        """Subgraph of the largest connected component"""
+        components = self.components()
+        return self.subgraph(components[0] if components else np.empty(0, dtype=np.int64))
+
+    def to_networkx(self) -> nx.Graph:
+        """
+        Equivalent NetworkX graph, built once on first use: nodes with at least one edge keyed by
+        node_ids with a 'name' attribute, and 'weight' edge attributes (as construct_network)
+        --------------------------
+        Returns:
+            nx.Graph: NetworkX.Graph
+        """
+        if self._nx_graph is None:
+            graph = nx.Graph(name=self.name)
+            connected = self.connected_nodes()
+            graph.add_nodes_from(
+                (int(self.node_ids[i]), {'name': self.names[i]}) for i in connected
+            )
+            rows = np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+            upper = rows < self.indices # each undirected edge once
+            graph.add_weighted_edges_from(zip(
+                self.node_ids[rows[upper]].tolist(),
+                self.node_ids[self.indices[upper]].tolist(),
+                self.weights[upper].astype(float).tolist()
+            ))
+            self._nx_graph = graph
+        return self._nx_graph
@@ -0,0 +1,245 @@
+"""
+Per-gene index of the absolute correlations above a floor, for degree distributions at any threshold.
+
+Each gene keeps its correlations with all other genes that reach the floor, sorted, in one
+CSR-style array. The degree of every gene at a threshold is then a single vectorized
+searchsorted over that array, so degree sequences, histograms and scale-free fits for hundreds
+of thresholds (or a fine continuous sweep) take milliseconds instead of one pass over the
+N x N matrix per threshold. Thresholds compare exactly as in network_utils.threshold_sparse
+(same dtype promotion). The index is built once in parallel row blocks and saved next to the
+matrix cache, keyed by the content hash of the matrix.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from scipy.stats import linregress
+
+import matrix_store as ms
+
+DEFAULT_FLOOR = 0.5 # lowest threshold of the supplemental sweeps
+
+SPACING = 4.0 # key of a value: SPACING * row + value, so rows never overlap for |value| < 2
+
+_open_indexes = dict() # (index path) -> DegreeIndex
+
+
+def _row_block(matrix: np.ndarray, start: int, stop: int, floor: float) -> tuple[np.ndarray, np.ndarray]:
+    block = np.array(matrix[start:stop])
+    block[np.arange(stop - start), np.arange(start, stop)] = -np.inf # no self loops
+    rows, cols = np.nonzero(block >= floor)
+    # sort by (row, value) in one pass over the keys (exact in float64 for float32 values)
+    keys = np.sort(SPACING * rows + block[rows, cols])
+    counts = np.bincount(rows, minlength=stop - start)
+    values = (keys - SPACING * np.repeat(np.arange(stop - start), counts)).astype(block.dtype)
+    return counts, values
+
+
+def scale_free_fit(degrees: np.ndarray) -> tuple[float, float]:
+    """
+    Least-squares line through the log-log degree distribution (zero degrees removed), as in
+    network_utils.scale_free_r2
+    --------------------------
+    Args:
+        degrees (np.ndarray): Degree of every node.
+    Returns:
+        tuple: (alpha, the negated slope; R2 of the fit), NaN with fewer than two distinct degrees
+    """
+    counts = np.bincount(degrees)
+    unique_degs = np.flatnonzero(counts)
+    unique_degs = unique_degs[unique_degs > 0]
+    if len(unique_degs) < 2:
+        return float('nan'), float('nan')
+    fit = linregress(np.log10(unique_degs), np.log10(counts[unique_degs] / len(degrees)))
+    return -fit.slope, fit.rvalue ** 2
+
+
+class DegreeIndex:
+    def __init__(self, indptr: np.ndarray, values: np.ndarray, floor: float):
+        """
+        Sorted correlations of every gene above the floor (use build() or load())
+        --------------------------
+        Args:
+            indptr (np.ndarray): N + 1 offsets of the genes' segments in values.
+            values (np.ndarray): Correlations >= floor, ascending within every gene.
+            floor (float): Lowest threshold the index answers.
+        """
+        self.indptr = indptr
+        self.values = values
+        self.floor = floor
+        self.metadata = dict()
+        self.num_nodes = len(indptr) - 1
+        rows = np.repeat(np.arange(self.num_nodes), np.diff(indptr))
+        self._keys = SPACING * rows + values # globally sorted, one search finds every gene's segment
+        self._offsets = SPACING * np.arange(self.num_nodes)
+        self._floor = self._promote(floor)
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, floor: float = DEFAULT_FLOOR, block_size: int = 1024, n_jobs: int = None):
+        """
+        Index a symmetric (absolute) correlation matrix, row blocks in parallel threads
+        --------------------------
+        Args:
+            matrix (np.ndarray): N x N matrix (may be a np.memmap).
+            floor (float): Lowest threshold to answer (smaller floors keep more values).
+            block_size (int): Number of matrix rows per block.
+            n_jobs (int): Number of worker threads (default: all CPUs).
+        Returns:
+            DegreeIndex: Index of the matrix
+        """
+        n, floor = matrix.shape[0], float(floor)
+        starts = range(0, n, block_size)
+        with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+            blocks = list(pool.map(lambda start: _row_block(matrix, start, min(start + block_size, n), floor), starts))
+        counts = np.concatenate([block[0] for block in blocks]) if blocks else np.empty(0, np.int64)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        values = np.concatenate([block[1] for block in blocks]) if blocks else np.empty(0, matrix.dtype)
+        return cls(indptr, values, float(floor))
+
+    def save(self, path: str | os.PathLike, **metadata):
+        """Write the index (and JSON-serializable metadata) to a .npz file"""
+        path = Path(path)
+        tmp = path.with_name(path.stem + '.tmp.npz')
+        np.savez(tmp, indptr=self.indptr, values=self.values, floor=self.floor,
+                 metadata=json.dumps(metadata))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike):
+        """Read an index written by save(), its metadata in .metadata"""
+        with np.load(path) as data:
+            index = cls(data['indptr'], data['values'], float(data['floor']))
+            index.metadata = json.loads(str(data['metadata']))
+        return index
+
+    def _promote(self, threshold: float) -> float:
+        # compare in the dtype numpy compares the matrix in (a Python float becomes float32)
+        return float(np.array(threshold, dtype=np.result_type(self.values.dtype, threshold)))
+
+    def _threshold(self, threshold: float) -> float:
+        promoted = self._promote(threshold)
+        if promoted < self._floor:
+            raise ValueError(f'threshold {threshold} is below the index floor {self.floor}')
+        return promoted
+
+    def degrees(self, threshold: float, inclusive: bool = True) -> np.ndarray:
+        """
+        Degree of every gene in the network thresholded at threshold
+        --------------------------
+        Args:
+            threshold (float): Edge threshold (>= floor).
+            inclusive (bool): Count weights >= threshold if True, otherwise weights > threshold.
+        Returns:
+            np.ndarray: N int64 degrees, as np.diff(threshold_sparse(matrix, threshold).indptr)
+        """
+        starts = np.searchsorted(self._keys, self._offsets + self._threshold(threshold), side='left' if inclusive else 'right')
+        return self.indptr[1:] - starts
+
+    def degree_matrix(self, thresholds: list[float], inclusive: bool = True) -> np.ndarray:
+        """Degrees at several thresholds, one row per threshold (T x N int64)"""
+        if len(thresholds) == 0:
+            return np.empty((0, self.num_nodes), dtype=np.int64)
+        cutoffs = np.array([self._threshold(threshold) for threshold in thresholds])
+        queries = self._offsets[None, :] + cutoffs[:, None]
+        starts = np.searchsorted(self._keys, queries.ravel(), side='left' if inclusive else 'right')
+        return self.indptr[1:][None, :] - starts.reshape(queries.shape)
+
+    def gene_degrees(self, node: int, thresholds: list[float], inclusive: bool = True) -> np.ndarray:
+        """Degrees of one gene at several thresholds (searches only that gene's segment)"""
+        cutoffs = np.array([self._threshold(threshold) for threshold in thresholds])
+        segment = self.values[self.indptr[node]:self.indptr[node + 1]]
+        return len(segment) - np.searchsorted(segment, cutoffs, side='left' if inclusive else 'right')
+
+    def edges(self, threshold: float, inclusive: bool = True) -> int:
+        """Number of edges at threshold"""
+        return int(self.degrees(threshold, inclusive).sum()) // 2
+
+    def degree_histogram(self, threshold: float, inclusive: bool = True) -> np.ndarray:
+        """Number of genes of every degree (index = degree, as in network_utils.graph_stats)"""
+        return np.bincount(self.degrees(threshold, inclusive))
+
+    def sweep(self, thresholds: list[float], inclusive: bool = True) -> dict[str, list]:
+        """
+        Degree statistics and scale-free fits over many thresholds
+        --------------------------
+        Args:
+            thresholds (list[float]): Thresholds (>= floor, any order).
+            inclusive (bool): Count weights >= threshold if True, otherwise weights > threshold.
+        Returns:
+            dict: lists aligned with thresholds for 'threshold', 'edges', 'connected_nodes',
+                'max_degree', 'alpha' and 'r_squared' (see scale_free_fit)
+        """
+        result = {key: [] for key in ('edges', 'connected_nodes', 'max_degree', 'alpha', 'r_squared')}
+        for degrees in self.degree_matrix(thresholds, inclusive):
+            alpha, r_squared = scale_free_fit(degrees)
+            result['edges'].append(int(degrees.sum()) // 2)
+            result['connected_nodes'].append(int(np.count_nonzero(degrees)))
+            result['max_degree'].append(int(degrees.max(initial=0)))
+            result['alpha'].append(alpha)
+            result['r_squared'].append(r_squared)
+        return {'threshold': list(thresholds), **result}
+
+
+def _cached_index(path: Path, matrix: np.ndarray, data_hash: str, floor: float, n_jobs: int) -> DegreeIndex:
+    index = _open_indexes.get(str(path))
+    if index is None and path.exists():
+        index = DegreeIndex.load(path)
+    # an index with a lower floor answers every higher threshold too
+    if index is None or index.metadata.get('sha256') != data_hash or index.floor > floor:
+        index = DegreeIndex.build(matrix, floor, n_jobs=n_jobs)
+        index.save(path, sha256=data_hash)
+        index.metadata = {'sha256': data_hash}
+    _open_indexes[str(path)] = index
+    return index
+
+
+def load_index(
+    name: str = 'TEC',
+    floor: float = DEFAULT_FLOOR,
+    h5_path: str | os.PathLike = ms.DEFAULT_H5,
+    n_jobs: int = None
+) -> DegreeIndex:
+    """
+    Degree index of a correlation matrix, built on first use and saved in the matrix cache
+    (e.g. data/gene_network_data.cache/TEC.degree_index.npz)
+    --------------------------
+    Args:
+        name (str): Table name ('TEC' or 'RNA').
+        floor (float): Lowest threshold needed (a saved index with a lower floor is reused).
+        h5_path (str | os.PathLike): Path to the HDF5 file.
+        n_jobs (int): Number of worker threads for building (default: all CPUs).
+    Returns:
+        DegreeIndex: Index of the absolute correlations
+    """
+    path = ms.cache_dir_for(h5_path) / f'{name}.degree_index.npz'
+    return _cached_index(path, ms.load_matrix(name, h5_path=h5_path), ms.data_hash(name, h5_path), floor, n_jobs)
+
+
+def load_tissue_index(
+    tissue: str,
+    floor: float = DEFAULT_FLOOR,
+    tissue_dir: str | os.PathLike = ms.TISSUE_DIR,
+    h5_path: str | os.PathLike = ms.DEFAULT_H5,
+    n_jobs: int = None
+) -> DegreeIndex:
+    """
+    Degree index of a tissue TEC matrix, built on first use and saved in the tissue cache
+    --------------------------
+    Args:
+        tissue (str): Tissue name (e.g. 'lung').
+        floor (float): Lowest threshold needed (a saved index with a lower floor is reused).
+        tissue_dir (str | os.PathLike): Directory of the .rda files.
+        h5_path (str | os.PathLike): Path to the HDF5 file of the global matrices.
+        n_jobs (int): Number of worker threads for building (default: all CPUs).
+    Returns:
+        DegreeIndex: Index of the absolute correlations
+    """
+    matrix = ms.load_tissue_matrix(tissue, tissue_dir=tissue_dir, h5_path=h5_path)
+    cache_dir = ms.tissue_cache_dir(tissue_dir)
+    with open(cache_dir / f'{tissue}.json', 'r') as f:
+        data_hash = json.load(f)['sha256']
+    return _cached_index(cache_dir / f'{tissue}.degree_index.npz', matrix, data_hash, floor, n_jobs)
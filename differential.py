@@ -0,0 +1,295 @@
+"""
+Differential networks between two aligned correlation matrices, streamed in row blocks.
+
+The TEC vs RNA and tissue vs pan-tissue comparisons only need per-gene summaries of the
+difference first - second and the edges that change sides of the network threshold, so the
+matrices are read one block of rows at a time (gathered through the gene alignment of
+matrix_store for the tissues) and no N x N difference is ever formed. Every block yields the
+row sums, range and mean absolute change of its genes, their top-k gained (first > second) and
+lost (first < second) partners, the number of edges present in only one of the two
+thresholded networks, and the upper-triangle part of the sparse table of those rewired edges.
+The blocks of any number of comparisons (TEC vs RNA and every tissue file) run in one shared
+thread pool. DifferenceView gives lazy row access to the difference itself, e.g. for a
+permuted heatmap with raster_plots.heatmap.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import matrix_store as ms
+
+DEFAULT_THRESHOLD = 0.75
+
+
+def _gather(matrix: np.ndarray, rows: np.ndarray, start: int, stop: int) -> np.ndarray:
+    # rows start:stop of matrix[rows][:, rows] (the matrix itself when rows is None)
+    if rows is None:
+        return np.asarray(matrix[start:stop])
+    return matrix[rows[start:stop]][:, rows]
+
+
+class DifferenceView:
+    def __init__(self, first: np.ndarray, second: np.ndarray, first_rows: np.ndarray = None, second_rows: np.ndarray = None):
+        """
+        Lazy first - second over aligned genes: indexing computes only the requested rows
+        (all columns), so the difference behaves like an S x S array without being stored
+        --------------------------
+        Args:
+            first (np.ndarray): Square matrix (may be a np.memmap).
+            second (np.ndarray): Square matrix (may be a np.memmap).
+            first_rows (np.ndarray): Rows / columns of first in output order (all if None).
+            second_rows (np.ndarray): Rows / columns of second aligned with first_rows (all if None).
+        """
+        self.first = first
+        self.second = second
+        self.first_rows = None if first_rows is None else np.asarray(first_rows)
+        self.second_rows = None if second_rows is None else np.asarray(second_rows)
+        size = len(self.first_rows) if self.first_rows is not None else first.shape[0]
+        self.shape = (size, size)
+        self.ndim = 2
+        self.dtype = np.result_type(first.dtype, second.dtype)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def _rows(self, matrix: np.ndarray, rows: np.ndarray, index: np.ndarray) -> np.ndarray:
+        return np.asarray(matrix[index]) if rows is None else matrix[rows[index]][:, rows]
+
+    def __getitem__(self, key) -> np.ndarray:
+        if isinstance(key, tuple): # view[rows, columns]: compute the rows, then index the columns
+            rows, columns = key
+            return self[rows][:, columns]
+        if isinstance(key, (int, np.integer)):
+            return self[np.array([key])][0]
+        if isinstance(key, slice):
+            key = np.arange(*key.indices(self.shape[0]))
+        index = np.asarray(key)
+        return self._rows(self.first, self.first_rows, index) - self._rows(self.second, self.second_rows, index)
+
+    def __array__(self, dtype=None, copy=None):
+        full = self[:]
+        return full if dtype is None else full.astype(dtype)
+
+    def permuted(self, order: np.ndarray) -> 'DifferenceView':
+        """View with rows and columns in the given order (e.g. np.argsort of the row sums)"""
+        order = np.asarray(order)
+        first_rows = order if self.first_rows is None else self.first_rows[order]
+        second_rows = order if self.second_rows is None else self.second_rows[order]
+        return DifferenceView(self.first, self.second, first_rows, second_rows)
+
+
+def _block(
+    first: np.ndarray,
+    second: np.ndarray,
+    first_rows: np.ndarray,
+    second_rows: np.ndarray,
+    start: int,
+    stop: int,
+    threshold: float,
+    inclusive: bool,
+    top_k: int
+) -> dict:
+    a = _gather(first, first_rows, start, stop)
+    b = _gather(second, second_rows, start, stop)
+    diff = a - b
+    local = np.arange(stop - start)
+    diagonal = start + local
+    size = diff.shape[1]
+    block = {
+        'row_sums': diff.sum(axis=1, dtype=np.float64),
+        'mean_abs_difference': np.abs(diff).mean(axis=1, dtype=np.float64),
+        'min': diff.min(axis=1),
+        'max': diff.max(axis=1)
+    }
+
+    # strongest changes per gene, self pairs excluded
+    k = min(top_k, size - 1)
+    for key, sign in (('gained', 1), ('lost', -1)):
+        scores = sign * diff
+        scores[local, diagonal] = -np.inf
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k > 0 else np.empty((len(local), 0), dtype=np.int64)
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable'), axis=1)
+        block[key] = top
+        block[f'{key}_difference'] = np.take_along_axis(diff, top, axis=1)
+
+    # edges on one side of the threshold in only one network (compared as in threshold_sparse)
+    if threshold is not None:
+        in_first = np.abs(a) >= threshold if inclusive else np.abs(a) > threshold
+        in_second = np.abs(b) >= threshold if inclusive else np.abs(b) > threshold
+        in_first[local, diagonal] = False
+        in_second[local, diagonal] = False
+        first_only = in_first & ~in_second
+        second_only = in_second & ~in_first
+        block['first_only'] = np.count_nonzero(first_only, axis=1)
+        block['second_only'] = np.count_nonzero(second_only, axis=1)
+        rows, cols = np.nonzero(first_only | second_only)
+        upper = cols > diagonal[rows] # every edge once
+        rows, cols = rows[upper], cols[upper]
+        block['rewired'] = (diagonal[rows], cols, a[rows, cols], b[rows, cols])
+    return block
+
+
+def _assemble(genes: pd.Index, blocks: list[dict], threshold: float) -> dict:
+    result = {'genes': genes, 'threshold': threshold}
+    for key in ('row_sums', 'mean_abs_difference', 'min', 'max', 'gained', 'gained_difference', 'lost', 'lost_difference'):
+        result[key] = np.concatenate([block[key] for block in blocks])
+    if threshold is None:
+        return result
+    result['first_only'] = np.concatenate([block['first_only'] for block in blocks])
+    result['second_only'] = np.concatenate([block['second_only'] for block in blocks])
+    rows, cols, first, second = (np.concatenate(parts) for parts in zip(*(block['rewired'] for block in blocks)))
+    result['rewired'] = pd.DataFrame({
+        'gene_a': genes[rows],
+        'gene_b': genes[cols],
+        'first': first,
+        'second': second,
+        'difference': first - second,
+        'network': np.where(np.abs(first) >= np.abs(second), 'first', 'second')
+    })
+    return result
+
+
+def _run(comparisons: dict, threshold: float, inclusive: bool, top_k: int, block_size: int, n_jobs: int) -> dict:
+    # every row block of every comparison is one task of a single thread pool
+    tasks = [(name, start, min(start + block_size, len(genes)))
+             for name, (_, _, _, _, genes) in comparisons.items() for start in range(0, len(genes), block_size)]
+
+    def run_task(task):
+        name, start, stop = task
+        first, second, first_rows, second_rows, _ = comparisons[name]
+        return _block(first, second, first_rows, second_rows, start, stop, threshold, inclusive, top_k)
+
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        blocks = list(pool.map(run_task, tasks))
+    grouped = {name: [] for name in comparisons}
+    for (name, _, _), block in zip(tasks, blocks):
+        grouped[name].append(block)
+    return {name: _assemble(comparisons[name][4], grouped[name], threshold) for name in comparisons}
+
+
+def compare(
+    first: np.ndarray,
+    second: np.ndarray,
+    genes: pd.Index = None,
+    first_rows: np.ndarray = None,
+    second_rows: np.ndarray = None,
+    threshold: float = DEFAULT_THRESHOLD,
+    inclusive: bool = True,
+    top_k: int = 10,
+    block_size: int = 1024,
+    n_jobs: int = None
+) -> dict:
+    """
+    Differential network first - second, computed one block of rows at a time
+    --------------------------
+    Args:
+        first (np.ndarray): Square correlation matrix (may be a np.memmap).
+        second (np.ndarray): Square correlation matrix (may be a np.memmap).
+        genes (pd.Index): Gene names in output order (0..S-1 if None).
+        first_rows (np.ndarray): Rows / columns of first aligned with genes (all if None).
+        second_rows (np.ndarray): Rows / columns of second aligned with genes (all if None).
+        threshold (float): Network threshold on the absolute correlations (no rewiring if None).
+        inclusive (bool): Edges have weights >= threshold if True, otherwise weights > threshold.
+        top_k (int): Number of gained and lost partners kept per gene.
+        block_size (int): Number of rows per block.
+        n_jobs (int): Number of worker threads (default: all CPUs).
+    Returns:
+        dict: 'genes', 'threshold', and arrays aligned with genes: 'row_sums' (float64),
+            'mean_abs_difference', 'min', 'max', 'gained' / 'lost' (S x top_k positions of the
+            largest increases / decreases, strongest first) with 'gained_difference' /
+            'lost_difference', 'first_only' / 'second_only' (number of edges in only one network)
+            and 'rewired', a DataFrame of those edges (gene_a, gene_b, first, second, difference,
+            network) with every edge once
+    """
+    size = len(first_rows) if first_rows is not None else first.shape[0]
+    genes = pd.Index(genes) if genes is not None else pd.RangeIndex(size)
+    return _run({'comparison': (first, second, first_rows, second_rows, genes)},
+                threshold, inclusive, top_k, block_size, n_jobs)['comparison']
+
+
+def _tissue_comparison(tissue: str, absolute: bool, tissue_dir: str | os.PathLike, h5_path: str | os.PathLike) -> tuple:
+    genes, tissue_rows, global_rows = ms.shared_gene_indices(tissue, tissue_dir, h5_path)
+    return (ms.load_matrix('TEC', absolute, h5_path), ms.load_tissue_matrix(tissue, absolute, tissue_dir, h5_path),
+            global_rows, tissue_rows, genes)
+
+
+def tissue_view(
+    tissue: str,
+    absolute: bool = False,
+    tissue_dir: str | os.PathLike = ms.TISSUE_DIR,
+    h5_path: str | os.PathLike = ms.DEFAULT_H5
+) -> DifferenceView:
+    """Lazy global minus tissue TEC over the shared genes (sorted), as ms.tissue_difference without the copy"""
+    first, second, first_rows, second_rows, _ = _tissue_comparison(tissue, absolute, tissue_dir, h5_path)
+    return DifferenceView(first, second, first_rows, second_rows)
+
+
+def compare_all(
+    tissues: tuple = None,
+    tec_vs_rna: bool = True,
+    absolute: bool = False,
+    threshold: float = DEFAULT_THRESHOLD,
+    inclusive: bool = True,
+    top_k: int = 10,
+    block_size: int = 1024,
+    n_jobs: int = None,
+    tissue_dir: str | os.PathLike = ms.TISSUE_DIR,
+    h5_path: str | os.PathLike = ms.DEFAULT_H5
+) -> dict:
+    """
+    TEC vs RNA and global vs tissue-specific TEC differential networks in one parallel pass
+    --------------------------
+    Args:
+        tissues (tuple): Tissues to compare with the global TEC (every tissue file if None, none if ()).
+        tec_vs_rna (bool): Include TEC - RNA over all genes.
+        absolute (bool): Compare absolute correlations if True, signed correlations otherwise.
+        threshold (float): Network threshold on the absolute correlations (no rewiring if None).
+        inclusive (bool): Edges have weights >= threshold if True, otherwise weights > threshold.
+        top_k (int): Number of gained and lost partners kept per gene.
+        block_size (int): Number of rows per block.
+        n_jobs (int): Number of worker threads (default: all CPUs).
+        tissue_dir (str | os.PathLike): Directory of the tissue .rda files.
+        h5_path (str | os.PathLike): Path to the HDF5 file of the global matrices.
+    Returns:
+        dict: 'TEC_vs_RNA' (first = TEC) and tissue name (first = global TEC, second = tissue)
+            -> result of compare()
+    """
+    comparisons = dict()
+    if tec_vs_rna:
+        comparisons['TEC_vs_RNA'] = (ms.load_matrix('TEC', absolute, h5_path), ms.load_matrix('RNA', absolute, h5_path),
+                                     None, None, ms.load_genes('TEC', h5_path))
+    if tissues is None:
+        tissues = tuple(ms.tissue_files(tissue_dir))
+    for tissue in tissues:
+        comparisons[tissue] = _tissue_comparison(tissue, absolute, tissue_dir, h5_path)
+    return _run(comparisons, threshold, inclusive, top_k, block_size, n_jobs)
+
+
+def gene_table(result: dict) -> pd.DataFrame:
+    """
+    Per-gene summary of a compare() result
+    --------------------------
+    Args:
+        result (dict): Result of compare() or one entry of compare_all().
+    Returns:
+        pd.DataFrame: Indexed by gene: row_sum, mean_abs_difference, min, max, top_gained,
+            top_lost (partner genes of the largest changes) and, with a threshold, first_only,
+            second_only and rewired (their sum)
+    """
+    genes = result['genes']
+    table = pd.DataFrame({
+        'row_sum': result['row_sums'],
+        'mean_abs_difference': result['mean_abs_difference'],
+        'min': result['min'],
+        'max': result['max'],
+        'top_gained': genes[result['gained'][:, 0]] if result['gained'].shape[1] else None,
+        'top_lost': genes[result['lost'][:, 0]] if result['lost'].shape[1] else None
+    }, index=genes)
+    if result['threshold'] is not None:
+        table['first_only'] = result['first_only']
+        table['second_only'] = result['second_only']
+        table['rewired'] = result['first_only'] + result['second_only']
+    return table
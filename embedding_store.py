@@ -0,0 +1,126 @@
+"""
+On-disk store of trained GNN embeddings keyed by threshold and hyperparameters.
+
+Every entry holds the float32 embedding matrix (loaded memory-mapped), the model weights and a
+JSON record of the threshold, hyperparameters and training history, so downstream clustering and
+link-prediction stages load the embeddings of a configuration instead of retraining it, and a
+new threshold can be warm-started from the weights of the nearest threshold already trained
+with the same hyperparameters. Unfinished runs keep a training checkpoint next to the entry.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import torch
+
+DEFAULT_DIR = Path(__file__).resolve().parent / 'analysis_results' / 'gnn_embeddings'
+
+
+def _params_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class EmbeddingStore:
+    def __init__(self, directory: str | os.PathLike = DEFAULT_DIR):
+        """
+        Directory of trained embeddings, three files per entry ({key}.npy, .pt and .json)
+        --------------------------
+        Args:
+            directory (str | os.PathLike): Store directory (created if missing).
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, threshold: float, params: dict) -> str:
+        """Entry key: hash of the threshold and the hyperparameters (including the data hash)"""
+        digest = hashlib.sha256(f'{float(threshold)!r}'.encode())
+        digest.update(_params_key(params).encode())
+        return digest.hexdigest()[:24]
+
+    def checkpoint_path(self, threshold: float, params: dict) -> Path:
+        """Training checkpoint of an entry that has not finished yet"""
+        return self.directory / f'{self.key(threshold, params)}.ckpt'
+
+    def index_path(self, threshold: float, params: dict) -> Path:
+        """Nearest-neighbor index of an entry's embeddings (see ann_index)"""
+        return self.directory / f'{self.key(threshold, params)}.ivf.npz'
+
+    def contains(self, threshold: float, params: dict) -> bool:
+        """Whether embeddings are stored for this threshold and hyperparameters"""
+        return (self.directory / f'{self.key(threshold, params)}.json').exists()
+
+    def save(
+        self,
+        threshold: float,
+        params: dict,
+        embeddings: np.ndarray,
+        state_dict: dict,
+        history: dict = None,
+        warm_start_from: float = None
+    ):
+        """
+        Save an entry (the JSON record is written last, so a partial entry is never listed) and
+        delete its training checkpoint
+        --------------------------
+        Args:
+            threshold (float): Network threshold.
+            params (dict): JSON-serializable hyperparameters.
+            embeddings (np.ndarray): N x D embeddings.
+            state_dict (dict): Trained model weights.
+            history (dict): JSON-serializable training history (losses, times, ...).
+            warm_start_from (float): Threshold whose weights initialized the model, if any.
+        """
+        key = self.key(threshold, params)
+        base = self.directory / key
+        np.save(base.with_suffix('.tmp.npy'), np.ascontiguousarray(embeddings, dtype=np.float32))
+        os.replace(base.with_suffix('.tmp.npy'), base.with_suffix('.npy'))
+        torch.save({name: tensor.cpu() for name, tensor in state_dict.items()}, base.with_suffix('.tmp'))
+        os.replace(base.with_suffix('.tmp'), base.with_suffix('.pt'))
+        record = {'threshold': float(threshold), 'params': json.loads(_params_key(params)),
+                  'warm_start_from': warm_start_from, 'history': history or dict()}
+        with open(base.with_suffix('.json.tmp'), 'w') as f:
+            json.dump(record, f, indent=2)
+        os.replace(base.with_suffix('.json.tmp'), base.with_suffix('.json'))
+        self.checkpoint_path(threshold, params).unlink(missing_ok=True)
+
+    def load(self, threshold: float, params: dict) -> dict:
+        """
+        Look up an entry
+        --------------------------
+        Args:
+            threshold (float): Network threshold.
+            params (dict): Hyperparameters the entry was saved with.
+        Returns:
+            dict: 'embeddings' (memory-mapped N x D float32), 'threshold', 'params',
+                'warm_start_from' and 'history', None if the entry does not exist
+        """
+        base = self.directory / self.key(threshold, params)
+        try:
+            with open(base.with_suffix('.json'), 'r') as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        record['embeddings'] = np.load(base.with_suffix('.npy'), mmap_mode='r')
+        return record
+
+    def load_state_dict(self, threshold: float, params: dict) -> dict:
+        """Trained model weights of an entry"""
+        return torch.load(self.directory / f'{self.key(threshold, params)}.pt', weights_only=True)
+
+    def entries(self) -> list[dict]:
+        """JSON records of all stored entries"""
+        records = []
+        for path in sorted(self.directory.glob('*.json')):
+            with open(path, 'r') as f:
+                records.append(json.load(f))
+        return records
+
+    def nearest(self, threshold: float, params: dict) -> float:
+        """Closest stored threshold trained with the same hyperparameters, None if there is none"""
+        params = json.loads(_params_key(params))
+        thresholds = [record['threshold'] for record in self.entries()
+                      if record['params'] == params and record['threshold'] != float(threshold)]
+        return min(thresholds, key=lambda t: abs(t - threshold)) if thresholds else None
@@ -0,0 +1,169 @@
+"""
+Blocked cosine-similarity link prediction over node embeddings.
+
+Similarities are computed one block of rows at a time across a thread pool (NumPy releases the
+GIL inside matrix products), so peak memory is n_jobs x block_size x N floats rather than a
+dense N x N matrix. Above-threshold pairs are only counted; the pairs themselves are kept in a
+bounded global top-k buffer and a per-row top-k table.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+EDGE_DTYPE = np.dtype([('source', np.int32), ('target', np.int32), ('similarity', np.float32)])
+
+
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Scale every embedding to unit length so inner products are cosine similarities
+    --------------------------
+    Args:
+        embeddings (np.ndarray): N x D embedding matrix.
+    Returns:
+        np.ndarray: N x D float32 matrix with unit-norm rows (all-zero rows stay zero)
+    """
+    z = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(z, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(z / norms)
+
+
+def _top_edges(sources: np.ndarray, targets: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+    """Edge table of the k highest scores, sorted by decreasing similarity"""
+    k = max(k, 0)
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k] if k > 0 else np.empty(0, dtype=np.intp)
+        sources, targets, scores = sources[keep], targets[keep], scores[keep]
+    table = np.empty(len(scores), dtype=EDGE_DTYPE)
+    table['source'], table['target'], table['similarity'] = sources, targets, scores
+    return table[np.argsort(-table['similarity'], kind='stable')]
+
+
+def _score_block(z: np.ndarray, start: int, stop: int, threshold: float, top_k: int, global_top_k: int) -> dict:
+    n = z.shape[0]
+    b = stop - start
+    local = np.arange(b)
+    sims = z[start:stop] @ z.T
+    sims[local, start + local] = -np.inf # no self links
+
+    # per-row top-k over all other nodes
+    k = min(top_k, n - 1)
+    row_idx = np.argpartition(-sims, k - 1, axis=1)[:, :k] if k > 0 else np.empty((b, 0), dtype=np.intp)
+    row_scores = np.take_along_axis(sims, row_idx, axis=1)
+    order = np.argsort(-row_scores, axis=1, kind='stable')
+    row_idx = np.take_along_axis(row_idx, order, axis=1)
+    row_scores = np.take_along_axis(row_scores, order, axis=1)
+
+    # pair statistics over the upper triangle (i < j) so every pair is seen once
+    upper = sims[:, start:]
+    upper[np.tril_indices(b)] = -np.inf
+    above = upper > threshold
+    positive = upper > 0
+    r, c = np.nonzero(above)
+    candidates = _top_edges(r + start, c + start, upper[r, c], global_top_k)
+    return {
+        'start': start,
+        'row_idx': row_idx.astype(np.int32),
+        'row_scores': row_scores.astype(np.float32),
+        'num_above': int(np.count_nonzero(above)),
+        'positive_sum': float(upper.sum(where=positive, dtype=np.float64)),
+        'positive_count': int(np.count_nonzero(positive)),
+        'candidates': candidates
+    }
+
+
+def predict_links(
+    embeddings: np.ndarray,
+    threshold: float = 0.8,
+    top_k: int = 10,
+    global_top_k: int = 1000,
+    block_size: int = 512,
+    n_jobs: int = None
+) -> dict:
+    """
+    Cosine-similarity link prediction without materializing the N x N similarity matrix
+    --------------------------
+    Args:
+        embeddings (np.ndarray): N x D embedding matrix.
+        threshold (float): Pairs with similarity > threshold count as high-confidence predictions.
+        top_k (int): Number of most similar nodes kept for every node.
+        global_top_k (int): Number of highest-scoring above-threshold pairs kept overall.
+        block_size (int): Number of rows scored per block.
+        n_jobs (int): Number of worker threads (default: all CPUs).
+    Returns:
+        dict: 'num_above_threshold' (pairs i < j above threshold), 'mean_similarity' (mean
+            of the positive pairwise similarities), 'top_edges' (EDGE_DTYPE table sorted by
+            similarity), 'row_top_indices' and 'row_top_scores' (N x top_k arrays)
+    """
+    z = normalize_embeddings(embeddings)
+    n = z.shape[0]
+    k = min(top_k, max(n - 1, 0))
+    row_top_indices = np.empty((n, k), dtype=np.int32)
+    row_top_scores = np.empty((n, k), dtype=np.float32)
+    top_edges = np.empty(0, dtype=EDGE_DTYPE)
+    num_above, positive_sum, positive_count = 0, 0.0, 0
+
+    starts = range(0, n, block_size)
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        blocks = pool.map(
+            lambda start: _score_block(z, start, min(start + block_size, n), threshold, k, global_top_k),
+            starts
+        )
+        for block in blocks:
+            stop = block['start'] + len(block['row_idx'])
+            row_top_indices[block['start']:stop] = block['row_idx']
+            row_top_scores[block['start']:stop] = block['row_scores']
+            num_above += block['num_above']
+            positive_sum += block['positive_sum']
+            positive_count += block['positive_count']
+            merged = np.concatenate([top_edges, block['candidates']]) # bounded by 2 x global_top_k
+            top_edges = _top_edges(merged['source'], merged['target'], merged['similarity'], global_top_k)
+
+    return {
+        'num_above_threshold': num_above,
+        'mean_similarity': positive_sum / positive_count if positive_count else 0.0,
+        'top_edges': top_edges,
+        'row_top_indices': row_top_indices,
+        'row_top_scores': row_top_scores
+    }
+
+
+def edges_to_frame(edges: np.ndarray, gene_names: list[str] = None) -> pd.DataFrame:
+    """
+    Convert an edge table into a DataFrame, optionally adding gene names for both endpoints
+    --------------------------
+    Args:
+        edges (np.ndarray): EDGE_DTYPE table.
+        gene_names (list[str]): Gene name of every node index.
+    Returns:
+        pd.DataFrame: Columns source, target, similarity (and source_gene, target_gene)
+    """
+    frame = pd.DataFrame({name: edges[name] for name in EDGE_DTYPE.names})
+    if gene_names is not None:
+        names = np.asarray(gene_names, dtype=object)
+        frame['source_gene'] = names[edges['source']]
+        frame['target_gene'] = names[edges['target']]
+    return frame
+
+
+def save_edges(path: str | os.PathLike, edges: np.ndarray, gene_names: list[str] = None) -> Path:
+    """
+    Save an edge table as .npy (structured array) or .parquet (requires pyarrow or fastparquet)
+    --------------------------
+    Args:
+        path (str | os.PathLike): Output file, format chosen by its suffix.
+        edges (np.ndarray): EDGE_DTYPE table.
+        gene_names (list[str]): Gene names added as columns in Parquet output.
+    Returns:
+        Path: Output file
+    """
+    path = Path(path)
+    if path.suffix == '.parquet':
+        edges_to_frame(edges, gene_names).to_parquet(path, index=False)
+    else:
+        np.save(path, edges)
+    return path
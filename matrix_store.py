@@ -0,0 +1,446 @@
+"""
+Shared, memory-mapped access to the TEC and RNA correlation matrices and the tissue TEC matrices.
+
+The HDF5 tables are decoded once into float32 .npy files (signed and absolute value) plus a
+gene index sidecar. Every later load is a read-only np.memmap of that cache, and repeated
+loads within a process return the same view, so all analyses share one copy of the data
+through the OS page cache instead of holding their own 1 GB float64 arrays. The tissue-specific
+TEC matrices (data/tissue_TEC/*.rda) are converted into the same format, together with the
+position of every tissue gene in the global gene index, so aligning a tissue with the global
+matrix is an integer gather rather than a label-based DataFrame copy.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path(__file__).resolve().parent / 'data'
+DEFAULT_H5 = DATA_DIR / 'gene_network_data.h5'
+TISSUE_DIR = DATA_DIR / 'tissue_TEC'
+MATRIX_NAMES = ('TEC', 'RNA')
+
+_open_matrices = dict() # (cache path) -> shared read-only memmap
+_open_genes = dict()
+
+
+def cache_dir_for(h5_path: str | os.PathLike = DEFAULT_H5) -> Path:
+    """
+    Directory holding the binary cache of an HDF5 file (next to the file itself)
+    --------------------------
+    Args:
+        h5_path (str | os.PathLike): Path to the HDF5 file.
+    Returns:
+        Path: Cache directory, e.g. data/gene_network_data.cache
+    """
+    h5_path = Path(h5_path)
+    return h5_path.with_name(h5_path.stem + '.cache')
+
+
+def _matrix_file(cache_dir: Path, name: str, absolute: bool) -> Path:
+    return cache_dir / f"{name}{'.abs' if absolute else ''}.f32.npy"
+
+
+def _source_signature(h5_path: Path) -> dict:
+    stat = h5_path.stat()
+    return {'source': str(h5_path.resolve()), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _cache_is_fresh(h5_path: Path, cache_dir: Path, name: str) -> bool:
+    manifest = cache_dir / f'{name}.json'
+    if not manifest.exists():
+        return False
+    with open(manifest, 'r') as f:
+        recorded = json.load(f)
+    if not h5_path.exists(): # cache shipped without the source file is still usable
+        return True
+    return recorded.get('signature') == _source_signature(h5_path)
+
+
+def _write_matrix(
+    cache_dir: Path,
+    name: str,
+    frame: pd.DataFrame,
+    source_path: Path,
+    block_size: int = 1024,
+    manifest: dict = None
+):
+    values = frame.to_numpy(copy=False)
+    n = values.shape[0]
+
+    # write to temporary files first so an interrupted conversion never looks complete
+    targets = {absolute: _matrix_file(cache_dir, name, absolute) for absolute in (False, True)}
+    partial = {absolute: path.with_suffix('.partial') for absolute, path in targets.items()}
+    signed = np.lib.format.open_memmap(partial[False], mode='w+', dtype=np.float32, shape=values.shape)
+    absolute = np.lib.format.open_memmap(partial[True], mode='w+', dtype=np.float32, shape=values.shape)
+    digest = hashlib.sha256()
+    for start in range(0, n, block_size):
+        block = values[start:start + block_size].astype(np.float32)
+        signed[start:start + block_size] = block
+        absolute[start:start + block_size] = np.abs(block)
+        digest.update(np.ascontiguousarray(block).tobytes())
+    signed.flush()
+    absolute.flush()
+    del signed, absolute, values
+
+    for key in targets:
+        os.replace(partial[key], targets[key])
+    gene_text = '\n'.join(map(str, frame.columns)) + '\n'
+    digest.update(gene_text.encode())
+    with open(cache_dir / f'{name}.genes.txt', 'w') as f:
+        f.write(gene_text)
+    with open(cache_dir / f'{name}.json', 'w') as f:
+        json.dump({'shape': list(frame.shape), 'dtype': 'float32', 'signature': _source_signature(source_path),
+                   'sha256': digest.hexdigest(), **(manifest or dict())}, f, indent=2)
+
+    # drop stale views of the previous cache
+    for absolute_flag in (False, True):
+        _open_matrices.pop(str(targets[absolute_flag]), None)
+    _open_genes.pop(str(cache_dir / f'{name}.genes.txt'), None)
+
+
+def build_cache(
+    h5_path: str | os.PathLike = DEFAULT_H5,
+    names: tuple = MATRIX_NAMES,
+    block_size: int = 1024,
+    force: bool = False
+) -> Path:
+    """
+    Convert HDF5 correlation tables into the float32 memory-mapped cache. Each table is decoded
+    once and written in row blocks as a signed and an absolute-value matrix, alongside a gene
+    index sidecar and a manifest recording the source file it was built from
+    --------------------------
+    Args:
+        h5_path (str | os.PathLike): Path to the HDF5 file.
+        names (tuple): Keys of the tables to convert.
+        block_size (int): Number of rows converted per block.
+        force (bool): Rebuild even if the cache is up to date.
+    Returns:
+        Path: Cache directory
+    """
+    h5_path = Path(h5_path)
+    cache_dir = cache_dir_for(h5_path)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        if not force and _cache_is_fresh(h5_path, cache_dir, name):
+            continue
+        with pd.HDFStore(h5_path, mode='r') as store:
+            frame = store[name]
+        _write_matrix(cache_dir, name, frame, h5_path, block_size)
+        del frame
+    return cache_dir
+
+
+def load_matrix(name: str, absolute: bool = True, h5_path: str | os.PathLike = DEFAULT_H5) -> np.memmap:
+    """
+    Return the shared read-only float32 view of a correlation matrix, building the cache on
+    first use. Thresholds are compared against float32 values
+    --------------------------
+    Args:
+        name (str): Table name ('TEC' or 'RNA').
+        absolute (bool): Return absolute correlations if True, signed correlations otherwise.
+        h5_path (str | os.PathLike): Path to the HDF5 file.
+    Returns:
+        np.memmap: N x N read-only float32 matrix
+    """
+    h5_path = Path(h5_path)
+    cache_dir = cache_dir_for(h5_path)
+    path = _matrix_file(cache_dir, name, absolute)
+    if str(path) not in _open_matrices:
+        if not _cache_is_fresh(h5_path, cache_dir, name) or not path.exists():
+            build_cache(h5_path, names=(name,), force=True)
+        _open_matrices[str(path)] = np.load(path, mmap_mode='r')
+    return _open_matrices[str(path)]
+
+
+def load_genes(name: str = 'TEC', h5_path: str | os.PathLike = DEFAULT_H5) -> pd.Index:
+    """
+    Return the gene names labelling the rows and columns of a correlation matrix
+    --------------------------
+    Args:
+        name (str): Table name ('TEC' or 'RNA').
+        h5_path (str | os.PathLike): Path to the HDF5 file.
+    Returns:
+        pd.Index: Gene names in matrix order
+    """
+    h5_path = Path(h5_path)
+    cache_dir = cache_dir_for(h5_path)
+    path = cache_dir / f'{name}.genes.txt'
+    if str(path) not in _open_genes:
+        if not _cache_is_fresh(h5_path, cache_dir, name) or not path.exists():
+            build_cache(h5_path, names=(name,), force=True)
+        with open(path, 'r') as f:
+            _open_genes[str(path)] = pd.Index(f.read().splitlines())
+    return _open_genes[str(path)]
+
+
+def load_frame(name: str, absolute: bool = False, h5_path: str | os.PathLike = DEFAULT_H5) -> pd.DataFrame:
+    """
+    Return a gene-labelled DataFrame backed by the shared memory-mapped matrix (no copy)
+    --------------------------
+    Args:
+        name (str): Table name ('TEC' or 'RNA').
+        absolute (bool): Return absolute correlations if True, signed correlations otherwise.
+        h5_path (str | os.PathLike): Path to the HDF5 file.
+    Returns:
+        pd.DataFrame: N x N float32 DataFrame indexed by gene name on both axes
+    """
+    genes = load_genes(name, h5_path)
+    return pd.DataFrame(load_matrix(name, absolute, h5_path), index=genes, columns=genes, copy=False)
+
+
+def data_hash(name: str, h5_path: str | os.PathLike = DEFAULT_H5, block_size: int = 1024) -> str:
+    """
+    Content hash of a cached matrix (float32 values and gene names), recorded in the cache
+    manifest when the cache is built so it is not recomputed on every run
+    --------------------------
+    Args:
+        name (str): Table name ('TEC' or 'RNA').
+        h5_path (str | os.PathLike): Path to the HDF5 file.
+        block_size (int): Number of rows hashed per block (caches built without a hash only).
+    Returns:
+        str: SHA-256 hex digest
+    """
+    h5_path = Path(h5_path)
+    cache_dir = cache_dir_for(h5_path)
+    manifest = cache_dir / f'{name}.json'
+    if not _cache_is_fresh(h5_path, cache_dir, name):
+        build_cache(h5_path, names=(name,), force=True)
+    with open(manifest, 'r') as f:
+        recorded = json.load(f)
+    if 'sha256' not in recorded: # cache written before hashes were recorded
+        values = load_matrix(name, absolute=False, h5_path=h5_path)
+        digest = hashlib.sha256()
+        for start in range(0, values.shape[0], block_size):
+            digest.update(np.ascontiguousarray(values[start:start + block_size]).tobytes())
+        with open(cache_dir / f'{name}.genes.txt', 'rb') as f:
+            digest.update(f.read())
+        recorded['sha256'] = digest.hexdigest()
+        with open(manifest, 'w') as f:
+            json.dump(recorded, f, indent=2)
+    return recorded['sha256']
+
+
+def tissue_files(tissue_dir: str | os.PathLike = TISSUE_DIR) -> dict:
+    """
+    Tissue-specific TEC matrices available as .rda files
+    --------------------------
+    Args:
+        tissue_dir (str | os.PathLike): Directory of the .rda files (e.g. human_lung_TE_rho.rda).
+    Returns:
+        dict: Tissue name (e.g. 'lung') -> .rda path, sorted by name
+    """
+    files = dict()
+    for path in sorted(Path(tissue_dir).glob('*.rda')):
+        tissue = path.stem.removeprefix('human_').removesuffix('_TE_rho')
+        files[tissue] = path
+    return files
+
+
+def tissue_cache_dir(tissue_dir: str | os.PathLike = TISSUE_DIR) -> Path:
+    """Directory holding the binary cache of the tissue matrices, e.g. data/tissue_TEC.cache"""
+    tissue_dir = Path(tissue_dir)
+    return tissue_dir.with_name(tissue_dir.name + '.cache')
+
+
+def build_tissue_cache(
+    tissue_dir: str | os.PathLike = TISSUE_DIR,
+    tissues: tuple = None,
+    h5_path: str | os.PathLike = DEFAULT_H5,
+    object_name: str = 'human_TE_rho',
+    block_size: int = 1024,
+    force: bool = False
+) -> Path:
+    """
+    Convert tissue TEC .rda files into the same float32 memory-mapped format as the main
+    matrices (dummy gene removed), with the position of every tissue gene in the global TEC
+    gene index saved next to each matrix
+    --------------------------
+    Args:
+        tissue_dir (str | os.PathLike): Directory of the .rda files.
+        tissues (tuple): Tissues to convert (all files in tissue_dir if None).
+        h5_path (str | os.PathLike): Path to the HDF5 file of the global matrices.
+        object_name (str): Name of the R data frame inside each .rda file.
+        block_size (int): Number of rows converted per block.
+        force (bool): Rebuild even if the cache is up to date.
+    Returns:
+        Path: Cache directory
+    """
+    files = tissue_files(tissue_dir)
+    cache_dir = tissue_cache_dir(tissue_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for tissue in tissues or tuple(files):
+        rda_path = files[tissue]
+        if force or not _cache_is_fresh(rda_path, cache_dir, tissue):
+            import pyreadr # only needed to convert the .rda files
+            frame = pyreadr.read_r(str(rda_path))[object_name]
+            frame = frame.iloc[:-1, :-1] # remove dummy gene
+            _write_matrix(cache_dir, tissue, frame, rda_path, block_size)
+            del frame
+        _write_global_index(cache_dir, tissue, h5_path)
+    return cache_dir
+
+
+def _write_global_index(cache_dir: Path, tissue: str, h5_path: str | os.PathLike):
+    manifest = cache_dir / f'{tissue}.json'
+    with open(manifest, 'r') as f:
+        recorded = json.load(f)
+    global_hash = data_hash('TEC', h5_path)
+    index_file = cache_dir / f'{tissue}.global_index.npy'
+    if recorded.get('global_sha256') == global_hash and index_file.exists():
+        return
+    with open(cache_dir / f'{tissue}.genes.txt', 'r') as f:
+        genes = pd.Index(f.read().splitlines())
+    np.save(index_file, load_genes('TEC', h5_path).get_indexer(genes).astype(np.int64))
+    recorded['global_sha256'] = global_hash
+    with open(manifest, 'w') as f:
+        json.dump(recorded, f, indent=2)
+    _open_matrices.pop(str(index_file), None)
+
+
+def _ensure_tissue(tissue: str, tissue_dir: str | os.PathLike, h5_path: str | os.PathLike) -> Path:
+    cache_dir = tissue_cache_dir(tissue_dir)
+    rda_path = Path(tissue_dir) / f'human_{tissue}_TE_rho.rda'
+    if not _cache_is_fresh(rda_path, cache_dir, tissue) or not (cache_dir / f'{tissue}.global_index.npy').exists():
+        build_tissue_cache(tissue_dir, tissues=(tissue,), h5_path=h5_path)
+    return cache_dir
+
+
+def load_tissue_matrix(
+    tissue: str,
+    absolute: bool = True,
+    tissue_dir: str | os.PathLike = TISSUE_DIR,
+    h5_path: str | os.PathLike = DEFAULT_H5
+) -> np.memmap:
+    """
+    Return the shared read-only float32 view of a tissue TEC matrix, converting it on first use
+    --------------------------
+    Args:
+        tissue (str): Tissue name (e.g. 'lung').
+        absolute (bool): Return absolute correlations if True, signed correlations otherwise.
+        tissue_dir (str | os.PathLike): Directory of the .rda files.
+        h5_path (str | os.PathLike): Path to the HDF5 file of the global matrices.
+    Returns:
+        np.memmap: M x M read-only float32 matrix
+    """
+    path = _matrix_file(tissue_cache_dir(tissue_dir), tissue, absolute)
+    if str(path) not in _open_matrices:
+        _ensure_tissue(tissue, tissue_dir, h5_path)
+        _open_matrices[str(path)] = np.load(path, mmap_mode='r')
+    return _open_matrices[str(path)]
+
+
+def load_tissue_genes(
+    tissue: str,
+    tissue_dir: str | os.PathLike = TISSUE_DIR,
+    h5_path: str | os.PathLike = DEFAULT_H5
+) -> pd.Index:
+    """
+    Return the gene names labelling the rows and columns of a tissue TEC matrix
+    --------------------------
+    Args:
+        tissue (str): Tissue name (e.g. 'lung').
+        tissue_dir (str | os.PathLike): Directory of the .rda files.
+        h5_path (str | os.PathLike): Path to the HDF5 file of the global matrices.
+    Returns:
+        pd.Index: Gene names in matrix order
+    """
+    path = tissue_cache_dir(tissue_dir) / f'{tissue}.genes.txt'
+    if str(path) not in _open_genes:
+        _ensure_tissue(tissue, tissue_dir, h5_path)
+        with open(path, 'r') as f:
+            _open_genes[str(path)] = pd.Index(f.read().splitlines())
+    return _open_genes[str(path)]
+
+
+def tissue_global_index(
+    tissue: str,
+    tissue_dir: str | os.PathLike = TISSUE_DIR,
+    h5_path: str | os.PathLike = DEFAULT_H5
+) -> np.ndarray:
+    """
+    Position of every tissue gene in the global TEC gene index
+    --------------------------
+    Args:
+        tissue (str): Tissue name (e.g. 'lung').
+        tissue_dir (str | os.PathLike): Directory of the .rda files.
+        h5_path (str | os.PathLike): Path to the HDF5 file of the global matrices.
+    Returns:
+        np.ndarray: int64 global row of each tissue gene, -1 for genes missing from the global matrix
+    """
+    cache_dir = _ensure_tissue(tissue, tissue_dir, h5_path)
+    _write_global_index(cache_dir, tissue, h5_path) # refreshed if the global matrix changed
+    path = cache_dir / f'{tissue}.global_index.npy'
+    if str(path) not in _open_matrices:
+        _open_matrices[str(path)] = np.load(path)
+    return _open_matrices[str(path)]
+
+
+def shared_gene_indices(
+    tissue: str,
+    tissue_dir: str | os.PathLike = TISSUE_DIR,
+    h5_path: str | os.PathLike = DEFAULT_H5
+) -> tuple[pd.Index, np.ndarray, np.ndarray]:
+    """
+    Genes present in both a tissue matrix and the global matrix, in sorted name order
+    --------------------------
+    Args:
+        tissue (str): Tissue name (e.g. 'lung').
+        tissue_dir (str | os.PathLike): Directory of the .rda files.
+        h5_path (str | os.PathLike): Path to the HDF5 file of the global matrices.
+    Returns:
+        tuple: (shared gene names, their rows in the tissue matrix, their rows in the global matrix)
+    """
+    genes = load_tissue_genes(tissue, tissue_dir, h5_path)
+    global_index = tissue_global_index(tissue, tissue_dir, h5_path)
+    tissue_rows = np.flatnonzero(global_index >= 0)
+    tissue_rows = tissue_rows[np.argsort(genes[tissue_rows].to_numpy(), kind='stable')]
+    return genes[tissue_rows], tissue_rows, global_index[tissue_rows]
+
+
+def aligned_submatrix(matrix: np.ndarray, rows: np.ndarray, block_size: int = 1024) -> np.ndarray:
+    """
+    Gather matrix[rows][:, rows] from a (memory-mapped) matrix one block of rows at a time
+    --------------------------
+    Args:
+        matrix (np.ndarray): Square matrix, e.g. from load_matrix or load_tissue_matrix.
+        rows (np.ndarray): Row / column indices to keep, in output order.
+        block_size (int): Number of rows gathered per block.
+    Returns:
+        np.ndarray: len(rows) x len(rows) float32 matrix
+    """
+    out = np.empty((len(rows), len(rows)), dtype=np.float32)
+    for start in range(0, len(rows), block_size):
+        out[start:start + block_size] = matrix[rows[start:start + block_size]][:, rows]
+    return out
+
+
+def tissue_difference(
+    tissue: str,
+    absolute: bool = False,
+    tissue_dir: str | os.PathLike = TISSUE_DIR,
+    h5_path: str | os.PathLike = DEFAULT_H5,
+    block_size: int = 1024
+) -> tuple[np.ndarray, pd.Index]:
+    """
+    Global minus tissue-specific TEC over the genes both matrices share
+    --------------------------
+    Args:
+        tissue (str): Tissue name (e.g. 'lung').
+        absolute (bool): Compare absolute correlations if True, signed correlations otherwise.
+        tissue_dir (str | os.PathLike): Directory of the .rda files.
+        h5_path (str | os.PathLike): Path to the HDF5 file of the global matrices.
+        block_size (int): Number of rows gathered per block.
+    Returns:
+        tuple: (S x S float32 difference, shared gene names in sorted order)
+    """
+    genes, tissue_rows, global_rows = shared_gene_indices(tissue, tissue_dir, h5_path)
+    global_mat = load_matrix('TEC', absolute, h5_path)
+    tissue_mat = load_tissue_matrix(tissue, absolute, tissue_dir, h5_path)
+    diff = aligned_submatrix(global_mat, global_rows, block_size)
+    for start in range(0, len(genes), block_size):
+        diff[start:start + block_size] -= tissue_mat[tissue_rows[start:start + block_size]][:, tissue_rows]
+    return diff, genes
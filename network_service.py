@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Local query service over the TEC and RNA co-expression networks.
+
+The correlation matrices (shared memory-mapped cache), gene index, per-gene degree indexes and,
+if trained, the nearest-neighbor index of the GNN embeddings are loaded once at startup.
+Thresholded networks are built on first use as CSRGraphs and kept in a bounded LRU cache, so
+repeated questions about the same threshold cost a lookup. A threaded stdlib HTTP server (on
+localhost or a Unix socket, nothing leaves the machine) answers GET requests with JSON:
+
+    /neighbors?gene=PKM&threshold=0.8&network=TEC     neighbors and edge weights
+    /degree?gene=PKM&thresholds=0.5,0.75,0.9          degree at any thresholds (degree index)
+    /path?source=PKM&target=CCT3&threshold=0.75       unweighted shortest path
+    /jaccard?gene=PKM&threshold=0.75                  overlap of the TEC and RNA neighborhoods
+    /similar?gene=PKM&k=10                            nearest genes in the GNN embedding space
+    /metrics                                          response times and graph cache counters
+    /health
+
+gene may list several comma-separated genes. Run `python network_service.py --help` for options.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from scipy.sparse import csgraph
+
+import ann_index
+import degree_index as di
+import matrix_store as ms
+from csr_graph import CSRGraph
+from embedding_store import EmbeddingStore
+
+NETWORKS = ('TEC', 'RNA')
+LATENCY_WINDOW = 10000 # most recent response times kept per endpoint for the percentiles
+
+
+class QueryError(Exception):
+    """Invalid request, answered with status 400 (404 for unknown genes)"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyStats:
+    def __init__(self, window: int = LATENCY_WINDOW):
+        """Response-time counters of one endpoint (percentiles over the last window requests)"""
+        self.window = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float, error: bool = False):
+        with self._lock:
+            self.window.append(seconds)
+            self.count += 1
+            self.errors += int(error)
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def report(self) -> dict:
+        """'requests', 'errors', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms' and 'max_ms'"""
+        with self._lock:
+            recent = np.array(self.window)
+            count, errors, total, slowest = self.count, self.errors, self.total, self.max
+        p50, p95, p99 = np.percentile(recent, [50, 95, 99]) * 1000 if len(recent) else (None, None, None)
+        return {'requests': count, 'errors': errors, 'mean_ms': total / count * 1000 if count else None,
+                'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': slowest * 1000}
+
+
+class GraphCache:
+    def __init__(self, matrices: dict, genes, max_graphs: int = 8, min_threshold: float = di.DEFAULT_FLOOR):
+        """
+        Thresholded networks built on first use, least recently used evicted beyond max_graphs
+        --------------------------
+        Args:
+            matrices (dict): Network name -> absolute correlation matrix (may be a np.memmap).
+            genes (pd.Index): Gene name of every row.
+            max_graphs (int): Number of graphs kept.
+            min_threshold (float): Lowest threshold a graph is built for (bounds the memory of one graph).
+        """
+        self.matrices = matrices
+        self.genes = genes
+        self.max_graphs = max_graphs
+        self.min_threshold = min_threshold
+        self.graphs = OrderedDict() # (network, threshold) -> CSRGraph, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._building = dict() # (network, threshold) -> lock held while that graph is built
+
+    def get(self, network: str, threshold: float) -> CSRGraph:
+        """Graph of a network at a threshold (edges with weights >= threshold)"""
+        if network not in self.matrices:
+            raise QueryError(f'unknown network {network!r}, expected one of {list(self.matrices)}')
+        if not self.min_threshold <= threshold <= 1:
+            raise QueryError(f'threshold must be between {self.min_threshold} and 1, got {threshold}')
+        key = (network, threshold)
+        with self._lock:
+            if key in self.graphs:
+                self.hits += 1
+                self.graphs.move_to_end(key)
+                return self.graphs[key]
+            build_lock = self._building.setdefault(key, threading.Lock())
+        with build_lock: # concurrent requests for the same new graph build it once
+            with self._lock:
+                if key in self.graphs:
+                    self.hits += 1
+                    self.graphs.move_to_end(key)
+                    return self.graphs[key]
+                self.misses += 1
+            graph = CSRGraph.from_matrix(self.matrices[network], threshold, self.genes, f'{network}_{threshold}')
+            with self._lock:
+                self.graphs[key] = graph
+                self._building.pop(key, None)
+                while len(self.graphs) > self.max_graphs:
+                    self.graphs.popitem(last=False)
+                    self.evictions += 1
+        return graph
+
+    def report(self) -> dict:
+        """Cache counters and the resident graphs (least recently used first)"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'max_graphs': self.max_graphs,
+                    'graphs': [{'network': network, 'threshold': threshold, 'edges': graph.num_edges}
+                               for (network, threshold), graph in self.graphs.items()]}
+
+
+def _embedding_index(store_dir: str | os.PathLike, threshold: float, genes) -> ann_index.IVFIndex:
+    # nearest-neighbor index of the first stored embeddings trained at this threshold
+    store = EmbeddingStore(store_dir)
+    for record in store.entries():
+        if record['threshold'] == threshold:
+            return ann_index.load_index(store, threshold, record['params'], list(genes))
+    return None
+
+
+class NetworkService:
+    def __init__(
+        self,
+        h5_path: str | os.PathLike = ms.DEFAULT_H5,
+        max_graphs: int = 8,
+        min_threshold: float = di.DEFAULT_FLOOR,
+        embedding_dir: str | os.PathLike = None,
+        embedding_threshold: float = 0.75
+    ):
+        """
+        Data and query handlers of the service, everything loaded once
+        --------------------------
+        Args:
+            h5_path (str | os.PathLike): Path to the HDF5 file (decoded into the matrix cache once).
+            max_graphs (int): Number of thresholded graphs kept resident.
+            min_threshold (float): Lowest threshold answered (also the floor of the degree indexes).
+            embedding_dir (str | os.PathLike): EmbeddingStore directory (no /similar if None).
+            embedding_threshold (float): Network threshold of the embeddings queried by /similar.
+        """
+        ms.build_cache(h5_path=h5_path)
+        self.matrices = {name: ms.load_matrix(name, h5_path=h5_path) for name in NETWORKS}
+        self.genes = ms.load_genes('TEC', h5_path)
+        self.degree_indexes = {name: di.load_index(name, floor=min_threshold, h5_path=h5_path) for name in NETWORKS}
+        self.graphs = GraphCache(self.matrices, self.genes, max_graphs, min_threshold)
+        self.embeddings = _embedding_index(embedding_dir, embedding_threshold, self.genes) if embedding_dir else None
+        self.metrics = {endpoint: LatencyStats() for endpoint in self.endpoints()}
+        self.started = time.time()
+
+    def endpoints(self) -> dict:
+        """Path -> handler taking the parsed query parameters"""
+        return {'/neighbors': self.neighbors, '/degree': self.degree, '/path': self.path, '/jaccard': self.jaccard,
+                '/similar': self.similar, '/metrics': self.report, '/health': self.health}
+
+    def _node(self, gene: str) -> int:
+        node = self.genes.get_indexer([gene])[0]
+        if node < 0:
+            raise QueryError(f'unknown gene {gene!r}', status=404)
+        return int(node)
+
+    def neighbors(self, gene: list[str], threshold: float = 0.75, network: str = 'TEC') -> dict:
+        """Neighbors of genes at a threshold, strongest edges first"""
+        graph = self.graphs.get(network, threshold)
+        result = dict()
+        for name in gene:
+            node = self._node(name)
+            weights = graph.neighbor_weights(node)
+            order = np.argsort(-weights, kind='stable')
+            result[name] = [{'gene': graph.names[neighbor], 'weight': float(weight)}
+                            for neighbor, weight in zip(graph.neighbors(node)[order], weights[order])]
+        return {'network': network, 'threshold': threshold, 'neighbors': result}
+
+    def degree(self, gene: list[str], thresholds: list[float] = (0.75,), network: str = 'TEC') -> dict:
+        """Degrees of genes at any thresholds >= the index floor, without building a graph"""
+        if network not in self.degree_indexes:
+            raise QueryError(f'unknown network {network!r}, expected one of {list(self.degree_indexes)}')
+        index = self.degree_indexes[network]
+        try:
+            degrees = {name: index.gene_degrees(self._node(name), thresholds).tolist() for name in gene}
+        except ValueError as e: # threshold below the index floor
+            raise QueryError(str(e))
+        return {'network': network, 'thresholds': list(thresholds), 'degrees': degrees}
+
+    def path(self, source: list[str], target: list[str], threshold: float = 0.75, network: str = 'TEC') -> dict:
+        """Unweighted shortest path between two genes (BFS from the source)"""
+        graph = self.graphs.get(network, threshold)
+        start, stop = self._node(source[0]), self._node(target[0])
+        _, predecessors = csgraph.breadth_first_order(graph.to_sparse(), start, directed=True, return_predecessors=True)
+        if start != stop and predecessors[stop] < 0:
+            return {'network': network, 'threshold': threshold, 'path': None, 'length': None}
+        nodes = [stop]
+        while nodes[-1] != start:
+            nodes.append(predecessors[nodes[-1]])
+        return {'network': network, 'threshold': threshold, 'path': graph.names[nodes[::-1]].tolist(), 'length': len(nodes) - 1}
+
+    def jaccard(self, gene: list[str], threshold: float = 0.75) -> dict:
+        """Jaccard similarity of the TEC and RNA neighborhoods of genes (0.0 when both are empty)"""
+        tec, rna = self.graphs.get('TEC', threshold), self.graphs.get('RNA', threshold)
+        result = dict()
+        for name in gene:
+            node = self._node(name)
+            first, second = tec.neighbors(node), rna.neighbors(node) # same gene order in both matrices
+            union = len(np.union1d(first, second))
+            result[name] = len(np.intersect1d(first, second)) / union if union else 0.0
+        return {'threshold': threshold, 'jaccard': result}
+
+    def similar(self, gene: list[str], k: int = 10, exact: bool = False) -> dict:
+        """Nearest genes in the GNN embedding space (approximate unless exact)"""
+        if self.embeddings is None:
+            raise QueryError('no embedding index loaded (start the service with --embedding-dir)', status=404)
+        for name in gene:
+            self._node(name)
+        frame = self.embeddings.neighbors(gene, k, exact=exact)
+        return {'k': k, 'exact': exact, 'similar': {
+            name: [{'gene': row.neighbor, 'similarity': float(row.similarity)} for row in rows.itertuples()]
+            for name, rows in frame.groupby('query', sort=False)
+        }}
+
+    def health(self) -> dict:
+        """Liveness and uptime"""
+        return {'status': 'ok', 'uptime_seconds': time.time() - self.started, 'genes': len(self.genes)}
+
+    def report(self) -> dict:
+        """Response times per endpoint and graph cache counters"""
+        return {'endpoints': {endpoint: stats.report() for endpoint, stats in self.metrics.items()},
+                'graph_cache': self.graphs.report(), 'uptime_seconds': time.time() - self.started}
+
+
+PARAMETERS = { # query parameter -> parser
+    'gene': lambda values: [gene for value in values for gene in value.split(',') if gene],
+    'source': list,
+    'target': list,
+    'threshold': lambda values: float(values[-1]),
+    'thresholds': lambda values: [float(value) for item in values for value in item.split(',') if value],
+    'network': lambda values: values[-1],
+    'k': lambda values: int(values[-1]),
+    'exact': lambda values: values[-1].lower() in ('1', 'true', 'yes')
+}
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    service = None # NetworkService, set by serve()
+    quiet = False
+
+    def do_GET(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        handler = self.service.endpoints().get(url.path)
+        status, body = 200, None
+        if handler is None:
+            status, body = 404, {'error': f'unknown endpoint {url.path!r}', 'endpoints': list(self.service.endpoints())}
+        else:
+            try:
+                params = dict()
+                for key, values in parse_qs(url.query).items():
+                    if key not in PARAMETERS:
+                        raise QueryError(f'unknown parameter {key!r}')
+                    params[key] = PARAMETERS[key](values)
+                body = handler(**params)
+            except QueryError as e:
+                status, body = e.status, {'error': str(e)}
+            except (TypeError, ValueError) as e: # missing or malformed parameters
+                status, body = 400, {'error': str(e)}
+            except Exception as e:
+                status, body = 500, {'error': f'{type(e).__name__}: {e}'}
+        payload = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        if handler is not None:
+            self.service.metrics[url.path].add(time.perf_counter() - start, error=status != 200)
+
+    def address_string(self) -> str:
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix-socket'
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = 'localhost', 0 # expected by BaseHTTPRequestHandler
+
+
+def serve(service: NetworkService, host: str = '127.0.0.1', port: int = 8765, unix_socket: str = None, quiet: bool = False) -> HTTPServer:
+    """
+    HTTP server answering the service's queries, one thread per request (call serve_forever())
+    --------------------------
+    Args:
+        service (NetworkService): Loaded service.
+        host (str): Interface to listen on (localhost only by default).
+        port (int): TCP port (0 picks a free one).
+        unix_socket (str): Listen on this Unix socket path instead of TCP.
+        quiet (bool): Do not log every request.
+    Returns:
+        HTTPServer: Bound server
+    """
+    handler = type('BoundQueryHandler', (QueryHandler,), {'service': service, 'quiet': quiet})
+    if unix_socket is not None:
+        Path(unix_socket).unlink(missing_ok=True)
+        return ThreadingUnixHTTPServer(unix_socket, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local query service over the TEC and RNA networks')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix-socket', default=None, help='Listen on a Unix socket instead of TCP')
+    parser.add_argument('--h5', default=str(ms.DEFAULT_H5), help='HDF5 file of the correlation matrices')
+    parser.add_argument('--max-graphs', type=int, default=8, help='Number of thresholded graphs kept in memory')
+    parser.add_argument('--min-threshold', type=float, default=di.DEFAULT_FLOOR, help='Lowest threshold answered')
+    parser.add_argument('--preload', type=float, nargs='*', default=[0.75], help='Thresholds whose graphs are built at startup')
+    parser.add_argument('--embedding-dir', default=None, help='EmbeddingStore directory for /similar')
+    parser.add_argument('--embedding-threshold', type=float, default=0.75, help='Threshold of the embeddings used by /similar')
+    parser.add_argument('--quiet', action='store_true', help='Do not log every request')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    service = NetworkService(args.h5, args.max_graphs, args.min_threshold, args.embedding_dir, args.embedding_threshold)
+    for threshold in args.preload:
+        for network in NETWORKS:
+            service.graphs.get(network, threshold)
+    server = serve(service, args.host, args.port, args.unix_socket, args.quiet)
+    address = args.unix_socket or f'http://{server.server_address[0]}:{server.server_address[1]}'
+    print(f"Loaded {len(service.genes)} genes in {time.perf_counter() - start:.1f}s, serving on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix_socket:
+            Path(args.unix_socket).unlink(missing_ok=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,188 @@
 import numpy as np
 import pandas as pd
-from collections import deque, defaultdict
+from collections import defaultdict
 import powerlaw
 import multiprocessing as mp
 import networkx as nx
+import scipy.sparse as sp
+from scipy.sparse import csgraph
 from scipy.stats import linregress
 
 # General functions used throughout analyses
 
+def upper_triangle_edges(
+    ppi_mat: np.ndarray,
+    threshold: float,
+    inclusive: bool = True,
+    block_size: int = 1024
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Extract the edges of a symmetric weighted adjacency matrix whose weights pass the threshold.
+    Only the strict upper triangle is read, one block of rows at a time, so peak memory is
+    bounded by block_size x N instead of N x N (the matrix may be a np.memmap)
+    --------------------------
+    Args:
+        ppi_mat (np.ndarray): Symmetric weighted adjacency matrix.
+        threshold (float): Minimum weight to include an edge.
+        inclusive (bool): Keep weights >= threshold if True, otherwise weights > threshold.
+        block_size (int): Number of matrix rows processed per block.
+    Returns:
+        tuple: row indices, column indices (row < column) and weights of the edges
+    """
+    n = ppi_mat.shape[0]
+    rows, cols, weights = [], [], []
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = np.asarray(ppi_mat[start:stop, start:]) # columns left of the block are lower triangle
+        mask = block >= threshold if inclusive else block > threshold
+        mask[np.tril_indices(stop - start)] = False # drop diagonal and lower triangle of the block
+        r, c = np.nonzero(mask)
+        rows.append((r + start).astype(np.int32))
+        cols.append((c + start).astype(np.int32))
+        weights.append(block[r, c])
+    if n == 0:
+        return np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, ppi_mat.dtype)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(weights)
+
+
+
+def threshold_sparse(
+    ppi_mat: np.ndarray,
+    threshold: float,
+    weighted: bool = True,
+    inclusive: bool = True,
+    block_size: int = 1024
+) -> sp.csr_matrix:
+    """
+    Converts a symmetric weighted adjacency matrix into a sparse CSR adjacency matrix, including
+    only edges with weights >= threshold (no self loops)
+    --------------------------
+    Args:
+        ppi_mat (np.ndarray): Symmetric weighted adjacency matrix.
+        threshold (float): Minimum weight to include an edge.
+        weighted (bool): Keep the edge weights if True, otherwise store 1 for every edge.
+        inclusive (bool): Keep weights >= threshold if True, otherwise weights > threshold.
+        block_size (int): Number of matrix rows processed per block.
+    Returns:
+        sp.csr_matrix: Symmetric sparse adjacency matrix with sorted column indices.
+    """
+    n = ppi_mat.shape[0]
+    rows, cols, weights = upper_triangle_edges(ppi_mat, threshold, inclusive, block_size)
+    if not weighted:
+        weights = np.ones(len(rows), dtype=np.int8)
+    upper = sp.coo_matrix((weights, (rows, cols)), shape=(n, n))
+    adj = (upper + upper.T).tocsr() # upper and lower triangles never overlap
+    adj.sort_indices()
+    return adj
+
+
+
+def threshold_sweep(
+    ppi_mat: np.ndarray,
+    thresholds: list[float],
+    inclusive: bool = True,
+    block_size: int = 1024
+) -> dict[str, list]:
+    """
+    Compute the size and connectivity of the thresholded network for several thresholds in a
+    single pass. The upper-triangle edges passing the lowest threshold are extracted and sorted
+    once; since the thresholds are nested, every threshold graph is a prefix of that edge list.
+    Edges are then added band by band (highest threshold first) to an incremental union-find
+    over component labels, so the whole sweep costs about as much as one threshold
+    --------------------------
+    Args:
+        ppi_mat (np.ndarray): Symmetric weighted adjacency matrix.
+        thresholds (list[float]): Thresholds to evaluate (any order).
+        inclusive (bool): Keep weights >= threshold if True, otherwise weights > threshold.
+        block_size (int): Number of matrix rows processed per block.
+    Returns:
+        dict: lists aligned with thresholds for 'threshold', 'edges', 'connected_nodes',
+            'isolated_nodes', 'components' (multi-node connected components) and
+            'total_components' (including isolated nodes, as counted by NetworkX)
+    """
+    n = ppi_mat.shape[0]
+    rows, cols, weights = upper_triangle_edges(ppi_mat, min(thresholds), inclusive, block_size)
+    order = np.argsort(-weights, kind='stable')
+    rows, cols, neg_weights = rows[order], cols[order], -weights[order]
+    # w >= t  <=>  -w <= -t, so the prefix length is a binary search on the ascending -w
+    side = 'right' if inclusive else 'left'
+
+    labels = np.arange(n) # component label of every node
+    degrees = np.zeros(n, dtype=np.int64)
+    num_labels = n
+    stats = dict()
+    done = 0
+    for thresh in sorted(set(thresholds), reverse=True):
+        end = int(np.searchsorted(neg_weights, -thresh, side=side))
+        u, v = rows[done:end], cols[done:end]
+        degrees += np.bincount(u, minlength=n) + np.bincount(v, minlength=n)
+
+        # union step: merge the components joined by the new edges, then compress labels
+        lu, lv = labels[u], labels[v]
+        joining = lu != lv
+        if joining.any():
+            merges = sp.coo_matrix(
+                (np.ones(joining.sum(), dtype=np.int8), (lu[joining], lv[joining])),
+                shape=(num_labels, num_labels)
+            )
+            num_labels, relabel = csgraph.connected_components(merges, directed=False)
+            labels = relabel[labels]
+        done = end
+
+        isolated = int(np.count_nonzero(degrees == 0))
+        stats[thresh] = {
+            'edges': end,
+            'connected_nodes': n - isolated,
+            'isolated_nodes': isolated,
+            'components': num_labels - isolated,
+            'total_components': num_labels
+        }
+
+    result = {'threshold': list(thresholds)}
+    for key in ['edges', 'connected_nodes', 'isolated_nodes', 'components', 'total_components']:
+        result[key] = [stats[thresh][key] for thresh in thresholds]
+    return result
+
+
+
+def sparse_to_adjacency_list(adj: sp.csr_matrix) -> list[list[int]]:
+    """
+    Convert a sparse adjacency matrix into an unweighted adjacency list
+    --------------------------
+    Args:
+        adj (sp.csr_matrix): Sparse adjacency matrix.
+    Returns:
+        list[list[int]]: Unweighted adjacency list.
+    """
+    adj = sp.csr_matrix(adj)
+    adj.sort_indices()
+    return [row.tolist() for row in np.split(adj.indices, adj.indptr[1:-1])]
+
+
+
+def sparse_to_weighted_adjacency_list(adj: sp.csr_matrix) -> list[list[tuple]]:
+    """
+    Convert a sparse adjacency matrix into a weighted adjacency list of (neighbor, weight) tuples
+    --------------------------
+    Args:
+        adj (sp.csr_matrix): Sparse adjacency matrix.
+    Returns:
+        list[list[tuple]]: Weighted adjacency list.
+    """
+    adj = sp.csr_matrix(adj)
+    adj.sort_indices()
+    split = adj.indptr[1:-1]
+    return [
+        list(zip(idx.tolist(), w.astype(float).tolist()))
+        for idx, w in zip(np.split(adj.indices, split), np.split(adj.data, split))
+    ]
+
+
+
 def threshold_adjacency_list(ppi_mat: np.ndarray, threshold: float) -> list[list[int]]:
     """
     Converts a weighted adjacency matrix into an unweighted adjacency list, including only edges
-    with weights >= threshold
+    with weights >= threshold. The matrix is assumed symmetric (see threshold_sparse)
     --------------------------
     Args:
         ppi_mat (np.ndarray): Weighted adjacency matrix.
@@ -19,21 +190,14 @@ def threshold_adjacency_list(ppi_mat: np.ndarray, threshold: float) -> list[list
     Returns:
         list[list[int]]: Unweighted adjacency list after thresholding.
     """
-    result = []
-    for i in range(ppi_mat.shape[0]):
-        curr = []
-        for j in range(ppi_mat.shape[1]):
-            if ppi_mat[i, j] >= threshold and i != j: # ensure above threshold and not self loop
-                curr.append(j)
-        result.append(curr)
-    return result
+    return sparse_to_adjacency_list(threshold_sparse(ppi_mat, threshold, weighted=False))
 
 
 
 def threshold_weighted_adjacency_list(ppi_mat: np.ndarray, threshold: float) -> list[list[tuple]]:
     """
     Converts a weighted adjacency matrix into an weighted adjacency list, including only edges
-    with weights >= threshold
+    with weights >= threshold. The matrix is assumed symmetric (see threshold_sparse)
     --------------------------
     Args:
         ppi_mat (np.ndarray): Weighted adjacency matrix.
@@ -41,14 +205,76 @@ def threshold_weighted_adjacency_list(ppi_mat: np.ndarray, threshold: float) ->
     Returns:
         list[list[tuple]]: Weighted adjacency list after thresholding.
     """
-    result = []
-    for i in range(ppi_mat.shape[0]):
-        curr = []
-        for j in range(ppi_mat.shape[1]):
-            if ppi_mat[i, j] >= threshold and i != j: # ensure above threshold and not self loop
-                curr.append((j, float(ppi_mat[i, j])))
-        result.append(curr)
-    return result
+    return sparse_to_weighted_adjacency_list(threshold_sparse(ppi_mat, threshold))
+
+
+
+def adjacency_list_to_sparse(adjacency_list: list[list]) -> sp.csr_matrix:
+    """
+    Convert an unweighted or weighted adjacency list into a sparse adjacency matrix without
+    modifying the list
+    --------------------------
+    Args:
+        adjacency_list (list[list]): Adjacency list of neighbor indices or (neighbor, weight) tuples.
+    Returns:
+        sp.csr_matrix: N x N adjacency matrix (entries 1, or the edge weights)
+    """
+    n = len(adjacency_list)
+    lengths = np.fromiter(map(len, adjacency_list), dtype=np.int64, count=n)
+    rows = np.repeat(np.arange(n), lengths)
+    entries = [e for node_e in adjacency_list for e in node_e]
+    if entries and isinstance(entries[0], tuple):
+        cols = np.fromiter((e[0] for e in entries), dtype=np.int64, count=len(entries))
+        data = np.fromiter((e[1] for e in entries), dtype=np.float64, count=len(entries))
+    else:
+        cols = np.asarray(entries, dtype=np.int64)
+        data = np.ones(len(entries), dtype=np.int8)
+    adj = sp.coo_matrix((data, (rows, cols)), shape=(n, n)).tocsr()
+    adj.sum_duplicates()
+    return adj
+
+
+
+def graph_stats(adj: sp.spmatrix) -> dict:
+    """
+    Degree and connected-component statistics of an undirected graph given its sparse adjacency
+    matrix. Self-loops and explicit zeros are ignored and the input is not modified
+    --------------------------
+    Args:
+        adj (sp.spmatrix): Symmetric sparse adjacency matrix (e.g. from threshold_sparse).
+    Returns:
+        dict: 'nodes', 'edges', 'connected_nodes' (degree > 0), 'isolated_nodes' (degree 0),
+            'components' (multi-node components), 'total_components' (isolated nodes included,
+            as in NetworkX), 'component_sizes' (descending), 'component_labels' (per node),
+            'degrees' (per node), 'degree_histogram' (count of nodes per degree, as
+            nx.degree_histogram) and 'density'
+    """
+    coo = sp.coo_matrix(adj)
+    keep = (coo.row != coo.col) & (coo.data != 0)
+    n = coo.shape[0]
+    graph = sp.csr_matrix(
+        (np.ones(np.count_nonzero(keep), dtype=np.int8), (coo.row[keep], coo.col[keep])), shape=(n, n)
+    )
+    graph.sum_duplicates()
+    degrees = np.diff(graph.indptr)
+    num_edges = int(graph.nnz // 2)
+
+    total_components, labels = csgraph.connected_components(graph, directed=False)
+    sizes = np.bincount(labels, minlength=total_components)
+    connected_nodes = int(np.count_nonzero(degrees))
+    return {
+        'nodes': n,
+        'edges': num_edges,
+        'connected_nodes': connected_nodes,
+        'isolated_nodes': n - connected_nodes,
+        'components': int(np.count_nonzero(sizes >= 2)),
+        'total_components': int(total_components),
+        'component_sizes': np.sort(sizes)[::-1],
+        'component_labels': labels,
+        'degrees': degrees,
+        'degree_histogram': np.bincount(degrees),
+        'density': 2 * num_edges / (n * (n - 1)) if n > 1 else 0.0
+    }
 
 
 
@@ -62,53 +288,23 @@ def connected_components(adjacency_list:list[list[int]]) -> tuple:
     Returns:
         tuple: number of multi-node connected components, number of isolated nodes
     """
-    num_components = 0 # multi-node connected component 
-    isolated_nodes = 0 
-    visited = [False for i in range(len(adjacency_list))] 
-    S = deque()
-    idx = 0
-    size = 0 # size of a connected component
-    while idx < len(adjacency_list):
-        S.append(idx)
-        while len(S) > 0:
-            v = S.popleft()
-            if visited[v] == False:
-                visited[v] = True
-                size += 1
-                for u in adjacency_list[v]:
-                    S.append(u) 
-        if size >= 2:
-            num_components += 1
-        else:
-            isolated_nodes += 1
-        # reset and ensure next node has not been visited 
-        size = 0
-        while idx < len(adjacency_list) and visited[idx] == True:
-            idx += 1
-    return num_components, isolated_nodes
+    stats = graph_stats(adjacency_list_to_sparse(adjacency_list))
+    return stats['components'], stats['isolated_nodes']
 
 
 
 def nodes_and_edges(adjacency_list:list[list[int]]) -> tuple:
     """
     Return the number of connected nodes and the number of edges within
-    a graph given its unweighted adjacency list
+    a graph given its unweighted adjacency list (self-loops are ignored)
     --------------------------
     Args:
         adjacency_list (list[list[int]]): Unweighted adjacency list.
     Returns:
         tuple: number of connected nodes, number of edges
     """
-    num_nodes = 0
-    num_edges = 0
-    for i in range(len(adjacency_list)):
-        curr = adjacency_list[i]
-        if i in curr: # remove self-loops (should not be present in our setup)
-            curr.remove(i)
-        if len(curr) != 0:
-            num_nodes += 1
-            num_edges += len(curr)
-    return num_nodes, num_edges//2
+    stats = graph_stats(adjacency_list_to_sparse(adjacency_list))
+    return stats['connected_nodes'], stats['edges']
 
 
 
@@ -194,4 +390,67 @@ def jaccard_similarity(
         else:
             similarity = intersection / union
         jaccard_similarities[node] = similarity
-    return jaccard_similarities
\ No newline at end of file
+    return jaccard_similarities
+
+
+def align_adjacency(adj: sp.spmatrix, genes: list[str], shared_genes: pd.Index) -> sp.csr_matrix:
+    """
+    Reindex a sparse adjacency matrix labelled by genes onto a shared gene index, as an unweighted
+    matrix (genes missing from shared_genes are dropped, shared genes absent from the network
+    get empty rows)
+    --------------------------
+    Args:
+        adj (sp.spmatrix): Sparse adjacency matrix whose rows and columns follow genes.
+        genes (list[str]): Gene name of every row of adj.
+        shared_genes (pd.Index): Target gene index.
+    Returns:
+        sp.csr_matrix: len(shared_genes) x len(shared_genes) int32 matrix of ones
+    """
+    position = pd.Index(shared_genes).get_indexer(pd.Index(genes))
+    coo = sp.coo_matrix(adj)
+    keep = (coo.data != 0) & (coo.row != coo.col)
+    rows, cols = position[coo.row[keep]], position[coo.col[keep]]
+    keep = (rows >= 0) & (cols >= 0)
+    n = len(shared_genes)
+    aligned = sp.csr_matrix((np.ones(np.count_nonzero(keep), dtype=np.int32), (rows[keep], cols[keep])), shape=(n, n))
+    aligned.sum_duplicates()
+    aligned.data[:] = 1
+    return aligned
+
+
+
+def batched_jaccard_similarity(
+    adj1: sp.spmatrix,
+    adj2: sp.spmatrix,
+    genes1: list[str],
+    genes2: list[str],
+    query_genes: list[str] = None
+) -> pd.Series:
+    """
+    Jaccard similarity between the neighborhoods (as sets of gene names) of every query gene in
+    two networks, computed for all genes at once: both networks are aligned on the union of their
+    gene names, intersections are row sums of the element-wise product and unions follow from the
+    degrees. Matches jaccard_similarity (0.0 when both neighborhoods are empty)
+    --------------------------
+    Args:
+        adj1 (sp.spmatrix): Sparse adjacency matrix of the first network (e.g. from threshold_sparse).
+        adj2 (sp.spmatrix): Sparse adjacency matrix of the second network.
+        genes1 (list[str]): Gene name of every node of the first network.
+        genes2 (list[str]): Gene name of every node of the second network.
+        query_genes (list[str]): Genes to compare (default: genes present in both networks).
+    Returns:
+        pd.Series: Jaccard similarity indexed by gene name
+    """
+    genes1, genes2 = pd.Index(genes1), pd.Index(genes2)
+    shared_genes = genes1.union(genes2, sort=False)
+    query_genes = genes1.intersection(genes2, sort=False) if query_genes is None else pd.Index(query_genes)
+    rows = shared_genes.get_indexer(query_genes)
+    if (rows < 0).any():
+        raise KeyError(f"Genes not found in either network: {list(query_genes[rows < 0][:5])}")
+
+    a = align_adjacency(adj1, genes1, shared_genes)[rows]
+    b = align_adjacency(adj2, genes2, shared_genes)[rows]
+    intersection = np.asarray(a.multiply(b).sum(axis=1)).ravel()
+    union = np.diff(a.indptr) + np.diff(b.indptr) - intersection
+    similarity = np.divide(intersection, union, out=np.zeros(len(rows)), where=union > 0)
+    return pd.Series(similarity, index=query_genes, name='jaccard')
@@ -0,0 +1,154 @@
+"""
+Shortest-path statistics of unweighted networks from bit-parallel breadth-first search.
+
+Sources are processed in batches of 64 x words: every node carries one bit per source, and a
+BFS level for the whole batch is a single gather of the frontier bits over the CSR neighbor
+array followed by a per-node OR (np.bitwise_or.reduceat). Batches run on a process pool. The
+number of newly reached nodes per level gives the hop-distance histogram, so the average
+shortest path length, the diameter and the histogram all come from the same pass. For very
+large components the sources can be sampled, with a confidence interval for the average.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.stats import norm
+
+_worker_graph = dict() # CSR arrays shared by the batches of one worker process
+
+
+def _init_worker(indptr: np.ndarray, indices: np.ndarray):
+    _worker_graph['indptr'] = indptr
+    _worker_graph['indices'] = indices
+
+
+def _csr_arrays(adj: sp.spmatrix) -> tuple[np.ndarray, np.ndarray]:
+    coo = sp.coo_matrix(adj)
+    keep = (coo.row != coo.col) & (coo.data != 0)
+    n = coo.shape[0]
+    binary = sp.csr_matrix((np.ones(np.count_nonzero(keep), dtype=np.int8), (coo.row[keep], coo.col[keep])), shape=(n, n))
+    binary.sum_duplicates()
+    return binary.indptr.astype(np.int64), binary.indices.astype(np.int32)
+
+
+def bfs_batch(indptr: np.ndarray, indices: np.ndarray, sources: np.ndarray) -> dict:
+    """
+    Bit-parallel BFS from a batch of distinct sources
+    --------------------------
+    Args:
+        indptr (np.ndarray): CSR row pointers of a symmetric unweighted graph.
+        indices (np.ndarray): CSR neighbor indices.
+        sources (np.ndarray): Distinct source nodes.
+    Returns:
+        dict: 'level_counts' (k x L array, nodes first reached at distance 1..L from every
+            source), 'distance_sums', 'reached' (nodes reachable, source excluded) and
+            'eccentricity' per source
+    """
+    n = len(indptr) - 1
+    k = len(sources)
+    num_words = max(1, -(-k // 64))
+    source_ids = np.arange(k)
+    visited = np.zeros((n, num_words), dtype=np.uint64)
+    visited[sources, source_ids // 64] = np.uint64(1) << (source_ids % 64).astype(np.uint64)
+    frontier = visited.copy()
+
+    has_edges = np.diff(indptr) > 0
+    starts = indptr[:-1][has_edges]
+    reached = np.zeros((n, num_words), dtype=np.uint64)
+    level_counts = []
+    while True:
+        # OR of the frontier bits of every node's neighbors
+        reached[has_edges] = np.bitwise_or.reduceat(frontier[indices], starts, axis=0) if len(indices) else 0
+        frontier = reached & ~visited
+        if not frontier.any():
+            break
+        visited |= frontier
+        bits = np.unpackbits(frontier.astype('<u8').view(np.uint8), axis=1, bitorder='little')
+        level_counts.append(bits.sum(axis=0, dtype=np.int64)[:k])
+
+    level_counts = np.array(level_counts, dtype=np.int64).T.reshape(k, -1)
+    distances = np.arange(1, level_counts.shape[1] + 1)
+    nonzero = level_counts > 0
+    return {
+        'level_counts': level_counts,
+        'distance_sums': level_counts @ distances,
+        'reached': level_counts.sum(axis=1),
+        'eccentricity': np.where(nonzero.any(axis=1), level_counts.shape[1] - np.argmax(nonzero[:, ::-1], axis=1), 0)
+    }
+
+
+def _worker_batch(sources: np.ndarray) -> dict:
+    return bfs_batch(_worker_graph['indptr'], _worker_graph['indices'], sources)
+
+
+def shortest_path_stats(
+    adj: sp.spmatrix,
+    num_sources: int = None,
+    seed: int = 42,
+    confidence: float = 0.95,
+    words: int = 4,
+    n_jobs: int = None
+) -> dict:
+    """
+    Average shortest path length, diameter and hop-distance histogram of an unweighted graph.
+    With all nodes as sources the results are exact (the average equals
+    nx.average_shortest_path_length on a connected graph); with num_sources sampled sources the
+    average is estimated with a confidence interval and the diameter is a lower bound
+    --------------------------
+    Args:
+        adj (sp.spmatrix): Symmetric sparse adjacency matrix (e.g. of the largest component).
+        num_sources (int): Number of sources sampled without replacement (all nodes if None).
+        seed (int): Seed of the source sample.
+        confidence (float): Confidence level of the interval for the sampled average.
+        words (int): 64-bit words per node, i.e. sources per BFS batch / 64.
+        n_jobs (int): Number of worker processes (default: all CPUs, 1 runs in process).
+    Returns:
+        dict: 'average_shortest_path_length' (over reachable ordered pairs), 'diameter',
+            'hop_histogram' (ordered pairs per distance, index = hops), 'eccentricity' (per
+            source), 'sources', 'exact', and for sampled runs 'standard_error', 'ci_low',
+            'ci_high'
+    """
+    indptr, indices = _csr_arrays(adj)
+    n = len(indptr) - 1
+    exact = num_sources is None or num_sources >= n
+    if exact:
+        sources = np.arange(n)
+    else:
+        sources = np.sort(np.random.default_rng(seed).choice(n, size=num_sources, replace=False))
+    batches = [sources[start:start + 64 * words] for start in range(0, len(sources), 64 * words)]
+
+    n_jobs = n_jobs or os.cpu_count()
+    if n_jobs == 1 or len(batches) <= 1:
+        results = [bfs_batch(indptr, indices, batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(indptr, indices)) as pool:
+            results = list(pool.map(_worker_batch, batches))
+
+    num_levels = max([r['level_counts'].shape[1] for r in results], default=0)
+    hop_histogram = np.zeros(num_levels + 1, dtype=np.int64)
+    for r in results:
+        hop_histogram[1:r['level_counts'].shape[1] + 1] += r['level_counts'].sum(axis=0)
+    distance_sums = np.concatenate([r['distance_sums'] for r in results]) if results else np.zeros(0)
+    reached = np.concatenate([r['reached'] for r in results]) if results else np.zeros(0)
+    eccentricity = np.concatenate([r['eccentricity'] for r in results]) if results else np.zeros(0)
+
+    total_pairs = int(reached.sum())
+    stats = {
+        'average_shortest_path_length': int(distance_sums.sum()) / total_pairs if total_pairs else 0.0,
+        'diameter': int(eccentricity.max()) if len(eccentricity) else 0,
+        'hop_histogram': hop_histogram,
+        'eccentricity': eccentricity,
+        'sources': sources,
+        'exact': exact
+    }
+    if not exact:
+        # mean distance from every sampled source, finite-population corrected standard error
+        per_source = distance_sums[reached > 0] / reached[reached > 0]
+        standard_error = per_source.std(ddof=1) / np.sqrt(len(per_source)) * np.sqrt(1 - len(per_source) / n) if len(per_source) > 1 else np.nan
+        z = norm.ppf(0.5 + confidence / 2)
+        stats['standard_error'] = float(standard_error)
+        stats['ci_low'] = stats['average_shortest_path_length'] - z * standard_error
+        stats['ci_high'] = stats['average_shortest_path_length'] + z * standard_error
+    return stats
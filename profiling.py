@@ -0,0 +1,315 @@
+"""
+Lightweight per-stage instrumentation for the analysis scripts.
+
+Code marks its stages with `with profiling.stage(name, category):` blocks or the `profiled`
+decorator. Blocks nest, and every stage path (e.g. 'tissue_network/TEC_tissue_sweep') records
+its wall time, CPU time (all threads of the process), peak RSS, and optionally the peak of
+the allocations traced by tracemalloc, which include every NumPy array buffer. Failed stages
+keep their error message. A background thread can also sample the stacks of all threads at a
+fixed interval. Both the samples and the stage tree are written as folded stacks
+('a;b;c count' lines), the input format of flamegraph.pl, speedscope and inferno. The active
+profiler is disabled by default: then stage() returns a shared no-op context manager and
+profiled functions are called directly.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import nullcontext
+from functools import wraps
+from pathlib import Path
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+_NO_OP = nullcontext()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the process so far, None where it is not available"""
+    if resource is None:
+        return None
+    scale = 1024 ** 2 if sys.platform == 'darwin' else 1024 # ru_maxrss is bytes on macOS, KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def rss_mb() -> float:
+    """Current resident set size of the process (Linux), None where it is not available"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Profiler:
+    def __init__(self, enabled: bool = True, trace_allocations: bool = False, sample_interval: float = None):
+        """
+        Collects per-stage measurements and optional stack samples
+        --------------------------
+        Args:
+            enabled (bool): Record stages (a disabled profiler costs one attribute check per stage).
+            trace_allocations (bool): Track the peak traced allocation size of every stage with
+                tracemalloc (slows down allocation-heavy Python code).
+            sample_interval (float): Seconds between stack samples (no sampling if None).
+        """
+        self.enabled = enabled
+        self.trace_allocations = trace_allocations and enabled
+        self.sample_interval = sample_interval if enabled else None
+        self.records = dict() # stage path -> aggregated measurements
+        self.samples = Counter() # folded stack -> number of samples
+        self._local = threading.local()
+        self._stacks = dict() # thread id -> open stage names, read by the sampler
+        self._sampler = None
+        self._stop = threading.Event()
+        self._created = time.perf_counter()
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+            self._local.open = []
+            self._stacks[threading.get_ident()] = self._local.stack
+        return self._local.stack
+
+    def stage(self, name: str, category: str = None):
+        """
+        Context manager measuring a stage, nested under the stages open in the same thread
+        --------------------------
+        Args:
+            name (str): Stage name.
+            category (str): Kind of work (e.g. 'load', 'threshold', 'build', 'metric', 'plot').
+        Returns:
+            context manager
+        """
+        if not self.enabled:
+            return _NO_OP
+        return _Stage(self, name, category)
+
+    def profile(self, name: str = None, category: str = None):
+        """Decorator measuring every call of a function as a stage (named after the function by default)"""
+        def decorate(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.stage(name or fn.__name__, category):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def fail(self, error: BaseException):
+        """Mark the innermost open stage of this thread as failed (for errors handled inside it)"""
+        if self.enabled and self._stack():
+            self._local.open[-1].error = error
+
+    def _enter(self, stage):
+        stack = self._stack()
+        stack.append(stage.name)
+        stage.parent = self._local.open[-1] if self._local.open else None
+        self._local.open.append(stage)
+        stage.path = '/'.join(stack)
+
+    def _exit(self, stage, record: dict):
+        self._local.open.pop()
+        self._stack().pop()
+        record['started'] = stage.start - self._created
+        self._add(stage.path, record)
+
+    def _add(self, path: str, record: dict):
+        previous = self.records.get(path)
+        if previous is None:
+            self.records[path] = record
+            return
+        previous['calls'] += 1
+        for key in ('wall_seconds', 'cpu_seconds'):
+            previous[key] += record[key]
+        for key in ('peak_rss_mb', 'rss_growth_mb', 'alloc_peak_mb'):
+            if record.get(key) is not None:
+                previous[key] = max(previous[key] or 0.0, record[key])
+        if record['status'] == 'error':
+            previous['status'], previous['error'] = 'error', record['error']
+
+    def merge(self, records: dict):
+        """
+        Add the stages recorded by another profiler (e.g. in a worker process), nested under the
+        stages open in this thread. Start offsets of another process are not comparable, so they
+        are dropped
+        --------------------------
+        Args:
+            records (dict): Profiler.records of the other profiler.
+        """
+        if not self.enabled:
+            return
+        prefix = '/'.join(self._stack())
+        for path, record in records.items():
+            self._add(f'{prefix}/{path}' if prefix else path, {**record, 'started': None})
+
+    def start(self):
+        """Start tracing allocations and sampling stacks, as configured"""
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.sample_interval and self._sampler is None:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, name='profiling-sampler', daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        """Stop the stack sampler and allocation tracing"""
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        if self.trace_allocations and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f'{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                stages = [f'[{name}]' for name in self._stacks.get(ident, ())]
+                self.samples[';'.join(stages + frames[::-1])] += 1
+
+    def folded(self) -> list[str]:
+        """
+        Folded stacks for flame graphs: the stack samples if any were taken, otherwise the stage
+        tree weighted by the self time (milliseconds) of every stage
+        --------------------------
+        Returns:
+            list[str]: 'frame;frame;frame count' lines
+        """
+        if self.samples:
+            return [f'{stack} {count}' for stack, count in sorted(self.samples.items())]
+        self_seconds = {path: record['wall_seconds'] for path, record in self.records.items()}
+        for path, record in self.records.items():
+            parent = path.rpartition('/')[0]
+            if parent in self_seconds:
+                self_seconds[parent] -= record['wall_seconds']
+        return [f"{path.replace('/', ';')} {max(0, round(seconds * 1000))}" for path, seconds in sorted(self_seconds.items())]
+
+    def write_folded(self, path: str | os.PathLike) -> Path:
+        """Write the folded stacks to a file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('\n'.join(self.folded()) + '\n')
+        return path
+
+    def report(self) -> dict:
+        """
+        Measurements for the results JSON
+        --------------------------
+        Returns:
+            dict: 'enabled', 'wall_seconds' (since the profiler was created), 'peak_rss_mb',
+                'trace_allocations', 'sample_interval', 'samples' (number of stack samples) and
+                'stages' ({path: {'category', 'calls', 'status', 'error', 'started',
+                'wall_seconds', 'cpu_seconds', 'peak_rss_mb', 'rss_growth_mb', 'rss_mb',
+                'alloc_peak_mb'}})
+        """
+        return {
+            'enabled': self.enabled,
+            'wall_seconds': time.perf_counter() - self._created,
+            'peak_rss_mb': peak_rss_mb(),
+            'trace_allocations': self.trace_allocations,
+            'sample_interval': self.sample_interval,
+            'samples': sum(self.samples.values()),
+            'stages': self.records
+        }
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'category', 'path', 'parent', 'error', 'start', 'cpu', 'peak_rss', 'alloc_start', 'alloc_seen')
+
+    def __init__(self, profiler: Profiler, name: str, category: str):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.error = None
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        self.alloc_start = None
+        if self.profiler.trace_allocations and tracemalloc.is_tracing():
+            # tracemalloc keeps a single peak: hand the peak so far to the enclosing stage, then reset it
+            self.alloc_start, peak = tracemalloc.get_traced_memory()
+            self.alloc_seen = 0
+            if self.parent is not None and self.parent.alloc_start is not None:
+                self.parent.alloc_seen = max(self.parent.alloc_seen, peak)
+            tracemalloc.reset_peak()
+        self.peak_rss = peak_rss_mb()
+        self.cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start
+        cpu = time.process_time() - self.cpu
+        alloc_peak = None
+        if self.alloc_start is not None and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], self.alloc_seen)
+            alloc_peak = (peak - self.alloc_start) / 1024 ** 2 # largest growth of traced memory in the stage
+            if self.parent is not None and self.parent.alloc_start is not None:
+                self.parent.alloc_seen = max(self.parent.alloc_seen, peak)
+        peak_rss = peak_rss_mb()
+        error = exc if exc is not None else self.error
+        self.profiler._exit(self, {
+            'category': self.category,
+            'calls': 1,
+            'status': 'error' if error is not None else 'ok',
+            'error': f'{type(error).__name__}: {error}' if error is not None else None,
+            'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'peak_rss_mb': peak_rss,
+            'rss_growth_mb': peak_rss - self.peak_rss if peak_rss is not None else None,
+            'rss_mb': rss_mb(),
+            'alloc_peak_mb': alloc_peak
+        })
+        return False
+
+
+_active = Profiler(enabled=False)
+
+
+def get_profiler() -> Profiler:
+    """The profiler stages are recorded in"""
+    return _active
+
+
+def set_profiler(profiler: Profiler) -> Profiler:
+    """Make profiler the active one, returning the previous profiler"""
+    global _active
+    previous, _active = _active, profiler
+    return previous
+
+
+def stage(name: str, category: str = None):
+    """Context manager measuring a stage with the active profiler (no-op when it is disabled)"""
+    return _active.stage(name, category)
+
+
+def fail(error: BaseException):
+    """Mark the innermost open stage of the active profiler as failed"""
+    _active.fail(error)
+
+
+def profiled(name: str = None, category: str = None):
+    """Decorator measuring every call of a function with the profiler active at call time"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _active.enabled:
+                return fn(*args, **kwargs)
+            with _active.stage(name or fn.__name__, category):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,197 @@
+"""
+Pixel-grid rendering of large matrix heatmaps and degree histograms.
+
+sns.heatmap draws one mesh cell per matrix entry and plt.hist one rectangle per bin, so a
+several-thousand-column difference matrix or a histogram with thousands of degree bins costs
+millions of (mostly sub-pixel) artists. These functions first reduce the data to the pixel grid
+of the target axes at the output dpi with NumPy block pooling (mean, max, min or the value of
+largest magnitude) and then draw a single image or a single step patch. Axis coordinates,
+color scaling (including seaborn's recentered diverging colormaps), spines and colorbar follow
+sns.heatmap and plt.hist(..., align='left'), so tick code written for those keeps working.
+"""
+
+import math
+
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+import numpy as np
+
+REDUCTIONS = ('sample', 'mean', 'max', 'min', 'absmax')
+OVERSAMPLE = 2 # image pixels per output pixel along each axis
+
+
+def output_dpi(fig: mpl.figure.Figure = None) -> float:
+    """Resolution figures are saved at: savefig.dpi, or the figure dpi if that is 'figure'"""
+    dpi = mpl.rcParams['savefig.dpi']
+    if dpi == 'figure':
+        dpi = fig.dpi if fig is not None else mpl.rcParams['figure.dpi']
+    return float(dpi)
+
+
+def axes_pixels(ax: mpl.axes.Axes, dpi: float = None) -> tuple[int, int]:
+    """Size of an axes in output pixels (rows, columns)"""
+    dpi = dpi or output_dpi(ax.figure)
+    position = ax.get_position()
+    width, height = ax.figure.get_size_inches()
+    return max(1, math.ceil(position.height * height * dpi)), max(1, math.ceil(position.width * width * dpi))
+
+
+def pool_blocks(matrix: np.ndarray, factors: tuple[int, int], reduce: str = 'mean', max_bytes: int = 1 << 26) -> np.ndarray:
+    """
+    Reduce every factors[0] x factors[1] block of a matrix to one value (edge blocks are partial)
+    --------------------------
+    Args:
+        matrix (np.ndarray): 2D array (may be a np.memmap; read in row chunks).
+        factors (tuple[int, int]): Block height and width.
+        reduce (str): 'sample' (the center entry of every block, what the renderer shows of a
+            sub-pixel mesh), 'mean', 'max', 'min' or 'absmax' (the signed value of largest
+            magnitude).
+        max_bytes (int): Approximate float64 working memory per chunk of rows.
+    Returns:
+        np.ndarray: ceil(rows / factors[0]) x ceil(columns / factors[1]) float64 array
+    """
+    if reduce not in REDUCTIONS:
+        raise ValueError(f'reduce must be one of {REDUCTIONS}, got {reduce!r}')
+    fr, fc = factors
+    rows, cols = matrix.shape
+    out_rows, out_cols = -(-rows // fr), -(-cols // fc)
+    if reduce == 'sample':
+        row_index = np.minimum(np.arange(out_rows) * fr + fr // 2, rows - 1)
+        col_index = np.minimum(np.arange(out_cols) * fc + fc // 2, cols - 1)
+        return np.asarray(matrix[row_index][:, col_index], dtype=np.float64)
+    pad_cols = out_cols * fc - cols
+    fill = {'mean': 0.0, 'max': -np.inf, 'min': np.inf, 'absmax': 0.0}[reduce]
+    # number of entries of every block, for the mean of the partial edge blocks
+    col_counts = np.full(out_cols, fc, dtype=np.float64)
+    col_counts[-1] = fc - pad_cols
+
+    pooled = np.empty((out_rows, out_cols), dtype=np.float64)
+    chunk = max(1, max_bytes // (8 * fr * out_cols * fc)) # output rows per chunk
+    for out_start in range(0, out_rows, chunk):
+        out_stop = min(out_start + chunk, out_rows)
+        block = np.asarray(matrix[out_start * fr:out_stop * fr], dtype=np.float64)
+        n = block.shape[0]
+        pad_rows = (out_stop - out_start) * fr - n
+        block = np.pad(block, ((0, pad_rows), (0, pad_cols)), constant_values=fill)
+        block = block.reshape(out_stop - out_start, fr, out_cols, fc)
+        if reduce == 'mean':
+            row_counts = np.full(out_stop - out_start, fr, dtype=np.float64)
+            row_counts[-1] = fr - pad_rows
+            pooled[out_start:out_stop] = block.sum(axis=(1, 3)) / np.outer(row_counts, col_counts)
+        elif reduce == 'max':
+            pooled[out_start:out_stop] = block.max(axis=(1, 3))
+        elif reduce == 'min':
+            pooled[out_start:out_stop] = block.min(axis=(1, 3))
+        else:
+            high, low = block.max(axis=(1, 3)), block.min(axis=(1, 3))
+            pooled[out_start:out_stop] = np.where(high >= -low, high, low)
+    return pooled
+
+
+def _value_range(matrix: np.ndarray, block_size: int = 4096) -> tuple[float, float]:
+    lo, hi = np.inf, -np.inf
+    for start in range(0, matrix.shape[0], block_size):
+        block = np.asarray(matrix[start:start + block_size])
+        lo, hi = min(lo, np.nanmin(block)), max(hi, np.nanmax(block))
+    return float(lo), float(hi)
+
+
+def _colormap(cmap, vmin: float, vmax: float, center: float):
+    # same recentering as seaborn: the colormap is cut so that center gets its middle color
+    cmap = mpl.colormaps.get_cmap(cmap)
+    if center is None:
+        return cmap
+    vrange = max(vmax - center, center - vmin)
+    cmin, cmax = mpl.colors.Normalize(center - vrange, center + vrange)([vmin, vmax])
+    return mpl.colors.ListedColormap(cmap(np.linspace(cmin, cmax, 256))).with_extremes(bad=cmap(np.nan))
+
+
+def heatmap(
+    matrix: np.ndarray,
+    ax: mpl.axes.Axes = None,
+    cmap='viridis',
+    center: float = None,
+    vmin: float = None,
+    vmax: float = None,
+    cbar: bool = True,
+    reduce: str = 'sample',
+    dpi: float = None
+) -> mpl.image.AxesImage:
+    """
+    Heatmap of a matrix drawn as one image at the resolution of the output, in the layout of
+    sns.heatmap(..., xticklabels=False, yticklabels=False): cell (i, j) spans [j, j + 1] x
+    [i, i + 1], row 0 at the top, no spines, colorbar without outline
+    --------------------------
+    Args:
+        matrix (np.ndarray): 2D array (may be a np.memmap).
+        ax (mpl.axes.Axes): Target axes (current axes if None).
+        cmap: Colormap or its name (seaborn colormaps need seaborn imported).
+        center (float): Value at the middle of a diverging colormap, as in sns.heatmap.
+        vmin (float): Lower end of the color scale (minimum of the full matrix if None).
+        vmax (float): Upper end of the color scale (maximum of the full matrix if None).
+        cbar (bool): Draw a colorbar.
+        reduce (str): Pooling of the cells sharing an output pixel (see pool_blocks). 'sample'
+            looks like sns.heatmap; 'mean' or 'absmax' summarize every cell instead.
+        dpi (float): Output resolution (savefig.dpi if None).
+    Returns:
+        mpl.image.AxesImage: The image
+    """
+    ax = ax if ax is not None else plt.gca()
+    rows, cols = matrix.shape
+    if vmin is None or vmax is None:
+        lo, hi = _value_range(matrix) # from the full matrix, pooling shrinks the extremes
+        vmin = lo if vmin is None else vmin
+        vmax = hi if vmax is None else vmax
+    cmap = _colormap(cmap, vmin, vmax, center)
+    norm = mpl.colors.Normalize(vmin, vmax)
+    if cbar: # the colorbar takes its space from ax, so the pixel grid is measured afterwards
+        colorbar = ax.figure.colorbar(mpl.cm.ScalarMappable(norm, cmap), ax=ax)
+        colorbar.outline.set_linewidth(0)
+        colorbar.solids.set_rasterized(True)
+
+    # twice the pixel grid, so the axes can still grow (e.g. subplots_adjust) without visible blocks
+    height, width = axes_pixels(ax, dpi)
+    factors = (max(1, rows // (OVERSAMPLE * height)), max(1, cols // (OVERSAMPLE * width)))
+    pooled = pool_blocks(matrix, factors, reduce) if factors != (1, 1) else np.asarray(matrix)
+    image = ax.imshow(pooled, cmap=cmap, norm=norm, aspect='auto', interpolation='nearest',
+                      extent=(0, pooled.shape[1] * factors[1], pooled.shape[0] * factors[0], 0))
+    image.set_rasterized(True)
+
+    ax.set_xlim(0, cols)
+    ax.set_ylim(rows, 0)
+    ax.set_xticks([])
+    ax.set_yticks([])
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    return image
+
+
+def histogram(
+    counts: np.ndarray,
+    ax: mpl.axes.Axes = None,
+    color=None,
+    reduce: str = 'max',
+    dpi: float = None
+) -> mpl.patches.StepPatch:
+    """
+    Bar histogram of precomputed counts (bin k centered on k, as plt.hist(values, bins=range(0,
+    max + 2), align='left')) drawn as one filled step patch, with the bins sharing an output
+    pixel column pooled so that no bar is lost to sub-pixel rendering
+    --------------------------
+    Args:
+        counts (np.ndarray): Count of every integer value, e.g. np.bincount(degrees).
+        ax (mpl.axes.Axes): Target axes (current axes if None).
+        color: Fill color.
+        reduce (str): Pooling of the bins sharing a pixel column ('max' keeps every peak).
+        dpi (float): Output resolution (savefig.dpi if None).
+    Returns:
+        mpl.patches.StepPatch: The patch
+    """
+    ax = ax if ax is not None else plt.gca()
+    counts = np.asarray(counts, dtype=np.float64)
+    width = axes_pixels(ax, dpi)[1]
+    factor = max(1, len(counts) // width)
+    if factor > 1:
+        counts = pool_blocks(counts[None, :], (1, factor), reduce)[0]
+    edges = np.arange(len(counts) + 1) * factor - 0.5
+    return ax.stairs(counts, edges, fill=True, color=color)
@@ -9,531 +9,651 @@ matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import networkx as nx
 from pathlib import Path
 import sys
 import os
-import time
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
-from sklearn.metrics.pairwise import cosine_similarity
+import argparse
 
 # Add current directory to path
 sys.path.append('.')
+import network_utils as ne
+import matrix_store as ms
+import triangles as tr
+import communities as cm
+import differential as dn
+import cluster_selection as cs
+import stage_cache as sc
+import degree_index as di
+import raster_plots as rp
+import profiling
 
-def run_tissue_net_analysis():
+TISSUE_THRESHOLDS = [0.9, 0.85, 0.8, 0.75, 0.7, 0.65, 0.6]
+SUPPLEMENTAL_THRESHOLDS = [0.9, 0.85, 0.8, 0.75, 0.7, 0.65, 0.6, 0.55, 0.5]
+COMPARISON_THRESHOLD = 0.75
+DEGREE_SWEEP_THRESHOLDS = [round(0.5 + 0.005 * i, 3) for i in range(91)] # 0.5 to 0.95, read from the degree index
+COMMUNITY_RESOLUTIONS = [0.5, 1.0, 2.0]
+COMMUNITY_SEEDS = [0, 1, 2]
+RESULT_FILES = {
+    'gnn_only': 'gnn_only_results.json',
+    'gnn_vs_traditional': 'gnn_vs_traditional_comparison.json',
+    'remaining_experiments': 'analysis_results/remaining_experiments_results.json'
+}
+FIGURE_STAGES = [ # independent of each other, rendered on their own process pool
+    'tissue_network_figure', 'rna_comparison_figure', 'powerlaw_figure', 'supplemental_figure',
+    'degree_distribution_figure', 'gnn_comparison', 'final_summary'
+]
+TRADITIONAL_STAGES = [ # everything the four traditional experiments read besides the figures
+    'TEC_tissue_sweep', 'RNA_tissue_sweep', 'TEC_supplemental_sweep', 'RNA_supplemental_sweep',
+    f'TEC_properties_{COMPARISON_THRESHOLD}', f'RNA_properties_{COMPARISON_THRESHOLD}',
+    f'TEC_powerlaw_{COMPARISON_THRESHOLD}', f'RNA_degrees_{COMPARISON_THRESHOLD}', 'genes_match', 'TEC_degree_sweep',
+    f'TEC_communities_{COMPARISON_THRESHOLD}', f'TEC_RNA_rewiring_{COMPARISON_THRESHOLD}'
+]
+
+def read_json(path):
+    """Load a JSON results file, None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def genes_match(tec_genes, rna_genes):
+    """Check same gene list between TEC and RNA"""
+    return bool((tec_genes == rna_genes).all())
+
+def network_properties(stats, avg_clustering):
+    """Network properties reported by the RNA comparison"""
+    return {
+        'nodes': stats['nodes'],
+        'edges': stats['edges'],
+        'connected_components': stats['total_components'],
+        'avg_clustering': avg_clustering,
+        'density': stats['density']
+    }
+
+def degree_summary(index, threshold):
+    """Degree sequence, histogram and edge count at one threshold, read from the degree index"""
+    degrees = index.degrees(threshold, inclusive=False)
+    return {'degrees': degrees, 'degree_histogram': np.bincount(degrees), 'edges': int(degrees.sum()) // 2}
+
+def degree_sweep(index, thresholds):
+    """Edges, connected nodes and scale-free fit (alpha, R2) of the network at every threshold"""
+    return index.sweep(thresholds, inclusive=False)
+
+def community_sweep(adj, resolutions, seeds):
+    """Louvain modularity and community counts at every (resolution, seed), without the label arrays"""
+    sweep = cm.resolution_sweep(adj, resolutions, seeds)
+    del sweep['labels']
+    return sweep
+
+def rewiring_summary(tec, rna, genes, threshold):
+    """Edges in only one of the TEC and RNA networks and the most rewired genes, streamed in row blocks"""
+    diff = dn.compare(tec, rna, genes, threshold=threshold, inclusive=False)
+    table = dn.gene_table(diff).nlargest(10, 'rewired')
+    return {
+        'tec_only_edges': int(diff['first_only'].sum()) // 2,
+        'rna_only_edges': int(diff['second_only'].sum()) // 2,
+        'most_rewired_genes': [
+            {'gene': gene, 'tec_only': int(row['first_only']), 'rna_only': int(row['second_only'])}
+            for gene, row in table.iterrows()
+        ]
+    }
+
+def fit_degree_power_law(stats):
+    """Least-squares power-law fit of the log-log degree histogram (zero degrees removed)"""
+    degree_counts = {k: int(v) for k, v in enumerate(stats['degree_histogram']) if k > 0 and v > 0}
+    if len(degree_counts) <= 1:
+        return None
+    
+    degrees_list = list(degree_counts.keys())
+    counts_list = list(degree_counts.values())
+    
+    # Calculate power law fit
+    log_degrees = np.log(degrees_list)
+    log_counts = np.log(counts_list)
+    
+    # Linear regression for power law
+    coeffs = np.polyfit(log_degrees, log_counts, 1)
+    alpha = -coeffs[0]  # Power law exponent
+    return {
+        'degrees_list': degrees_list,
+        'counts_list': counts_list,
+        'coeffs': coeffs,
+        'alpha': alpha,
+        'r_squared': np.corrcoef(log_degrees, log_counts)[0,1]**2
+    }
+
+def traditional_clustering(stats, clustering_coeffs):
+    """Optimal KMeans clustering of the (degree, clustering coefficient) node features"""
+    # Traditional clustering (using degree-based features)
+    degrees = stats['degrees']
+    features = np.column_stack([degrees, clustering_coeffs])
+    
+    # Remove zero-degree nodes for clustering
+    non_zero_mask = degrees > 0
+    if np.sum(non_zero_mask) > 1:
+        features_filtered = features[non_zero_mask]
+        
+        # Find optimal clusters (all k scored in one shared distance pass)
+        selection = cs.select_num_clusters(features_filtered, range(2, 11), random_state=42)
+        if selection['scores']:
+            return selection['optimal_clusters'], selection['silhouette_score']
+        return 2, 0.0
+    return 1, 0.0
+
+def plot_tissue_network(tec_sweep, rna_sweep, path):
+    """Edges and connected nodes of both networks against the threshold"""
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+    
+    # Edges comparison
+    ax1.plot(tec_sweep['threshold'], tec_sweep['edges'], 'o-', label='TEC', color='skyblue')
+    ax1.plot(rna_sweep['threshold'], rna_sweep['edges'], 's-', label='RNA', color='lightcoral')
+    ax1.set_xlabel('Threshold')
+    ax1.set_ylabel('Number of Edges')
+    ax1.set_title('Network Edges vs Threshold')
+    ax1.legend()
+    ax1.grid(True, alpha=0.3)
+    ax1.set_yscale('log')
+    
+    # Nodes comparison
+    ax2.plot(tec_sweep['threshold'], tec_sweep['connected_nodes'], 'o-', label='TEC', color='skyblue')
+    ax2.plot(rna_sweep['threshold'], rna_sweep['connected_nodes'], 's-', label='RNA', color='lightcoral')
+    ax2.set_xlabel('Threshold')
+    ax2.set_ylabel('Connected Nodes')
+    ax2.set_title('Connected Nodes vs Threshold')
+    ax2.legend()
+    ax2.grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def plot_rna_comparison(tec_props, rna_props, path):
+    """Size, fragmentation, clustering and density of both networks"""
+    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 10))
+    
+    # Network size comparison
+    networks = ['TEC', 'RNA']
+    edges = [tec_props['edges'], rna_props['edges']]
+    components = [tec_props['connected_components'], rna_props['connected_components']]
+    
+    ax1.bar(networks, edges, color=['skyblue', 'lightcoral'], alpha=0.8)
+    ax1.set_ylabel('Number of Edges')
+    ax1.set_title('Network Size Comparison')
+    ax1.grid(True, alpha=0.3)
+    
+    ax2.bar(networks, components, color=['skyblue', 'lightcoral'], alpha=0.8)
+    ax2.set_ylabel('Connected Components')
+    ax2.set_title('Network Fragmentation')
+    ax2.grid(True, alpha=0.3)
+    
+    # Clustering and density
+    clustering = [tec_props['avg_clustering'], rna_props['avg_clustering']]
+    density = [tec_props['density'], rna_props['density']]
+    
+    ax3.bar(networks, clustering, color=['skyblue', 'lightcoral'], alpha=0.8)
+    ax3.set_ylabel('Average Clustering')
+    ax3.set_title('Network Clustering')
+    ax3.grid(True, alpha=0.3)
+    
+    ax4.bar(networks, density, color=['skyblue', 'lightcoral'], alpha=0.8)
+    ax4.set_ylabel('Network Density')
+    ax4.set_title('Network Density')
+    ax4.grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def plot_powerlaw(fit, path):
+    """Degree distribution with its power-law fit, on log axes and in log-log coordinates"""
+    if fit is None:
+        return
+    degrees_list, counts_list, coeffs, alpha = fit['degrees_list'], fit['counts_list'], fit['coeffs'], fit['alpha']
+    log_degrees = np.log(degrees_list)
+    log_counts = np.log(counts_list)
+    
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+    
+    # Degree distribution
+    ax1.scatter(degrees_list, counts_list, alpha=0.7, color='skyblue')
+    ax1.set_xlabel('Degree')
+    ax1.set_ylabel('Frequency')
+    ax1.set_title('Degree Distribution')
+    ax1.set_xscale('log')
+    ax1.set_yscale('log')
+    ax1.grid(True, alpha=0.3)
+    
+    # Power law fit
+    fit_line = np.exp(coeffs[1]) * np.array(degrees_list) ** coeffs[0]
+    ax1.plot(degrees_list, fit_line, 'r-', alpha=0.8,
+            label=f'Power law fit (α={alpha:.2f})')
+    ax1.legend()
+    
+    # Log-log plot
+    ax2.scatter(log_degrees, log_counts, alpha=0.7, color='lightcoral')
+    ax2.plot(log_degrees, np.polyval(coeffs, log_degrees), 'r-', alpha=0.8)
+    ax2.set_xlabel('log(Degree)')
+    ax2.set_ylabel('log(Frequency)')
+    ax2.set_title(f'Power Law Fit (α={alpha:.2f})')
+    ax2.grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def plot_supplemental(tec_sweep, rna_sweep, path):
+    """Connected components, nodes and edges of both networks against the threshold"""
+    thresholds = tec_sweep['threshold']
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+    
+    # Connected components comparison
+    x = np.arange(len(thresholds))
+    bar_width = 0.35
+    
+    ax1.bar(x - bar_width/2, tec_sweep['total_components'], width=bar_width, color='skyblue', label='TEC')
+    ax1.bar(x + bar_width/2, rna_sweep['total_components'], width=bar_width, color='lightsalmon', label='RNA')
+    ax1.set_xlabel('Threshold')
+    ax1.set_ylabel('Number of Connected Components')
+    ax1.set_title('Connected Components vs Threshold')
+    ax1.set_xticks(x)
+    ax1.set_xticklabels(thresholds)
+    ax1.legend()
+    ax1.grid(True, alpha=0.3)
+    
+    # Nodes and edges comparison
+    ax2.plot(x, tec_sweep['connected_nodes'], marker='s', markersize=7, label='TEC connected nodes', color='skyblue')
+    ax2.plot(x, tec_sweep['edges'], marker='<', markersize=7, label='TEC edges', color='skyblue')
+    ax2.plot(x, rna_sweep['connected_nodes'], marker='s', markersize=7, label='RNA connected nodes', color='lightsalmon')
+    ax2.plot(x, rna_sweep['edges'], marker='<', markersize=7, label='RNA edges', color='lightsalmon')
+    
+    ax2.axhline(y=11088, linestyle='--', color='gray', alpha=0.7, label='Max nodes')
+    ax2.axvline(x=3, linestyle='-.', color='darkgreen', alpha=0.7, label='Threshold 0.75')
+    ax2.set_yscale('log')
+    ax2.set_xlabel('Threshold Index')
+    ax2.set_ylabel('Count')
+    ax2.set_title('Network Size vs Threshold')
+    ax2.set_xticks(x)
+    ax2.set_xticklabels(thresholds)
+    ax2.legend()
+    ax2.grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def plot_degree_distribution(stats, path):
+    """RNA degree histogram, one weighted bin per degree"""
+    degree_histogram = stats['degree_histogram']
+    max_degree = len(degree_histogram) - 1
+    
+    plt.figure(figsize=(8, 6))
+    if max_degree > 0:
+        # one step patch, bins sharing a pixel column pooled (thousands of degree bins at low thresholds)
+        rp.histogram(degree_histogram, color='lightsalmon', dpi=300)
+        plt.yscale('log')
+    plt.xlabel('Node Degree')
+    plt.ylabel('Frequency')
+    plt.title('RNA Network Degree Distribution (Threshold 0.75)')
+    plt.grid(True, alpha=0.3)
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+def compare_gnn_results(gnn_data, comparison_data, figure_path, table_path):
+    """GNN vs Traditional plots and summary table from the saved results, None if missing"""
+    # Load existing results
+    gnn_results = gnn_data['gnn_results'] if gnn_data else None
+    traditional_results = None
+    if comparison_data:
+        traditional_results = comparison_data['traditional_results']
+        if not gnn_results:
+            gnn_results = comparison_data['gnn_results']
+    
+    if not gnn_results or not traditional_results:
+        return None
+    
+    # Create comprehensive comparison plots
+    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
+    
+    # Performance comparison
+    methods = ['GNN', 'Traditional']
+    training_times = [gnn_results['training_time'], traditional_results['processing_time']]
+    silhouette_scores = [gnn_results['silhouette_score'], traditional_results['silhouette_score']]
+    
+    ax1.bar(methods, training_times, color=['lightblue', 'lightcoral'], alpha=0.8)
+    ax1.set_ylabel('Time (seconds)')
+    ax1.set_title('Processing Time Comparison')
+    ax1.set_yscale('log')
+    ax1.grid(True, alpha=0.3)
+    
+    ax2.bar(methods, silhouette_scores, color=['lightblue', 'lightcoral'], alpha=0.8)
+    ax2.set_ylabel('Silhouette Score')
+    ax2.set_title('Clustering Quality Comparison')
+    ax2.grid(True, alpha=0.3)
+    
+    # Network structure comparison
+    predictions = [gnn_results['high_confidence_predictions'], traditional_results['high_confidence_predictions']]
+    similarities = [gnn_results['mean_similarity'], traditional_results['mean_similarity']]
+    
+    ax3.bar(methods, predictions, color=['lightblue', 'lightcoral'], alpha=0.8)
+    ax3.set_ylabel('High Confidence Predictions')
+    ax3.set_title('Link Prediction Capability')
+    ax3.set_yscale('log')
+    ax3.grid(True, alpha=0.3)
+    
+    ax4.bar(methods, similarities, color=['lightblue', 'lightcoral'], alpha=0.8)
+    ax4.set_ylabel('Mean Similarity')
+    ax4.set_title('Network Similarity Analysis')
+    ax4.grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    plt.savefig(figure_path, dpi=300, bbox_inches='tight')
+    plt.close()
+    
+    # Create summary comparison table
+    comparison_summary = {
+        'Method': ['GNN', 'Traditional'],
+        'Processing_Time': [f"{gnn_results['training_time']:.1f}s", f"{traditional_results['processing_time']:.1f}s"],
+        'Silhouette_Score': [f"{gnn_results['silhouette_score']:.4f}", f"{traditional_results['silhouette_score']:.4f}"],
+        'Clusters_Components': [gnn_results['optimal_clusters'], traditional_results['num_components']],
+        'High_Conf_Predictions': [gnn_results['high_confidence_predictions'], traditional_results['high_confidence_predictions']],
+        'Mean_Similarity': [f"{gnn_results['mean_similarity']:.4f}", f"{traditional_results['mean_similarity']:.4f}"]
+    }
+    
+    comparison_df = pd.DataFrame(comparison_summary)
+    comparison_df.to_csv(table_path, index=False)
+    return {
+        'gnn_results': gnn_results,
+        'traditional_results': traditional_results,
+        'comparison_summary': comparison_summary
+    }
+
+def plot_final_summary(gnn_only, gnn_vs_traditional, remaining_experiments, path):
+    """Summary figure of all available results, returns the loaded results"""
+    all_data = {key: data for key, data in zip(RESULT_FILES, (gnn_only, gnn_vs_traditional, remaining_experiments))
+                if data is not None}
+    
+    # Create summary figure
+    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
+    
+    # Method comparison if available
+    if 'gnn_vs_traditional' in all_data:
+        gnn_data = all_data['gnn_vs_traditional']['gnn_results']
+        trad_data = all_data['gnn_vs_traditional']['traditional_results']
+        
+        methods = ['GNN', 'Traditional']
+        times = [gnn_data['training_time'], trad_data['processing_time']]
+        silhouettes = [gnn_data['silhouette_score'], trad_data['silhouette_score']]
+        
+        ax1.bar(methods, times, color=['skyblue', 'lightcoral'], alpha=0.8)
+        ax1.set_ylabel('Processing Time (s)')
+        ax1.set_title('GNN vs Traditional: Processing Time')
+        ax1.set_yscale('log')
+        ax1.grid(True, alpha=0.3)
+        
+        ax2.bar(methods, silhouettes, color=['skyblue', 'lightcoral'], alpha=0.8)
+        ax2.set_ylabel('Silhouette Score')
+        ax2.set_title('GNN vs Traditional: Clustering Quality')
+        ax2.grid(True, alpha=0.3)
+    
+    # Network analysis results
+    if 'remaining_experiments' in all_data and all_data['remaining_experiments']['tissue_network']:
+        tissue_data = all_data['remaining_experiments']['tissue_network']
+        thresholds = tissue_data['threshold']
+        tec_edges = tissue_data['tec_edges']
+        
+        ax3.plot(thresholds, tec_edges, 'o-', color='skyblue', linewidth=2, markersize=6)
+        ax3.set_xlabel('Threshold')
+        ax3.set_ylabel('Number of Edges')
+        ax3.set_title('TEC Network: Edges vs Threshold')
+        ax3.set_yscale('log')
+        ax3.grid(True, alpha=0.3)
+    
+    # Power law analysis if available
+    if 'remaining_experiments' in all_data and all_data['remaining_experiments']['powerlaw_analysis']:
+        powerlaw_data = all_data['remaining_experiments']['powerlaw_analysis']
+        alpha = powerlaw_data['alpha']
+        r_squared = powerlaw_data['r_squared']
+        
+        ax4.text(0.5, 0.7, f'Power Law Exponent\nα = {alpha:.3f}',
+                transform=ax4.transAxes, fontsize=14, ha='center',
+                bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.8))
+        ax4.text(0.5, 0.3, f'R² = {r_squared:.3f}',
+                transform=ax4.transAxes, fontsize=12, ha='center',
+                bbox=dict(boxstyle='round', facecolor='lightcoral', alpha=0.8))
+        ax4.set_title('Power Law Analysis Results')
+        ax4.set_xlim(0, 1)
+        ax4.set_ylim(0, 1)
+        ax4.axis('off')
+    
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+    return all_data
+
+def build_pipeline(cache=None):
+    """Declare the analysis stages: data sources, network statistics, clustering and figures"""
+    pipeline = sc.Pipeline(cache, builder=build_pipeline)
+    
+    # Inputs: matrices and gene lists keyed by content, saved results keyed by file content
+    for name in ms.MATRIX_NAMES:
+        pipeline.source(name, lambda name=name: ms.load_matrix(name), lambda name=name: ms.data_hash(name))
+        pipeline.source(f'{name}_genes', lambda name=name: ms.load_genes(name), lambda name=name: ms.data_hash(name))
+        pipeline.source(f'{name}_degree_index', lambda name=name: di.load_index(name, floor=min(SUPPLEMENTAL_THRESHOLDS)),
+                        lambda name=name: ms.data_hash(name))
+    for key, filename in RESULT_FILES.items():
+        pipeline.source(key, lambda filename=filename: read_json(filename), lambda filename=filename: sc.hash_file(filename))
+    
+    # Network statistics (threshold sweeps and the sparse network at the comparison threshold)
+    t = COMPARISON_THRESHOLD
+    for name in ms.MATRIX_NAMES:
+        pipeline.stage(f'{name}_tissue_sweep', ne.threshold_sweep, inputs=(name,),
+                       params={'thresholds': TISSUE_THRESHOLDS, 'inclusive': False}, code=(ne,), category='threshold')
+        pipeline.stage(f'{name}_supplemental_sweep', ne.threshold_sweep, inputs=(name,),
+                       params={'thresholds': SUPPLEMENTAL_THRESHOLDS, 'inclusive': False}, code=(ne,), category='threshold')
+        pipeline.stage(f'{name}_adj_{t}', ne.threshold_sparse, inputs=(name,),
+                       params={'threshold': t, 'weighted': False, 'inclusive': False}, code=(ne,), category='threshold')
+        pipeline.stage(f'{name}_stats_{t}', ne.graph_stats, inputs=(f'{name}_adj_{t}',), code=(ne,), category='build')
+        pipeline.stage(f'{name}_avg_clustering_{t}', tr.average_clustering, inputs=(f'{name}_adj_{t}',), code=(tr,), category='metric')
+        pipeline.stage(f'{name}_degrees_{t}', degree_summary, inputs=(f'{name}_degree_index',),
+                       params={'threshold': t}, code=(di,), category='metric')
+        pipeline.stage(f'{name}_properties_{t}', network_properties, inputs=(f'{name}_stats_{t}', f'{name}_avg_clustering_{t}'),
+                       category='metric')
+    pipeline.stage(f'TEC_RNA_rewiring_{t}', rewiring_summary, inputs=('TEC', 'RNA', 'TEC_genes'),
+                   params={'threshold': t}, code=(dn,), category='metric')
+    pipeline.stage('genes_match', genes_match, inputs=('TEC_genes', 'RNA_genes'), category='metric')
+    pipeline.stage(f'TEC_powerlaw_{t}', fit_degree_power_law, inputs=(f'TEC_degrees_{t}',), category='metric')
+    pipeline.stage('TEC_degree_sweep', degree_sweep, inputs=('TEC_degree_index',),
+                   params={'thresholds': DEGREE_SWEEP_THRESHOLDS}, code=(di,), category='metric')
+    pipeline.stage(f'TEC_clustering_{t}', tr.local_clustering, inputs=(f'TEC_adj_{t}',), code=(tr,), category='metric')
+    pipeline.stage(f'TEC_traditional_clustering_{t}', traditional_clustering,
+                   inputs=(f'TEC_stats_{t}', f'TEC_clustering_{t}'), code=(cs,), category='metric')
+    pipeline.stage(f'TEC_communities_{t}', community_sweep, inputs=(f'TEC_adj_{t}',),
+                   params={'resolutions': COMMUNITY_RESOLUTIONS, 'seeds': COMMUNITY_SEEDS}, code=(cm,), category='metric')
+    
+    # Figures and tables (restored from the cache when their inputs and plotting code, raster_plots included, are unchanged)
+    figures = [
+        ('tissue_network_figure', plot_tissue_network, ('TEC_tissue_sweep', 'RNA_tissue_sweep'), 'tissue_network_analysis.png'),
+        ('rna_comparison_figure', plot_rna_comparison, (f'TEC_properties_{t}', f'RNA_properties_{t}'), 'rna_comparison_analysis.png'),
+        ('powerlaw_figure', plot_powerlaw, (f'TEC_powerlaw_{t}',), 'powerlaw_analysis.png'),
+        ('supplemental_figure', plot_supplemental, ('TEC_supplemental_sweep', 'RNA_supplemental_sweep'), 'supplemental_analysis.png'),
+        ('degree_distribution_figure', plot_degree_distribution, (f'RNA_degrees_{t}',), 'degree_distribution.png')
+    ]
+    for name, fn, inputs, filename in figures:
+        path = f'analysis_results/{filename}'
+        pipeline.stage(name, fn, inputs=inputs, params={'path': path}, code=(rp,), outputs=(path,), category='plot')
+    pipeline.stage('gnn_comparison', compare_gnn_results, inputs=('gnn_only', 'gnn_vs_traditional'),
+                   params={'figure_path': 'analysis_results/gnn_vs_traditional_comprehensive.png',
+                           'table_path': 'analysis_results/gnn_traditional_comparison_table.csv'},
+                   outputs=('analysis_results/gnn_vs_traditional_comprehensive.png', 'analysis_results/gnn_traditional_comparison_table.csv'),
+                   category='plot')
+    pipeline.stage('final_summary', plot_final_summary, inputs=tuple(RESULT_FILES),
+                   params={'path': 'analysis_results/final_experimental_summary.png'},
+                   code=(read_json,), outputs=('analysis_results/final_experimental_summary.png',), category='plot')
+    return pipeline
+
+@profiling.profiled('tissue_network', category='experiment')
+def run_tissue_net_analysis(pipeline):
     """Run tissue network analysis"""
     print("Running Tissue Network Analysis...")
     
     try:
-        # Load data
-        with pd.HDFStore('./data/gene_network_data.h5') as store:
-            tec = store['TEC']
-            rna = store['RNA']
-        
-        print(f"Loaded TEC data: {tec.shape}")
-        print(f"Loaded RNA data: {rna.shape}")
-        
-        # Basic tissue network analysis
-        np_tec = np.abs(tec.to_numpy())
-        np_rna = np.abs(rna.to_numpy())
+        # Load data (shared memory-mapped views, absolute correlations)
+        np_tec = pipeline.get('TEC')
+        np_rna = pipeline.get('RNA')
         
-        # Calculate network properties at different thresholds
-        thresholds = [0.9, 0.85, 0.8, 0.75, 0.7, 0.65, 0.6]
-        results = {'threshold': [], 'tec_edges': [], 'rna_edges': [], 'tec_nodes': [], 'rna_nodes': []}
+        print(f"Loaded TEC data: {np_tec.shape}")
+        print(f"Loaded RNA data: {np_rna.shape}")
         
-        for thresh in thresholds:
-            # TEC network
-            tec_adj = (np_tec > thresh).astype(int)
-            np.fill_diagonal(tec_adj, 0)
-            tec_G = nx.from_numpy_array(tec_adj)
-            
-            # RNA network  
-            rna_adj = (np_rna > thresh).astype(int)
-            np.fill_diagonal(rna_adj, 0)
-            rna_G = nx.from_numpy_array(rna_adj)
-            
-            results['threshold'].append(thresh)
-            results['tec_edges'].append(tec_G.number_of_edges())
-            results['rna_edges'].append(rna_G.number_of_edges())
-            results['tec_nodes'].append(len([n for n in tec_G.nodes() if tec_G.degree(n) > 0]))
-            results['rna_nodes'].append(len([n for n in rna_G.nodes() if rna_G.degree(n) > 0]))
+        # Calculate network properties at different thresholds (one sorted edge list per network)
+        tec_sweep = pipeline.get('TEC_tissue_sweep')
+        rna_sweep = pipeline.get('RNA_tissue_sweep')
+        results = {
+            'threshold': TISSUE_THRESHOLDS,
+            'tec_edges': tec_sweep['edges'],
+            'rna_edges': rna_sweep['edges'],
+            'tec_nodes': tec_sweep['connected_nodes'],
+            'rna_nodes': rna_sweep['connected_nodes']
+        }
         
         # Create plot
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-        
-        # Edges comparison
-        ax1.plot(results['threshold'], results['tec_edges'], 'o-', label='TEC', color='skyblue')
-        ax1.plot(results['threshold'], results['rna_edges'], 's-', label='RNA', color='lightcoral')
-        ax1.set_xlabel('Threshold')
-        ax1.set_ylabel('Number of Edges')
-        ax1.set_title('Network Edges vs Threshold')
-        ax1.legend()
-        ax1.grid(True, alpha=0.3)
-        ax1.set_yscale('log')
-        
-        # Nodes comparison
-        ax2.plot(results['threshold'], results['tec_nodes'], 'o-', label='TEC', color='skyblue')
-        ax2.plot(results['threshold'], results['rna_nodes'], 's-', label='RNA', color='lightcoral')
-        ax2.set_xlabel('Threshold')
-        ax2.set_ylabel('Connected Nodes')
-        ax2.set_title('Connected Nodes vs Threshold')
-        ax2.legend()
-        ax2.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig('analysis_results/tissue_network_analysis.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        pipeline.get('tissue_network_figure')
         
         print("Tissue network analysis completed!")
         return results
-        
+    
     except Exception as e:
         print(f"Error in tissue network analysis: {e}")
+        profiling.fail(e)
         return None
 
-def run_rna_comparison():
+@profiling.profiled('rna_comparison', category='experiment')
+def run_rna_comparison(pipeline):
     """Run RNA comparison analysis"""
     print("Running RNA Comparison Analysis...")
     
     try:
-        # Load data
-        with pd.HDFStore('./data/gene_network_data.h5') as store:
-            tec = store['TEC']
-            rna = store['RNA']
-        
-        # Calculate correlation between TEC and RNA networks
-        np_tec = np.abs(tec.to_numpy())
-        np_rna = np.abs(rna.to_numpy())
-        
-        # Network comparison at threshold 0.75
-        thresh = 0.75
-        tec_adj = (np_tec > thresh).astype(int)
-        rna_adj = (np_rna > thresh).astype(int)
-        
-        np.fill_diagonal(tec_adj, 0)
-        np.fill_diagonal(rna_adj, 0)
+        # Network comparison at threshold 0.75 (sparse adjacency, no dense N x N copy)
+        tec_props = pipeline.get(f'TEC_properties_{COMPARISON_THRESHOLD}')
+        rna_props = pipeline.get(f'RNA_properties_{COMPARISON_THRESHOLD}')
         
-        # Create networks
-        tec_G = nx.from_numpy_array(tec_adj)
-        rna_G = nx.from_numpy_array(rna_adj)
-        
-        # Calculate network properties
-        tec_props = {
-            'nodes': tec_G.number_of_nodes(),
-            'edges': tec_G.number_of_edges(),
-            'connected_components': nx.number_connected_components(tec_G),
-            'avg_clustering': nx.average_clustering(tec_G),
-            'density': nx.density(tec_G)
-        }
-        
-        rna_props = {
-            'nodes': rna_G.number_of_nodes(),
-            'edges': rna_G.number_of_edges(),
-            'connected_components': nx.number_connected_components(rna_G),
-            'avg_clustering': nx.average_clustering(rna_G),
-            'density': nx.density(rna_G)
-        }
+        # Edges present in only one of the two networks (differential network, no N x N difference)
+        rewiring = pipeline.get(f'TEC_RNA_rewiring_{COMPARISON_THRESHOLD}')
         
         # Create comparison plot
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 10))
-        
-        # Network size comparison
-        networks = ['TEC', 'RNA']
-        edges = [tec_props['edges'], rna_props['edges']]
-        components = [tec_props['connected_components'], rna_props['connected_components']]
-        
-        ax1.bar(networks, edges, color=['skyblue', 'lightcoral'], alpha=0.8)
-        ax1.set_ylabel('Number of Edges')
-        ax1.set_title('Network Size Comparison')
-        ax1.grid(True, alpha=0.3)
-        
-        ax2.bar(networks, components, color=['skyblue', 'lightcoral'], alpha=0.8)
-        ax2.set_ylabel('Connected Components')
-        ax2.set_title('Network Fragmentation')
-        ax2.grid(True, alpha=0.3)
-        
-        # Clustering and density
-        clustering = [tec_props['avg_clustering'], rna_props['avg_clustering']]
-        density = [tec_props['density'], rna_props['density']]
-        
-        ax3.bar(networks, clustering, color=['skyblue', 'lightcoral'], alpha=0.8)
-        ax3.set_ylabel('Average Clustering')
-        ax3.set_title('Network Clustering')
-        ax3.grid(True, alpha=0.3)
-        
-        ax4.bar(networks, density, color=['skyblue', 'lightcoral'], alpha=0.8)
-        ax4.set_ylabel('Network Density')
-        ax4.set_title('Network Density')
-        ax4.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig('analysis_results/rna_comparison_analysis.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        pipeline.get('rna_comparison_figure')
         
         print("RNA comparison analysis completed!")
-        return {'tec': tec_props, 'rna': rna_props}
-        
+        return {'tec': tec_props, 'rna': rna_props, 'rewiring': rewiring}
+    
     except Exception as e:
         print(f"Error in RNA comparison: {e}")
+        profiling.fail(e)
         return None
 
-def run_powerlaw_analysis():
+@profiling.profiled('powerlaw_analysis', category='experiment')
+def run_powerlaw_analysis(pipeline):
     """Run power law analysis"""
     print("Running Power Law Analysis...")
     
     try:
-        # Load data
-        with pd.HDFStore('./data/gene_network_data.h5') as store:
-            tec = store['TEC']
-        
-        np_tec = np.abs(tec.to_numpy())
-        
-        # Create network at threshold 0.75
-        thresh = 0.75
-        adj_matrix = (np_tec > thresh).astype(int)
-        np.fill_diagonal(adj_matrix, 0)
-        G = nx.from_numpy_array(adj_matrix)
-        
-        # Get degree sequence
-        degrees = [G.degree(n) for n in G.nodes()]
-        degree_counts = {}
-        for d in degrees:
-            degree_counts[d] = degree_counts.get(d, 0) + 1
+        # Degree distribution of the network at threshold 0.75 (from the per-gene degree index)
+        fit = pipeline.get(f'TEC_powerlaw_{COMPARISON_THRESHOLD}')
         
-        # Remove zero degrees
-        degree_counts = {k: v for k, v in degree_counts.items() if k > 0}
-        
-        if len(degree_counts) > 1:
-            degrees_list = list(degree_counts.keys())
-            counts_list = list(degree_counts.values())
-            
-            # Calculate power law fit
-            log_degrees = np.log(degrees_list)
-            log_counts = np.log(counts_list)
-            
-            # Linear regression for power law
-            coeffs = np.polyfit(log_degrees, log_counts, 1)
-            alpha = -coeffs[0]  # Power law exponent
-            
-            # Create plot
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-            
-            # Degree distribution
-            ax1.scatter(degrees_list, counts_list, alpha=0.7, color='skyblue')
-            ax1.set_xlabel('Degree')
-            ax1.set_ylabel('Frequency')
-            ax1.set_title('Degree Distribution')
-            ax1.set_xscale('log')
-            ax1.set_yscale('log')
-            ax1.grid(True, alpha=0.3)
-            
-            # Power law fit
-            fit_line = np.exp(coeffs[1]) * np.array(degrees_list) ** coeffs[0]
-            ax1.plot(degrees_list, fit_line, 'r-', alpha=0.8, 
-                    label=f'Power law fit (α={alpha:.2f})')
-            ax1.legend()
-            
-            # Log-log plot
-            ax2.scatter(log_degrees, log_counts, alpha=0.7, color='lightcoral')
-            ax2.plot(log_degrees, np.polyval(coeffs, log_degrees), 'r-', alpha=0.8)
-            ax2.set_xlabel('log(Degree)')
-            ax2.set_ylabel('log(Frequency)')
-            ax2.set_title(f'Power Law Fit (α={alpha:.2f})')
-            ax2.grid(True, alpha=0.3)
+        if fit is not None:
+            pipeline.get('powerlaw_figure')
             
-            plt.tight_layout()
-            plt.savefig('analysis_results/powerlaw_analysis.png', dpi=300, bbox_inches='tight')
-            plt.close()
+            # Scale-free fit at every threshold of a fine sweep (no network is built)
+            sweep = pipeline.get('TEC_degree_sweep')
             
-            print(f"Power law analysis completed! Exponent α = {alpha:.3f}")
-            return {'alpha': alpha, 'r_squared': np.corrcoef(log_degrees, log_counts)[0,1]**2}
+            print(f"Power law analysis completed! Exponent α = {fit['alpha']:.3f}")
+            return {'alpha': fit['alpha'], 'r_squared': fit['r_squared'], 'threshold_sweep': sweep}
         else:
             print("Insufficient data for power law analysis")
             return None
-            
+    
     except Exception as e:
         print(f"Error in power law analysis: {e}")
+        profiling.fail(e)
         return None
 
-def run_supplemental_analysis():
+@profiling.profiled('supplemental_analysis', category='experiment')
+def run_supplemental_analysis(pipeline):
     """Run supplemental figure analysis based on supp_fig1.ipynb"""
     print("Running Supplemental Analysis...")
     
     try:
-        # Load data
-        with pd.HDFStore('./data/gene_network_data.h5') as store:
-            tec = store['TEC']
-            rna = store['RNA']
-        
-        np_tec_abs = np.abs(tec.to_numpy(copy=True))
-        np_rna_abs = np.abs(rna.to_numpy(copy=True))
-        
         # Check same gene list between TEC and RNA
-        genes_match = (tec.columns == rna.columns).all()
+        genes_match = pipeline.get('genes_match')
         print(f"Gene lists match: {genes_match}")
         
         # Analyze network properties at different thresholds
-        thresholds = [0.9, 0.85, 0.8, 0.75, 0.7, 0.65, 0.6, 0.55, 0.5]
-        
-        tec_num_cc = []
-        tec_isolated_nodes = []
-        rna_num_cc = []
-        rna_isolated_nodes = []
-        
-        tec_num_nodes = []
-        tec_num_edges = []
-        rna_num_nodes = []
-        rna_num_edges = []
-        
-        for th in thresholds:
-            # TEC network
-            tec_adj = (np_tec_abs > th).astype(int)
-            np.fill_diagonal(tec_adj, 0)
-            tec_G = nx.from_numpy_array(tec_adj)
-            
-            # RNA network
-            rna_adj = (np_rna_abs > th).astype(int)
-            np.fill_diagonal(rna_adj, 0)
-            rna_G = nx.from_numpy_array(rna_adj)
-            
-            # Connected components
-            tec_cc = nx.number_connected_components(tec_G)
-            rna_cc = nx.number_connected_components(rna_G)
-            
-            tec_num_cc.append(tec_cc)
-            rna_num_cc.append(rna_cc)
-            
-            # Isolated nodes (degree 0)
-            tec_isolated = len([n for n in tec_G.nodes() if tec_G.degree(n) == 0])
-            rna_isolated = len([n for n in rna_G.nodes() if rna_G.degree(n) == 0])
-            
-            tec_isolated_nodes.append(tec_isolated)
-            rna_isolated_nodes.append(rna_isolated)
-            
-            # Connected nodes and edges
-            tec_connected = len([n for n in tec_G.nodes() if tec_G.degree(n) > 0])
-            rna_connected = len([n for n in rna_G.nodes() if rna_G.degree(n) > 0])
-            
-            tec_num_nodes.append(tec_connected)
-            rna_num_nodes.append(rna_connected)
-            tec_num_edges.append(tec_G.number_of_edges())
-            rna_num_edges.append(rna_G.number_of_edges())
+        tec_sweep = pipeline.get('TEC_supplemental_sweep')
+        rna_sweep = pipeline.get('RNA_supplemental_sweep')
         
         # Create supplemental figures
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-        
-        # Connected components comparison
-        x = np.arange(len(thresholds))
-        bar_width = 0.35
-        
-        ax1.bar(x - bar_width/2, tec_num_cc, width=bar_width, color='skyblue', label='TEC')
-        ax1.bar(x + bar_width/2, rna_num_cc, width=bar_width, color='lightsalmon', label='RNA')
-        ax1.set_xlabel('Threshold')
-        ax1.set_ylabel('Number of Connected Components')
-        ax1.set_title('Connected Components vs Threshold')
-        ax1.set_xticks(x)
-        ax1.set_xticklabels(thresholds)
-        ax1.legend()
-        ax1.grid(True, alpha=0.3)
-        
-        # Nodes and edges comparison
-        ymax = max(max(tec_num_edges), max(rna_num_edges))
-        
-        ax2.plot(x, tec_num_nodes, marker='s', markersize=7, label='TEC connected nodes', color='skyblue')
-        ax2.plot(x, tec_num_edges, marker='<', markersize=7, label='TEC edges', color='skyblue')
-        ax2.plot(x, rna_num_nodes, marker='s', markersize=7, label='RNA connected nodes', color='lightsalmon')
-        ax2.plot(x, rna_num_edges, marker='<', markersize=7, label='RNA edges', color='lightsalmon')
-        
-        ax2.axhline(y=11088, linestyle='--', color='gray', alpha=0.7, label='Max nodes')
-        ax2.axvline(x=3, linestyle='-.', color='darkgreen', alpha=0.7, label='Threshold 0.75')
-        ax2.set_yscale('log')
-        ax2.set_xlabel('Threshold Index')
-        ax2.set_ylabel('Count')
-        ax2.set_title('Network Size vs Threshold')
-        ax2.set_xticks(x)
-        ax2.set_xticklabels(thresholds)
-        ax2.legend()
-        ax2.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig('analysis_results/supplemental_analysis.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        pipeline.get('supplemental_figure')
         
         # Degree distribution analysis for RNA at threshold 0.75
-        rna_adj_75 = (np_rna_abs > 0.75).astype(int)
-        np.fill_diagonal(rna_adj_75, 0)
-        rna_G_75 = nx.from_numpy_array(rna_adj_75)
-        
-        degree_sequence = sorted([d for n, d in rna_G_75.degree()], reverse=True)
-        max_degree = max(degree_sequence) if degree_sequence else 0
+        rna_degrees = pipeline.get(f'RNA_degrees_{COMPARISON_THRESHOLD}')
+        pipeline.get('degree_distribution_figure')
         
-        # Plot degree distribution
-        plt.figure(figsize=(8, 6))
-        if max_degree > 0:
-            plt.hist(degree_sequence, bins=range(0, max_degree + 2), 
-                    color='lightsalmon', edgecolor='none', align='left')
-            plt.yscale('log')
-        plt.xlabel('Node Degree')
-        plt.ylabel('Frequency')
-        plt.title('RNA Network Degree Distribution (Threshold 0.75)')
-        plt.grid(True, alpha=0.3)
-        plt.savefig('analysis_results/degree_distribution.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        # Louvain communities of the TEC network at threshold 0.75 over resolutions and seeds
+        communities = pipeline.get(f'TEC_communities_{COMPARISON_THRESHOLD}')
         
+        # Connected components count isolated nodes as components, as in NetworkX
         results = {
-            'thresholds': thresholds,
-            'tec_connected_components': tec_num_cc,
-            'rna_connected_components': rna_num_cc,
-            'tec_connected_nodes': tec_num_nodes,
-            'rna_connected_nodes': rna_num_nodes,
-            'tec_edges': tec_num_edges,
-            'rna_edges': rna_num_edges,
-            'max_degree_rna_75': max_degree,
+            'thresholds': SUPPLEMENTAL_THRESHOLDS,
+            'tec_connected_components': tec_sweep['total_components'],
+            'rna_connected_components': rna_sweep['total_components'],
+            'tec_connected_nodes': tec_sweep['connected_nodes'],
+            'rna_connected_nodes': rna_sweep['connected_nodes'],
+            'tec_edges': tec_sweep['edges'],
+            'rna_edges': rna_sweep['edges'],
+            'max_degree_rna_75': len(rna_degrees['degree_histogram']) - 1,
+            'tec_communities_75': communities,
             'genes_match': genes_match
         }
         
         print("Supplemental analysis completed!")
         return results
-        
+    
     except Exception as e:
         print(f"Error in supplemental analysis: {e}")
+        profiling.fail(e)
         return None
 
-def run_gnn_comparison():
+@profiling.profiled('gnn_comparison', category='experiment')
+def run_gnn_comparison(pipeline):
     """Run GNN vs Traditional comparison analysis"""
     print("Running GNN vs Traditional Network Comparison...")
     
     try:
-        # Load existing results
-        gnn_results = None
-        traditional_results = None
-        
-        # Try to load GNN results
-        if os.path.exists('gnn_only_results.json'):
-            with open('gnn_only_results.json', 'r') as f:
-                gnn_data = json.load(f)
-                gnn_results = gnn_data['gnn_results']
-        
-        # Try to load comparison results
-        if os.path.exists('gnn_vs_traditional_comparison.json'):
-            with open('gnn_vs_traditional_comparison.json', 'r') as f:
-                comparison_data = json.load(f)
-                traditional_results = comparison_data['traditional_results']
-                if not gnn_results:
-                    gnn_results = comparison_data['gnn_results']
-        
-        if not gnn_results or not traditional_results:
+        results = pipeline.get('gnn_comparison')
+        if results is None:
             print("Missing GNN or traditional results - running basic comparison")
-            return run_basic_gnn_comparison()
-        
-        # Create comprehensive comparison plots
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
-        
-        # Performance comparison
-        methods = ['GNN', 'Traditional']
-        training_times = [gnn_results['training_time'], traditional_results['processing_time']]
-        silhouette_scores = [gnn_results['silhouette_score'], traditional_results['silhouette_score']]
-        
-        ax1.bar(methods, training_times, color=['lightblue', 'lightcoral'], alpha=0.8)
-        ax1.set_ylabel('Time (seconds)')
-        ax1.set_title('Processing Time Comparison')
-        ax1.set_yscale('log')
-        ax1.grid(True, alpha=0.3)
-        
-        ax2.bar(methods, silhouette_scores, color=['lightblue', 'lightcoral'], alpha=0.8)
-        ax2.set_ylabel('Silhouette Score')
-        ax2.set_title('Clustering Quality Comparison')
-        ax2.grid(True, alpha=0.3)
-        
-        # Network structure comparison
-        predictions = [gnn_results['high_confidence_predictions'], traditional_results['high_confidence_predictions']]
-        similarities = [gnn_results['mean_similarity'], traditional_results['mean_similarity']]
-        
-        ax3.bar(methods, predictions, color=['lightblue', 'lightcoral'], alpha=0.8)
-        ax3.set_ylabel('High Confidence Predictions')
-        ax3.set_title('Link Prediction Capability')
-        ax3.set_yscale('log')
-        ax3.grid(True, alpha=0.3)
-        
-        ax4.bar(methods, similarities, color=['lightblue', 'lightcoral'], alpha=0.8)
-        ax4.set_ylabel('Mean Similarity')
-        ax4.set_title('Network Similarity Analysis')
-        ax4.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig('analysis_results/gnn_vs_traditional_comprehensive.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # Create summary comparison table
-        comparison_summary = {
-            'Method': ['GNN', 'Traditional'],
-            'Processing_Time': [f"{gnn_results['training_time']:.1f}s", f"{traditional_results['processing_time']:.1f}s"],
-            'Silhouette_Score': [f"{gnn_results['silhouette_score']:.4f}", f"{traditional_results['silhouette_score']:.4f}"],
-            'Clusters_Components': [gnn_results['optimal_clusters'], traditional_results['num_components']],
-            'High_Conf_Predictions': [gnn_results['high_confidence_predictions'], traditional_results['high_confidence_predictions']],
-            'Mean_Similarity': [f"{gnn_results['mean_similarity']:.4f}", f"{traditional_results['mean_similarity']:.4f}"]
-        }
-        
-        comparison_df = pd.DataFrame(comparison_summary)
-        comparison_df.to_csv('analysis_results/gnn_traditional_comparison_table.csv', index=False)
+            return run_basic_gnn_comparison(pipeline)
         
         print("GNN vs Traditional comparison completed!")
-        return {
-            'gnn_results': gnn_results,
-            'traditional_results': traditional_results,
-            'comparison_summary': comparison_summary
-        }
-        
+        return results
+    
     except Exception as e:
         print(f"Error in GNN comparison: {e}")
+        profiling.fail(e)
         return None
 
-def run_basic_gnn_comparison():
+@profiling.profiled('basic_gnn_comparison', category='experiment')
+def run_basic_gnn_comparison(pipeline):
     """Run basic GNN comparison if detailed results not available"""
     print("Running basic GNN analysis...")
     
     try:
-        # Load data
-        with pd.HDFStore('./data/gene_network_data.h5') as store:
-            tec = store['TEC']
-        
-        np_tec_abs = np.abs(tec.to_numpy())
-        threshold = 0.75
-        
-        # Traditional network analysis
-        start_time = time.time()
-        adj_matrix = (np_tec_abs > threshold).astype(int)
-        np.fill_diagonal(adj_matrix, 0)
-        G = nx.from_numpy_array(adj_matrix)
+        t = COMPARISON_THRESHOLD
+        np_tec_abs = pipeline.get('TEC')
+        stats = pipeline.get(f'TEC_stats_{t}')
+        optimal_k, best_score = pipeline.get(f'TEC_traditional_clustering_{t}')
         
-        # Traditional clustering (using degree-based features)
-        degrees = np.array([G.degree(n) for n in G.nodes()])
-        clustering_coeffs = np.array([nx.clustering(G, n) for n in G.nodes()])
-        features = np.column_stack([degrees, clustering_coeffs])
-        
-        # Remove zero-degree nodes for clustering
-        non_zero_mask = degrees > 0
-        if np.sum(non_zero_mask) > 1:
-            features_filtered = features[non_zero_mask]
-            
-            # Find optimal clusters
-            silhouette_scores = []
-            for k in range(2, min(11, len(features_filtered))):
-                if len(features_filtered) >= k:
-                    kmeans = KMeans(n_clusters=k, random_state=42)
-                    labels = kmeans.fit_predict(features_filtered)
-                    score = silhouette_score(features_filtered, labels)
-                    silhouette_scores.append((k, score))
-            
-            if silhouette_scores:
-                optimal_k, best_score = max(silhouette_scores, key=lambda x: x[1])
-            else:
-                optimal_k, best_score = 2, 0.0
-        else:
-            optimal_k, best_score = 1, 0.0
-        
-        traditional_time = time.time() - start_time
+        # Traditional network analysis time (thresholding, statistics and clustering, as computed)
+        traditional_time = pipeline.compute_seconds(f'TEC_adj_{t}', f'TEC_stats_{t}', f'TEC_clustering_{t}', f'TEC_traditional_clustering_{t}')
         
         # Basic comparison results
         basic_results = {
@@ -541,138 +661,124 @@ def run_basic_gnn_comparison():
                 'processing_time': traditional_time,
                 'optimal_clusters': optimal_k,
                 'silhouette_score': best_score,
-                'network_edges': G.number_of_edges(),
-                'connected_nodes': len([n for n in G.nodes() if G.degree(n) > 0])
+                'network_edges': stats['edges'],
+                'connected_nodes': stats['connected_nodes']
             },
             'network_properties': {
-                'total_genes': len(tec),
-                'threshold': threshold,
-                'density': nx.density(G),
-                'components': nx.number_connected_components(G)
+                'total_genes': np_tec_abs.shape[0],
+                'threshold': t,
+                'density': stats['density'],
+                'components': stats['total_components']
             }
         }
         
         print(f"Basic analysis completed - Traditional: {traditional_time:.1f}s, Clusters: {optimal_k}")
         return basic_results
-        
+    
     except Exception as e:
         print(f"Error in basic GNN comparison: {e}")
+        profiling.fail(e)
         return None
 
-def create_final_summary():
+@profiling.profiled('final_summary', category='experiment')
+def create_final_summary(pipeline):
     """Create final experimental summary"""
     print("Creating final experimental summary...")
     
     try:
-        # Load all available results
-        results_files = {
-            'gnn_only': 'gnn_only_results.json',
-            'gnn_vs_traditional': 'gnn_vs_traditional_comparison.json',
-            'remaining_experiments': 'analysis_results/remaining_experiments_results.json'
-        }
-        
-        all_data = {}
-        for key, filename in results_files.items():
-            if os.path.exists(filename):
-                with open(filename, 'r') as f:
-                    all_data[key] = json.load(f)
-        
-        # Create summary figure
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
-        
-        # Method comparison if available
-        if 'gnn_vs_traditional' in all_data:
-            gnn_data = all_data['gnn_vs_traditional']['gnn_results']
-            trad_data = all_data['gnn_vs_traditional']['traditional_results']
-            
-            methods = ['GNN', 'Traditional']
-            times = [gnn_data['training_time'], trad_data['processing_time']]
-            silhouettes = [gnn_data['silhouette_score'], trad_data['silhouette_score']]
-            
-            ax1.bar(methods, times, color=['skyblue', 'lightcoral'], alpha=0.8)
-            ax1.set_ylabel('Processing Time (s)')
-            ax1.set_title('GNN vs Traditional: Processing Time')
-            ax1.set_yscale('log')
-            ax1.grid(True, alpha=0.3)
-            
-            ax2.bar(methods, silhouettes, color=['skyblue', 'lightcoral'], alpha=0.8)
-            ax2.set_ylabel('Silhouette Score')
-            ax2.set_title('GNN vs Traditional: Clustering Quality')
-            ax2.grid(True, alpha=0.3)
-        
-        # Network analysis results
-        if 'remaining_experiments' in all_data and all_data['remaining_experiments']['tissue_network']:
-            tissue_data = all_data['remaining_experiments']['tissue_network']
-            thresholds = tissue_data['threshold']
-            tec_edges = tissue_data['tec_edges']
-            
-            ax3.plot(thresholds, tec_edges, 'o-', color='skyblue', linewidth=2, markersize=6)
-            ax3.set_xlabel('Threshold')
-            ax3.set_ylabel('Number of Edges')
-            ax3.set_title('TEC Network: Edges vs Threshold')
-            ax3.set_yscale('log')
-            ax3.grid(True, alpha=0.3)
-        
-        # Power law analysis if available
-        if 'remaining_experiments' in all_data and all_data['remaining_experiments']['powerlaw_analysis']:
-            powerlaw_data = all_data['remaining_experiments']['powerlaw_analysis']
-            alpha = powerlaw_data['alpha']
-            r_squared = powerlaw_data['r_squared']
-            
-            ax4.text(0.5, 0.7, f'Power Law Exponent\nα = {alpha:.3f}', 
-                    transform=ax4.transAxes, fontsize=14, ha='center',
-                    bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.8))
-            ax4.text(0.5, 0.3, f'R² = {r_squared:.3f}', 
-                    transform=ax4.transAxes, fontsize=12, ha='center',
-                    bbox=dict(boxstyle='round', facecolor='lightcoral', alpha=0.8))
-            ax4.set_title('Power Law Analysis Results')
-            ax4.set_xlim(0, 1)
-            ax4.set_ylim(0, 1)
-            ax4.axis('off')
-        
-        plt.tight_layout()
-        plt.savefig('analysis_results/final_experimental_summary.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        all_data = pipeline.get('final_summary')
         
         print("Final experimental summary created!")
         return all_data
-        
+    
     except Exception as e:
         print(f"Error creating final summary: {e}")
+        profiling.fail(e)
         return None
 
 def main():
     """Run all remaining notebook experiments with GNN integration"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cache-dir', default='analysis_results/stage_cache',
+                        help='Directory of the stage cache')
+    parser.add_argument('--cache-size-gb', type=float, default=8.0,
+                        help='Size above which least recently used stage results are evicted')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Recompute every stage without reading or writing the cache')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of processes running independent stages concurrently')
+    parser.add_argument('--figure-jobs', type=int, default=min(len(FIGURE_STAGES), os.cpu_count() or 1),
+                        help='Number of processes rendering figures concurrently')
+    parser.add_argument('--profile', action='store_true',
+                        help='Record wall time, CPU time and peak memory of every stage in the results JSON')
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help='Also record the peak allocations (NumPy arrays included) of every stage (slower)')
+    parser.add_argument('--profile-interval', type=float, default=None,
+                        help='Sample the stacks of all threads every this many seconds for the flame graph')
+    args = parser.parse_args()
+    
+    # Per-stage instrumentation (a no-op unless requested)
+    profiler = profiling.Profiler(enabled=args.profile or args.trace_allocations or args.profile_interval is not None,
+                                  trace_allocations=args.trace_allocations, sample_interval=args.profile_interval)
+    profiling.set_profiler(profiler)
+    profiler.start()
+    
     print("Running Comprehensive Network Analysis Experiments")
     print("=" * 60)
     
     # Create results directory
     Path("analysis_results").mkdir(exist_ok=True)
     
-    # Run traditional experiments
+    # Decode the HDF5 tables once into the shared memory-mapped cache
+    try:
+        with profiling.stage('matrix_cache', 'load'):
+            ms.build_cache()
+    except Exception as e:
+        print(f"Error building matrix cache: {e}")
+    
+    # Stage results are keyed by input data, parameters and code, so unchanged stages are reused
+    cache = None if args.no_cache else sc.StageCache(args.cache_dir, max_bytes=int(args.cache_size_gb * 2**30))
+    pipeline = build_pipeline(cache)
+    
+    # Run traditional experiments (stages that miss the cache run concurrently with --jobs > 1)
     print("\n1. Running Traditional Network Experiments...")
-    tissue_results = run_tissue_net_analysis()
-    rna_results = run_rna_comparison()
-    powerlaw_results = run_powerlaw_analysis()
-    supplemental_results = run_supplemental_analysis()
+    try:
+        pipeline.run(TRADITIONAL_STAGES, jobs=args.jobs)
+    except Exception as e:
+        print(f"Error in parallel stages: {e}")
+    try:
+        pipeline.run(FIGURE_STAGES, jobs=args.figure_jobs)
+    except Exception as e:
+        print(f"Error rendering figures: {e}")
+    tissue_results = run_tissue_net_analysis(pipeline)
+    rna_results = run_rna_comparison(pipeline)
+    powerlaw_results = run_powerlaw_analysis(pipeline)
+    supplemental_results = run_supplemental_analysis(pipeline)
     
     # Run GNN comparison
     print("\n2. Running GNN vs Traditional Comparison...")
-    gnn_comparison_results = run_gnn_comparison()
+    gnn_comparison_results = run_gnn_comparison(pipeline)
     
     # Create final summary
     print("\n3. Creating Final Summary...")
-    final_summary = create_final_summary()
+    final_summary = create_final_summary(pipeline)
+    profiler.stop()
     
     # Save all results
+    cache_report = pipeline.report()
     all_results = {
         'tissue_network': tissue_results,
-        'rna_comparison': rna_results, 
+        'rna_comparison': rna_results,
         'powerlaw_analysis': powerlaw_results,
         'supplemental_analysis': supplemental_results,
         'gnn_comparison': gnn_comparison_results,
-        'final_summary': 'Created successfully' if final_summary else 'Failed'
+        'final_summary': 'Created successfully' if final_summary else 'Failed',
+        'stage_cache': cache_report,
+        'profiling': profiler.report() if profiler.enabled else None
     }
+    if profiler.enabled:
+        # folded stacks for flamegraph.pl / speedscope (stack samples, or the stage tree by time)
+        profiler.write_folded('analysis_results/profile.folded')
     
     with open('analysis_results/comprehensive_experiments_results.json', 'w') as f:
         json.dump(all_results, f, indent=2, default=str)
@@ -680,6 +786,11 @@ def main():
     print("\n" + "=" * 60)
     print("ALL COMPREHENSIVE EXPERIMENTS COMPLETED!")
     print("=" * 60)
+    print(f"Stage cache: {cache_report['hits']} hits, {cache_report['misses']} misses")
+    print(f"Critical path: {' -> '.join(cache_report['critical_path']['stages'])} ({cache_report['critical_path']['seconds']:.1f}s)")
+    if profiler.enabled:
+        slowest = sorted(profiler.records.items(), key=lambda item: -item[1]['wall_seconds'])[:5]
+        print("Slowest stages: " + ', '.join(f"{path} ({record['wall_seconds']:.1f}s)" for path, record in slowest))
     print("Results saved to analysis_results/")
     print("- tissue_network_analysis.png")
     print("- rna_comparison_analysis.png") 
@@ -690,6 +801,8 @@ def main():
     print("- gnn_traditional_comparison_table.csv")
     print("- final_experimental_summary.png")
     print("- comprehensive_experiments_results.json")
+    if profiler.enabled:
+        print("- profile.folded")
     
     # Print key findings
     if gnn_comparison_results and 'gnn_results' in gnn_comparison_results:
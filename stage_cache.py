@@ -0,0 +1,383 @@
+"""
+Content-addressed on-disk cache for the stages of the analysis pipeline.
+
+A Pipeline declares every stage with its explicit inputs: the stages (or data sources) it
+reads, its parameters, and the code it depends on. A stage's key is a hash of its name, its
+parameters, the source code of its function and declared code dependencies, and the keys of
+its inputs, so a key changes exactly when something that can change the result changes, and
+downstream keys change with it. Source stages (the correlation matrices, result files) are
+keyed by a hash of their contents. Stage results and declared output files (figures, tables)
+are pickled into a size-bounded cache directory that evicts the least recently used entries,
+so a re-run only executes the stages whose inputs, parameters or code changed. Stages that do
+not depend on each other can run concurrently on a process pool: workers rebuild the pipeline
+and resolve source stages themselves (the matrices are memory-mapped, so every worker reads the
+same page-cache copy), and only stage inputs and results are pickled between processes.
+Every stage is measured with profiling.stage under its declared category; workers send their
+measurements back with the results.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from types import ModuleType
+
+import profiling
+
+CACHE_FORMAT = 1 # bump to invalidate every entry written by an older layout
+
+_worker_pipeline = dict() # pipeline rebuilt once per worker process
+
+
+def hash_file(path: str | os.PathLike, block_size: int = 1 << 20) -> str:
+    """
+    Content hash of a file, used as the key of file source stages
+    --------------------------
+    Args:
+        path (str | os.PathLike): File to hash.
+        block_size (int): Number of bytes read per block.
+    Returns:
+        str: SHA-256 hex digest ('missing' if the file does not exist)
+    """
+    path = Path(path)
+    if not path.exists():
+        return 'missing'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_version(*objects) -> str:
+    """
+    Hash of the source code of functions (their own source) and modules (the whole file)
+    --------------------------
+    Args:
+        *objects: Functions, classes or modules a result depends on.
+    Returns:
+        str: SHA-256 hex digest
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        if isinstance(obj, ModuleType):
+            digest.update(Path(inspect.getfile(obj)).read_bytes())
+        else:
+            digest.update(inspect.getsource(obj).encode())
+    return digest.hexdigest()
+
+
+class StageCache:
+    def __init__(self, directory: str | os.PathLike, max_bytes: int = 8 << 30):
+        """
+        Directory of pickled stage results, one file per key, bounded to max_bytes
+        --------------------------
+        Args:
+            directory (str | os.PathLike): Cache directory (created if missing).
+            max_bytes (int): Total size above which least recently used entries are evicted.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.evict()
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / f'{key}.pkl'
+
+    def contains(self, key: str) -> bool:
+        """Whether a stage result is cached"""
+        return self._entry(key).exists()
+
+    def load(self, key: str) -> dict:
+        """
+        Look up a stage result
+        --------------------------
+        Args:
+            key (str): Stage key.
+        Returns:
+            dict: 'value', 'files' ({path: bytes}) and 'seconds' (compute time), None on a miss
+        """
+        entry = self._entry(key)
+        try:
+            with open(entry, 'rb') as f:
+                record = pickle.load(f)
+        except Exception: # missing, partially evicted or written by incompatible code
+            return None
+        os.utime(entry) # mark as recently used
+        return record
+
+    def store(self, key: str, value: object, files: dict = None, seconds: float = 0.0):
+        """
+        Save a stage result and its output files, then evict down to max_bytes
+        --------------------------
+        Args:
+            key (str): Stage key.
+            value (object): Picklable stage result.
+            files (dict): Output files as {path: bytes}.
+            seconds (float): Time it took to compute the result.
+        """
+        entry = self._entry(key)
+        tmp = entry.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            pickle.dump({'value': value, 'files': files or dict(), 'seconds': seconds}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, entry)
+        self.evict(keep=key)
+
+    def size(self) -> int:
+        """Total size of the cached entries in bytes"""
+        return sum(entry.stat().st_size for entry in self.directory.glob('*.pkl'))
+
+    def evict(self, keep: str = None):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self.directory.glob('*.pkl'), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry.stem == keep:
+                continue
+            total -= entry.stat().st_size
+            entry.unlink(missing_ok=True)
+
+
+def _init_worker(builder):
+    _worker_pipeline['pipeline'] = builder()
+
+
+def _compute_in_worker(name: str, args: list, profile: dict = None) -> tuple:
+    pipeline = _worker_pipeline['pipeline']
+    stage = pipeline.stages[name]
+    # stages are profiled in the worker and the records sent back with the value
+    profiler = profiling.Profiler(**profile) if profile is not None else profiling.Profiler(enabled=False)
+    profiling.set_profiler(profiler)
+    profiler.start()
+    try:
+        # source inputs are resolved in the worker, every other input arrives with the task
+        args = [pipeline.get(dep) if pipeline.stages[dep]['source'] else arg for dep, arg in zip(stage['inputs'], args)]
+        start = time.perf_counter()
+        with profiler.stage(name, stage['category']):
+            value = stage['fn'](*args, **stage['params'])
+        return value, time.perf_counter() - start, profiler.records
+    finally:
+        profiler.stop()
+
+
+class Pipeline:
+    def __init__(self, cache: StageCache = None, builder=None):
+        """
+        Declared analysis stages, evaluated lazily and cached by content-addressed keys
+        --------------------------
+        Args:
+            cache (StageCache): On-disk cache (stages are always executed if None).
+            builder (callable): Module-level function returning this pipeline without a cache,
+                called once in every worker process of run(jobs > 1).
+        """
+        self.cache = cache
+        self.builder = builder
+        self.stages = dict()
+        self.events = dict() # stage name -> {'status', 'seconds', 'compute_seconds', 'started', 'finished', 'key'}
+        self._keys = dict()
+        self._values = dict()
+        self._created = time.perf_counter()
+
+    def source(self, name: str, loader, fingerprint):
+        """
+        Declare an input read from outside the pipeline. Its value is never cached
+        --------------------------
+        Args:
+            name (str): Stage name.
+            loader (callable): Returns the value (e.g. a memory-mapped matrix).
+            fingerprint (callable): Returns a hash of the content the loader reads.
+        """
+        self.stages[name] = {'source': True, 'loader': loader, 'fingerprint': fingerprint}
+
+    def stage(
+        self,
+        name: str,
+        fn,
+        inputs: tuple = (),
+        params: dict = None,
+        code: tuple = (),
+        outputs: tuple = (),
+        category: str = None
+    ):
+        """
+        Declare a stage computing fn(*input values, **params)
+        --------------------------
+        Args:
+            name (str): Stage name.
+            fn (callable): Function computing the stage result.
+            inputs (tuple): Names of the stages whose values are passed positionally to fn.
+            params (dict): JSON-serializable keyword arguments of fn.
+            code (tuple): Functions or modules the result depends on besides fn itself.
+            outputs (tuple): Files written by fn, restored from the cache on a hit.
+            category (str): Kind of work, for profiling ('threshold', 'build', 'metric', 'plot').
+        """
+        self.stages[name] = {'source': False, 'fn': fn, 'inputs': tuple(inputs), 'params': params or dict(),
+                             'code': tuple(code), 'outputs': tuple(outputs), 'category': category}
+
+    def key(self, name: str) -> str:
+        """Content-addressed key of a stage (its inputs' keys included)"""
+        if name not in self._keys:
+            stage = self.stages[name]
+            if stage['source']:
+                self._keys[name] = stage['fingerprint']()
+            else:
+                description = {
+                    'format': CACHE_FORMAT,
+                    'name': name,
+                    'params': stage['params'],
+                    'code': code_version(stage['fn'], *stage['code']),
+                    'inputs': [self.key(dep) for dep in stage['inputs']],
+                    'outputs': [str(path) for path in stage['outputs']]
+                }
+                encoded = json.dumps(description, sort_keys=True, default=repr).encode()
+                self._keys[name] = hashlib.sha256(encoded).hexdigest()
+        return self._keys[name]
+
+    def get(self, name: str):
+        """
+        Value of a stage: loaded from the cache on a hit, otherwise computed (after its inputs)
+        and stored
+        --------------------------
+        Args:
+            name (str): Stage name.
+        Returns:
+            object: Stage result
+        """
+        if name in self._values:
+            return self._values[name]
+        stage = self.stages[name]
+        start = time.perf_counter()
+        if stage['source']:
+            with profiling.stage(name, 'load'):
+                self._values[name] = stage['loader']()
+            return self._values[name]
+
+        key = self.key(name)
+        record = self.cache.load(key) if self.cache is not None else None
+        if record is not None:
+            with profiling.stage(name, 'cache'):
+                for path, content in record['files'].items():
+                    path = Path(path)
+                    if not path.exists() or path.read_bytes() != content:
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        path.write_bytes(content)
+            self._finish(name, record['value'], record['seconds'], start, hit=True)
+        else:
+            args = [self.get(dep) for dep in stage['inputs']]
+            start = time.perf_counter()
+            with profiling.stage(name, stage['category']):
+                value = stage['fn'](*args, **stage['params'])
+            self._finish(name, value, time.perf_counter() - start, start)
+        return self._values[name]
+
+    def _finish(self, name: str, value: object, compute_seconds: float, start: float, hit: bool = False):
+        key = self.key(name)
+        if not hit and self.cache is not None:
+            files = {str(path): Path(path).read_bytes() for path in self.stages[name]['outputs'] if Path(path).exists()}
+            self.cache.store(key, value, files, compute_seconds)
+        end = time.perf_counter()
+        self.events[name] = {
+            'status': 'hit' if hit else 'miss',
+            'seconds': end - start,
+            'compute_seconds': compute_seconds,
+            'started': start - self._created,
+            'finished': end - self._created,
+            'key': key
+        }
+        self._values[name] = value
+
+    def run(self, targets: list[str], jobs: int = 1):
+        """
+        Evaluate stages and everything they depend on, running independent stages that miss the
+        cache concurrently. Values are the same as from get(), which returns them afterwards
+        --------------------------
+        Args:
+            targets (list[str]): Stage names to evaluate.
+            jobs (int): Number of worker processes (1 evaluates in process, in order).
+        """
+        if jobs <= 1 or self.builder is None:
+            for name in targets:
+                self.get(name)
+            return
+
+        # stages that have to be computed, i.e. are not evaluated yet and miss the cache
+        pending = dict()
+        def plan(name):
+            stage = self.stages[name]
+            if name in self._values or name in pending or stage['source']:
+                return
+            if self.cache is not None and self.cache.contains(self.key(name)):
+                return
+            pending[name] = stage['inputs']
+            for dep in stage['inputs']:
+                plan(dep)
+        for name in targets:
+            plan(name)
+
+        profiler = profiling.get_profiler()
+        profile = {'trace_allocations': profiler.trace_allocations} if profiler.enabled else None
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(self.builder,)) as pool:
+            running = dict()
+            while pending or running:
+                busy = set(pending) | set(running.values())
+                for name in [name for name, inputs in pending.items() if not busy.intersection(inputs)]:
+                    args = [None if self.stages[dep]['source'] else self.get(dep) for dep in pending.pop(name)]
+                    running[pool.submit(_compute_in_worker, name, args, profile)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    value, compute_seconds, records = future.result()
+                    profiler.merge(records)
+                    # timed from the start in the worker, not from the submission
+                    self._finish(name, value, compute_seconds, time.perf_counter() - compute_seconds)
+        for name in targets: # cached targets
+            self.get(name)
+
+    def critical_path(self) -> tuple[list[str], float]:
+        """
+        Longest chain of dependent stages by evaluation time, the lower bound of a parallel run
+        --------------------------
+        Returns:
+            tuple: (stage names along the path, total seconds)
+        """
+        longest = dict()
+        def path_to(name):
+            if name not in longest:
+                best = ([], 0.0)
+                for dep in self.stages[name].get('inputs', ()):
+                    if dep in self.events:
+                        best = max(best, path_to(dep), key=lambda path: path[1])
+                longest[name] = (best[0] + [name], best[1] + self.events[name]['seconds'])
+            return longest[name]
+        paths = [path_to(name) for name in self.events]
+        return max(paths, key=lambda path: path[1], default=([], 0.0))
+
+    def compute_seconds(self, *names: str) -> float:
+        """Time the given stages took to compute, when they were computed (cached or not)"""
+        return sum(self.events[name]['compute_seconds'] for name in names if name in self.events)
+
+    def report(self) -> dict:
+        """
+        Cache hits and misses of the stages evaluated so far
+        --------------------------
+        Returns:
+            dict: 'hits', 'misses', 'stages' ({name: {'status', 'seconds', 'compute_seconds',
+                'started', 'finished', 'key'}}), 'critical_path' ({'stages', 'seconds'}), and the
+                cache 'directory' and 'size_bytes' (None without a cache)
+        """
+        statuses = [event['status'] for event in self.events.values()]
+        path, seconds = self.critical_path()
+        return {
+            'hits': statuses.count('hit'),
+            'misses': statuses.count('miss'),
+            'stages': self.events,
+            'critical_path': {'stages': path, 'seconds': seconds},
+            'directory': str(self.cache.directory) if self.cache is not None else None,
+            'size_bytes': self.cache.size() if self.cache is not None else None
+        }
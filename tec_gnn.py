@@ -0,0 +1,652 @@
+"""
+Graph attention autoencoder for the thresholded TEC network.
+
+The model is trained to score observed edges above randomly sampled non-edges, so memory and
+time per epoch scale with the number of edges instead of N^2 (the dense N x N reconstruction
+used previously does not fit comfortably in memory at 11,088 genes).
+
+At low thresholds even one full-batch pass over all edges becomes too large, so the model can
+also be trained on mini-batches: fixed-fanout 2-hop neighborhoods are sampled around batches of
+seed nodes on a background thread while the previous batch trains, which bounds the memory per
+step by the batch size and fanouts instead of the edge count. Embeddings of the whole graph are
+then computed layer by layer over blocks of target nodes with all of their neighbors.
+
+Both training loops can checkpoint and resume, and stop early once the loss plateaus.
+fit_embeddings and embedding_sweep put trained embeddings in an EmbeddingStore keyed by threshold
+and hyperparameters, and warm-start each new threshold from the nearest stored one.
+"""
+
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.stats import rankdata
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch_geometric.nn import GATConv
+
+import network_utils as ne
+from embedding_store import EmbeddingStore
+
+
+class TEC_GNN(nn.Module):
+    def __init__(self, input_dim, hidden_dim=64, num_heads=8, dropout=0.3):
+        super(TEC_GNN, self).__init__()
+        self.gat1 = GATConv(input_dim, hidden_dim, heads=num_heads, dropout=dropout)
+        self.gat2 = GATConv(hidden_dim * num_heads, hidden_dim, heads=1, dropout=dropout)
+        self.dropout = dropout
+
+    def forward(self, x, edge_index):
+        x = F.dropout(x, p=self.dropout, training=self.training)
+        x = F.elu(self.gat1(x, edge_index))
+        x = F.dropout(x, p=self.dropout, training=self.training)
+        embeddings = self.gat2(x, edge_index)
+        return embeddings
+
+    @staticmethod
+    def decode(embeddings, pairs):
+        """Edge logits (inner products) for the node pairs in a 2 x E index tensor"""
+        return (embeddings[pairs[0]] * embeddings[pairs[1]]).sum(dim=1)
+
+
+def prepare_graph(
+    np_tec_abs: np.ndarray,
+    threshold: float = 0.75,
+    block_size: int = 1024,
+    build_edge_index: bool = True
+) -> tuple:
+    """
+    Build the GNN inputs from an absolute correlation matrix without materializing a dense
+    adjacency matrix: node features are (degree, mean absolute correlation)
+    --------------------------
+    Args:
+        np_tec_abs (np.ndarray): Absolute correlation matrix (may be a np.memmap).
+        threshold (float): Edges are kept for correlations > threshold.
+        block_size (int): Number of matrix rows processed per block.
+        build_edge_index (bool): Build the full edge_index tensor (None otherwise; mini-batch
+            training only needs the sparse adjacency matrix).
+    Returns:
+        tuple: node features (N x 2 float32 tensor), edge_index (2 x 2E long tensor, both
+            directions) and the sparse adjacency matrix
+    """
+    adj = ne.threshold_sparse(np_tec_abs, threshold, weighted=False, inclusive=False, block_size=block_size)
+    n = adj.shape[0]
+    degrees = np.diff(adj.indptr).astype(np.float64)
+    mean_corr = np.empty(n, dtype=np.float64)
+    for start in range(0, n, block_size):
+        mean_corr[start:start + block_size] = np.mean(np_tec_abs[start:start + block_size], axis=1, dtype=np.float64)
+    edge_index = None
+    if build_edge_index:
+        coo = adj.tocoo()
+        edge_index = torch.tensor(np.vstack([coo.row, coo.col]), dtype=torch.long)
+    x = torch.tensor(np.column_stack([degrees, mean_corr]), dtype=torch.float32)
+    return x, edge_index, adj
+
+
+def positive_pairs(edge_index: torch.Tensor) -> torch.Tensor:
+    """Keep one direction (source < target) of every undirected edge"""
+    return edge_index[:, edge_index[0] < edge_index[1]]
+
+
+def sample_negative_pairs(
+    pos_pairs: torch.Tensor,
+    num_nodes: int,
+    num_samples: int,
+    generator: torch.Generator = None
+) -> torch.Tensor:
+    """
+    Sample node pairs uniformly at random, dropping self loops and observed edges
+    --------------------------
+    Args:
+        pos_pairs (torch.Tensor): 2 x E observed edges (source < target).
+        num_nodes (int): Number of nodes in the graph.
+        num_samples (int): Number of pairs to draw before filtering.
+        generator (torch.Generator): CPU random generator for reproducible sampling.
+    Returns:
+        torch.Tensor: 2 x M negative pairs (source < target), M <= num_samples
+    """
+    pairs = torch.randint(0, num_nodes, (2, num_samples), generator=generator).to(pos_pairs.device)
+    pairs = torch.sort(pairs, dim=0).values
+    pairs = pairs[:, pairs[0] != pairs[1]]
+    keys = pairs[0] * num_nodes + pairs[1]
+    pos_keys = pos_pairs[0] * num_nodes + pos_pairs[1]
+    return pairs[:, ~torch.isin(keys, pos_keys)]
+
+
+def link_loss(embeddings: torch.Tensor, pos_pairs: torch.Tensor, neg_pairs: torch.Tensor) -> torch.Tensor:
+    """
+    Binary cross entropy of observed edges (label 1) against sampled non-edges (label 0)
+    --------------------------
+    Args:
+        embeddings (torch.Tensor): N x D node embeddings.
+        pos_pairs (torch.Tensor): 2 x E observed edges.
+        neg_pairs (torch.Tensor): 2 x M sampled non-edges.
+    Returns:
+        torch.Tensor: Scalar loss
+    """
+    logits = torch.cat([TEC_GNN.decode(embeddings, pos_pairs), TEC_GNN.decode(embeddings, neg_pairs)])
+    labels = torch.cat([torch.ones(pos_pairs.size(1)), torch.zeros(neg_pairs.size(1))]).to(logits.device)
+    return F.binary_cross_entropy_with_logits(logits, labels)
+
+
+def peak_memory_mb(device: torch.device) -> float:
+    """Peak memory of the training process: allocated CUDA memory or the process peak RSS"""
+    if device.type == 'cuda':
+        return torch.cuda.max_memory_allocated(device) / 1024 ** 2
+    try:
+        import resource
+        scale = 1024 ** 2 if sys.platform == 'darwin' else 1024 # ru_maxrss is bytes on macOS, KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 ** 2
+
+
+def _save_checkpoint(path: str | os.PathLike, model: TEC_GNN, optimizer: torch.optim.Optimizer, **state):
+    """Atomically save model, optimizer and torch RNG states plus the training history"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    torch.save({'model': model.state_dict(), 'optimizer': optimizer.state_dict(),
+                'torch_rng': torch.get_rng_state(), **state}, tmp)
+    os.replace(tmp, path)
+
+
+def _load_checkpoint(path: str | os.PathLike, model: TEC_GNN, optimizer: torch.optim.Optimizer) -> dict:
+    """Restore a checkpoint into model and optimizer, None if there is none"""
+    if path is None or not Path(path).exists():
+        return None
+    state = torch.load(path, map_location=next(model.parameters()).device, weights_only=False)
+    model.load_state_dict(state.pop('model'))
+    optimizer.load_state_dict(state.pop('optimizer'))
+    torch.set_rng_state(state.pop('torch_rng'))
+    print(f"Resuming from {path} after epoch {len(state['losses']) - 1}")
+    return state
+
+
+def plateaued(losses: list[float], patience: int, min_delta: float = 1e-3) -> bool:
+    """True if the best loss of the last patience epochs is not min_delta (relative) below the earlier best"""
+    if patience is None or len(losses) <= patience:
+        return False
+    return min(losses[-patience:]) > min(losses[:-patience]) * (1 - min_delta)
+
+
+def train_gnn(
+    model: TEC_GNN,
+    x: torch.Tensor,
+    edge_index: torch.Tensor,
+    epochs: int = 200,
+    lr: float = 0.001,
+    neg_ratio: float = 1.0,
+    seed: int = 42,
+    log_every: int = 50,
+    patience: int = None,
+    min_delta: float = 1e-3,
+    checkpoint_path: str | os.PathLike = None,
+    checkpoint_every: int = 10
+) -> dict:
+    """
+    Train the model on positive edges plus freshly sampled negatives every epoch
+    --------------------------
+    Args:
+        model (TEC_GNN): Model already moved to the target device.
+        x (torch.Tensor): Node features on the target device.
+        edge_index (torch.Tensor): 2 x 2E message-passing edges on the target device.
+        epochs (int): Number of training epochs.
+        lr (float): Adam learning rate.
+        neg_ratio (float): Number of negative pairs sampled per positive edge.
+        seed (int): Seed for the negative sampler.
+        log_every (int): Print progress every log_every epochs.
+        patience (int): Stop early once the loss has not improved for this many epochs (never if None).
+        min_delta (float): Relative loss decrease that counts as an improvement.
+        checkpoint_path (str | os.PathLike): File the training state is saved to every
+            checkpoint_every epochs and resumed from if it exists (no checkpointing if None).
+        checkpoint_every (int): Number of epochs between checkpoints.
+    Returns:
+        dict: 'losses', 'epoch_times' (seconds), 'training_time' (seconds), 'epochs_trained',
+            'stopped_early' and 'peak_memory_mb' of the run
+    """
+    device = x.device
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    pos_pairs = positive_pairs(edge_index)
+    num_neg = max(1, int(pos_pairs.size(1) * neg_ratio))
+    generator = torch.Generator().manual_seed(seed)
+    if device.type == 'cuda':
+        torch.cuda.reset_peak_memory_stats(device)
+
+    losses, epoch_times = [], []
+    previous_time, stopped_early = 0.0, False
+    state = _load_checkpoint(checkpoint_path, model, optimizer)
+    if state is not None:
+        losses, epoch_times, previous_time = state['losses'], state['epoch_times'], state['training_time']
+        stopped_early = state['stopped_early']
+        generator.set_state(state['generator'])
+
+    model.train()
+    start_time = time.time()
+    for epoch in range(len(losses), len(losses) if stopped_early else epochs):
+        epoch_start = time.time()
+        optimizer.zero_grad()
+        embeddings = model(x, edge_index)
+        neg_pairs = sample_negative_pairs(pos_pairs, x.size(0), num_neg, generator)
+        loss = link_loss(embeddings, pos_pairs, neg_pairs)
+        loss.backward()
+        optimizer.step()
+        losses.append(loss.item())
+        epoch_times.append(time.time() - epoch_start)
+
+        if epoch % log_every == 0:
+            print(f"Epoch {epoch}: Loss = {loss.item():.6f} ({epoch_times[-1]:.3f}s, peak {peak_memory_mb(device):.0f} MB)")
+        stopped_early = plateaued(losses, patience, min_delta)
+        if checkpoint_path is not None and ((epoch + 1) % checkpoint_every == 0 or stopped_early or epoch + 1 == epochs):
+            _save_checkpoint(checkpoint_path, model, optimizer, losses=losses, epoch_times=epoch_times,
+                             training_time=previous_time + time.time() - start_time, stopped_early=stopped_early,
+                             generator=generator.get_state())
+        if stopped_early:
+            print(f"Loss plateaued, stopping after epoch {epoch}")
+            break
+
+    return {
+        'losses': losses,
+        'epoch_times': epoch_times,
+        'training_time': previous_time + time.time() - start_time,
+        'epochs_trained': len(losses),
+        'stopped_early': stopped_early,
+        'peak_memory_mb': peak_memory_mb(device)
+    }
+
+
+def compute_embeddings(model: TEC_GNN, x: torch.Tensor, edge_index: torch.Tensor) -> torch.Tensor:
+    """Embeddings of all nodes in evaluation mode"""
+    model.eval()
+    with torch.no_grad():
+        return model(x, edge_index)
+
+
+def sample_neighbors(adj: sp.csr_matrix, nodes: np.ndarray, fanout: int, rng: np.random.Generator) -> tuple:
+    """
+    Sample up to fanout neighbors of every node: nodes with at most fanout neighbors keep all of
+    them, the others draw fanout neighbors with replacement (duplicates are dropped)
+    --------------------------
+    Args:
+        adj (sp.csr_matrix): Symmetric sparse adjacency matrix.
+        nodes (np.ndarray): Nodes whose neighbors are sampled.
+        fanout (int): Maximum number of neighbors per node.
+        rng (np.random.Generator): Random generator of the batch.
+    Returns:
+        tuple: source (neighbor) and target (node) arrays of the sampled edges
+    """
+    indptr, indices = adj.indptr, adj.indices
+    degrees = indptr[nodes + 1] - indptr[nodes]
+    small = degrees <= fanout
+
+    counts = degrees[small]
+    targets_small = np.repeat(nodes[small], counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    sources_small = indices[np.repeat(indptr[nodes[small]], counts) + offsets]
+
+    large = nodes[~small]
+    draws = (rng.random((len(large), fanout)) * degrees[~small][:, None]).astype(np.int64)
+    sources_large = indices[indptr[large][:, None] + draws].ravel()
+    targets_large = np.repeat(large, fanout)
+    keys = np.unique(targets_large.astype(np.int64) * adj.shape[0] + sources_large)
+
+    sources = np.concatenate([sources_small, keys % adj.shape[0]])
+    targets = np.concatenate([targets_small, keys // adj.shape[0]])
+    return sources, targets
+
+
+def sample_subgraph(adj: sp.csr_matrix, seeds: np.ndarray, fanouts: tuple, rng: np.random.Generator) -> tuple:
+    """
+    Sample a fixed-fanout multi-hop neighborhood around the seed nodes: hop h samples up to
+    fanouts[h] neighbors of the nodes first reached at hop h - 1
+    --------------------------
+    Args:
+        adj (sp.csr_matrix): Symmetric sparse adjacency matrix.
+        seeds (np.ndarray): Seed nodes.
+        fanouts (tuple): Number of neighbors sampled per node at every hop (one entry per layer).
+        rng (np.random.Generator): Random generator of the batch.
+    Returns:
+        tuple: n_id (sorted global ids of the subgraph nodes) and the local 2 x E edge_index
+            (messages flow from row 0 to row 1)
+    """
+    frontier = np.unique(seeds)
+    visited = frontier
+    sources, targets = [], []
+    for fanout in fanouts:
+        src, dst = sample_neighbors(adj, frontier, fanout, rng)
+        sources.append(src)
+        targets.append(dst)
+        frontier = np.setdiff1d(src, visited)
+        visited = np.union1d(visited, frontier)
+    n_id = visited
+    edge_index = np.vstack([np.searchsorted(n_id, np.concatenate(sources)), np.searchsorted(n_id, np.concatenate(targets))])
+    return n_id, edge_index
+
+
+def sample_batch(
+    adj: sp.csr_matrix,
+    seeds: np.ndarray,
+    fanouts: tuple,
+    neg_ratio: float,
+    seed_sequence: np.random.SeedSequence
+) -> dict:
+    """
+    One training batch: an observed edge and neg_ratio sampled non-edges per seed node, and the
+    sampled neighborhood of every node they touch
+    --------------------------
+    Args:
+        adj (sp.csr_matrix): Symmetric sparse adjacency matrix with sorted indices.
+        seeds (np.ndarray): Seed nodes of the batch.
+        fanouts (tuple): Number of neighbors sampled per node at every hop.
+        neg_ratio (float): Number of negative pairs sampled per positive pair.
+        seed_sequence (np.random.SeedSequence): Seed of the batch (batches are reproducible
+            whatever order the background worker prepares them in).
+    Returns:
+        dict: 'n_id', 'edge_index', 'pos_pairs' and 'neg_pairs' (local ids) as long tensors
+            and 'num_seeds'
+    """
+    rng = np.random.default_rng(seed_sequence)
+    n = adj.shape[0]
+    indptr, indices = adj.indptr, adj.indices
+    degrees = indptr[seeds + 1] - indptr[seeds]
+    sources = seeds[degrees > 0]
+    draws = (rng.random(len(sources)) * degrees[degrees > 0]).astype(np.int64)
+    pos = np.vstack([sources, indices[indptr[sources] + draws]])
+
+    num_neg = max(1, int(pos.shape[1] * neg_ratio))
+    neg = np.vstack([rng.choice(seeds, num_neg), rng.integers(0, n, num_neg)])
+    neg = neg[:, neg[0] != neg[1]]
+    neg = neg[:, np.asarray(adj[neg[0], neg[1]]).ravel() == 0]
+
+    n_id, edge_index = sample_subgraph(adj, np.concatenate([seeds, pos[1], neg[1]]), fanouts, rng)
+    return {
+        'n_id': torch.from_numpy(n_id.astype(np.int64)),
+        'edge_index': torch.from_numpy(edge_index.astype(np.int64)),
+        'pos_pairs': torch.from_numpy(np.searchsorted(n_id, pos).astype(np.int64)),
+        'neg_pairs': torch.from_numpy(np.searchsorted(n_id, neg).astype(np.int64)),
+        'num_seeds': len(seeds)
+    }
+
+
+def train_gnn_sampled(
+    model: TEC_GNN,
+    x: torch.Tensor,
+    adj: sp.csr_matrix,
+    epochs: int = 20,
+    lr: float = 0.001,
+    batch_size: int = 256,
+    fanouts: tuple = (10, 10),
+    neg_ratio: float = 1.0,
+    prefetch: int = 2,
+    seed: int = 42,
+    log_every: int = 5,
+    patience: int = None,
+    min_delta: float = 1e-3,
+    checkpoint_path: str | os.PathLike = None,
+    checkpoint_every: int = 1
+) -> dict:
+    """
+    Train the model on neighbor-sampled mini-batches: every epoch visits all nodes once as seeds,
+    in batches of batch_size, while a background thread samples the next batches
+    --------------------------
+    Args:
+        model (TEC_GNN): Model already moved to the target device.
+        x (torch.Tensor): Node features on the target device.
+        adj (sp.csr_matrix): Symmetric sparse adjacency matrix (from prepare_graph).
+        epochs (int): Number of training epochs.
+        lr (float): Adam learning rate.
+        batch_size (int): Number of seed nodes per batch.
+        fanouts (tuple): Number of neighbors sampled per node at every hop (one entry per GAT layer).
+        neg_ratio (float): Number of negative pairs sampled per positive pair.
+        prefetch (int): Number of batches prepared ahead of the training step.
+        seed (int): Seed for the node order and the samplers.
+        log_every (int): Print progress every log_every epochs.
+        patience (int): Stop early once the epoch loss has not improved for this many epochs (never if None).
+        min_delta (float): Relative loss decrease that counts as an improvement.
+        checkpoint_path (str | os.PathLike): File the training state is saved to every
+            checkpoint_every epochs and resumed from if it exists (no checkpointing if None).
+        checkpoint_every (int): Number of epochs between checkpoints.
+    Returns:
+        dict: 'losses' (mean batch loss per epoch), 'epoch_times' (seconds), 'training_time'
+            (seconds), 'epochs_trained', 'stopped_early', 'nodes_per_second' (seed nodes trained
+            per second), 'max_batch_nodes', 'max_batch_edges' and 'peak_memory_mb' of the run
+    """
+    device = x.device
+    n = adj.shape[0]
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    if device.type == 'cuda':
+        torch.cuda.reset_peak_memory_stats(device)
+
+    losses, epoch_times = [], []
+    previous_time, stopped_early = 0.0, False
+    state = _load_checkpoint(checkpoint_path, model, optimizer)
+    if state is not None:
+        losses, epoch_times, previous_time = state['losses'], state['epoch_times'], state['training_time']
+        stopped_early = state['stopped_early']
+    first_epoch = len(losses)
+
+    def batches():
+        for epoch in range(first_epoch, first_epoch if stopped_early else epochs):
+            order = np.random.default_rng([seed, epoch]).permutation(n)
+            for b, start in enumerate(range(0, n, batch_size)):
+                yield epoch, order[start:start + batch_size], np.random.SeedSequence([seed, epoch, b])
+
+    model.train()
+    epoch_losses = []
+    max_nodes = max_edges = 0
+    start_time = epoch_start = time.time()
+    jobs = batches()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = deque()
+
+        def submit(count):
+            for batch_epoch, seeds, seed_sequence in islice(jobs, count):
+                pending.append((batch_epoch, pool.submit(sample_batch, adj, seeds, fanouts, neg_ratio, seed_sequence)))
+
+        submit(prefetch + 1)
+        while pending:
+            epoch, future = pending.popleft()
+            submit(1) # keep the worker busy while this batch trains
+            batch = future.result()
+            max_nodes = max(max_nodes, len(batch['n_id']))
+            max_edges = max(max_edges, batch['edge_index'].size(1))
+
+            optimizer.zero_grad()
+            embeddings = model(x[batch['n_id'].to(device)], batch['edge_index'].to(device))
+            loss = link_loss(embeddings, batch['pos_pairs'].to(device), batch['neg_pairs'].to(device))
+            loss.backward()
+            optimizer.step()
+            epoch_losses.append(loss.item())
+
+            if not pending or pending[0][0] != epoch: # last batch of the epoch
+                losses.append(float(np.mean(epoch_losses)))
+                epoch_times.append(time.time() - epoch_start)
+                epoch_losses = []
+                epoch_start = time.time()
+                if epoch % log_every == 0:
+                    print(f"Epoch {epoch}: Loss = {losses[-1]:.6f} ({epoch_times[-1]:.3f}s, {n / epoch_times[-1]:.0f} nodes/s, peak {peak_memory_mb(device):.0f} MB)")
+                stopped_early = plateaued(losses, patience, min_delta)
+                if checkpoint_path is not None and ((epoch + 1) % checkpoint_every == 0 or stopped_early or epoch + 1 == epochs):
+                    _save_checkpoint(checkpoint_path, model, optimizer, losses=losses, epoch_times=epoch_times,
+                                     training_time=previous_time + time.time() - start_time, stopped_early=stopped_early)
+                if stopped_early:
+                    print(f"Loss plateaued, stopping after epoch {epoch}")
+                    for _, future in pending:
+                        future.cancel()
+                    break
+
+    training_time = time.time() - start_time
+    return {
+        'losses': losses,
+        'epoch_times': epoch_times,
+        'training_time': previous_time + training_time,
+        'epochs_trained': len(losses),
+        'stopped_early': stopped_early,
+        'nodes_per_second': n * (len(losses) - first_epoch) / max(training_time, 1e-9),
+        'max_batch_nodes': max_nodes,
+        'max_batch_edges': max_edges,
+        'peak_memory_mb': peak_memory_mb(device)
+    }
+
+
+def compute_embeddings_layerwise(
+    model: TEC_GNN,
+    x: torch.Tensor,
+    adj: sp.csr_matrix,
+    max_edges: int = 100000
+) -> torch.Tensor:
+    """
+    Embeddings of all nodes in evaluation mode, computed one GAT layer at a time over blocks of
+    target nodes with all of their neighbors (same result as compute_embeddings, without a
+    full-graph pass)
+    --------------------------
+    Args:
+        model (TEC_GNN): Trained model.
+        x (torch.Tensor): Node features on the target device.
+        adj (sp.csr_matrix): Symmetric sparse adjacency matrix.
+        max_edges (int): Approximate number of edges per block (bounds the memory per block).
+    Returns:
+        torch.Tensor: N x D embeddings
+    """
+    n = adj.shape[0]
+    cumulative = adj.indptr[1:].astype(np.int64) + np.arange(1, n + 1) # edges plus self loops
+    bounds = np.unique(np.concatenate([[0], np.searchsorted(cumulative, np.arange(max_edges, cumulative[-1], max_edges)), [n]]))
+
+    model.eval()
+    h = x
+    with torch.no_grad():
+        for layer, activation in ((model.gat1, F.elu), (model.gat2, None)):
+            blocks = []
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                rows = adj[start:stop].tocoo()
+                n_id = np.union1d(np.arange(start, stop), rows.col)
+                edge_index = np.vstack([np.searchsorted(n_id, rows.col), np.searchsorted(n_id, rows.row + start)])
+                out = layer(h[torch.from_numpy(n_id).to(x.device)], torch.from_numpy(edge_index.astype(np.int64)).to(x.device))
+                blocks.append(out[torch.from_numpy(np.searchsorted(n_id, np.arange(start, stop))).to(x.device)])
+            h = torch.cat(blocks)
+            if activation is not None:
+                h = activation(h)
+    return h
+
+
+def edge_auc(embeddings: torch.Tensor, pos_pairs: torch.Tensor, neg_pairs: torch.Tensor) -> float:
+    """ROC AUC of the decoder scores of observed edges against non-edges (Mann-Whitney U statistic)"""
+    pos = TEC_GNN.decode(embeddings, pos_pairs).cpu().numpy()
+    neg = TEC_GNN.decode(embeddings, neg_pairs).cpu().numpy()
+    ranks = rankdata(np.concatenate([pos, neg]))
+    return float((ranks[:len(pos)].sum() - len(pos) * (len(pos) + 1) / 2) / (len(pos) * len(neg)))
+
+
+DEFAULT_PARAMS = {
+    'hidden_dim': 64,
+    'num_heads': 8,
+    'dropout': 0.3,
+    'epochs': 200,
+    'lr': 0.001,
+    'neg_ratio': 1.0,
+    'seed': 42,
+    'patience': 20,
+    'min_delta': 1e-3,
+    'minibatch': False,
+    'batch_size': 256,
+    'fanouts': [10, 10],
+    'warm_start': True
+}
+
+
+def fit_embeddings(
+    np_tec_abs: np.ndarray,
+    threshold: float,
+    store: EmbeddingStore,
+    params: dict = None,
+    data_hash: str = None,
+    device: torch.device = None,
+    log_every: int = 50
+) -> dict:
+    """
+    Embeddings of the network at one threshold, loaded from the store or trained (resuming an
+    interrupted run from its checkpoint, warm-starting from the weights of the nearest stored
+    threshold, and stopping early when the loss plateaus) and then stored
+    --------------------------
+    Args:
+        np_tec_abs (np.ndarray): Absolute correlation matrix (may be a np.memmap).
+        threshold (float): Edges are kept for correlations > threshold.
+        store (EmbeddingStore): Store the embeddings are loaded from and saved to.
+        params (dict): Hyperparameters overriding DEFAULT_PARAMS.
+        data_hash (str): Content hash of the matrix (e.g. matrix_store.data_hash('TEC')), part
+            of the store key so embeddings of other data are never reused.
+        device (torch.device): Training device (default: CUDA if available).
+        log_every (int): Print progress every log_every epochs.
+    Returns:
+        dict: 'embeddings' (N x D float32), 'history', 'warm_start_from' (threshold or None),
+            'params' (the store key hyperparameters) and 'cached' (True if loaded without training)
+    """
+    params = {**DEFAULT_PARAMS, **(params or dict()), 'data': data_hash}
+    entry = store.load(threshold, params)
+    if entry is not None:
+        return {'embeddings': entry['embeddings'], 'history': entry['history'],
+                'warm_start_from': entry['warm_start_from'], 'params': params, 'cached': True}
+
+    device = device or torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    x, edge_index, adj = prepare_graph(np_tec_abs, threshold, build_edge_index=not params['minibatch'])
+    x = x.to(device)
+    torch.manual_seed(params['seed'])
+    model = TEC_GNN(x.size(1), params['hidden_dim'], params['num_heads'], params['dropout']).to(device)
+    checkpoint_path = store.checkpoint_path(threshold, params)
+    warm_start_from = store.nearest(threshold, params) if params['warm_start'] else None
+    if warm_start_from is not None and not checkpoint_path.exists():
+        print(f"Warm-starting threshold {threshold} from threshold {warm_start_from}")
+        model.load_state_dict(store.load_state_dict(warm_start_from, params))
+
+    training = {key: params[key] for key in ('epochs', 'lr', 'neg_ratio', 'seed', 'patience', 'min_delta')}
+    if params['minibatch']:
+        history = train_gnn_sampled(model, x, adj, batch_size=params['batch_size'], fanouts=tuple(params['fanouts']),
+                                    checkpoint_path=checkpoint_path, log_every=log_every, **training)
+        embeddings = compute_embeddings_layerwise(model, x, adj)
+    else:
+        edge_index = edge_index.to(device)
+        history = train_gnn(model, x, edge_index, checkpoint_path=checkpoint_path, log_every=log_every, **training)
+        embeddings = compute_embeddings(model, x, edge_index)
+    embeddings = embeddings.cpu().numpy()
+    store.save(threshold, params, embeddings, model.state_dict(), history, warm_start_from)
+    return {'embeddings': embeddings, 'history': history, 'warm_start_from': warm_start_from, 'params': params,
+            'cached': False}
+
+
+def embedding_sweep(
+    np_tec_abs: np.ndarray,
+    thresholds: list[float],
+    store: EmbeddingStore,
+    params: dict = None,
+    data_hash: str = None,
+    device: torch.device = None,
+    log_every: int = 50
+) -> dict:
+    """
+    Embeddings for several thresholds, trained from the highest (sparsest, cheapest) threshold
+    down so every model is warm-started from its finished neighbor
+    --------------------------
+    Args:
+        np_tec_abs (np.ndarray): Absolute correlation matrix (may be a np.memmap).
+        thresholds (list[float]): Network thresholds.
+        store (EmbeddingStore): Store the embeddings are loaded from and saved to.
+        params (dict): Hyperparameters overriding DEFAULT_PARAMS.
+        data_hash (str): Content hash of the matrix, part of the store key.
+        device (torch.device): Training device (default: CUDA if available).
+        log_every (int): Print progress every log_every epochs.
+    Returns:
+        dict: {threshold: fit_embeddings result}
+    """
+    results = dict()
+    for threshold in sorted(thresholds, reverse=True):
+        print(f"Threshold {threshold}")
+        results[threshold] = fit_embeddings(np_tec_abs, threshold, store, params, data_hash, device, log_every)
+    return results
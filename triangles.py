@@ -0,0 +1,129 @@
+"""
+Triangle counts and clustering coefficients of thresholded networks from sparse matrix products.
+
+For a binary symmetric adjacency A the number of triangles through node i is half the row sum of
+(A @ A) * A. The product is evaluated one block of rows at a time across a thread pool (SciPy
+releases the GIL inside sparse products), so no N x N intermediate is formed. Results are the
+same integers and floating-point divisions NetworkX uses, so they match nx.triangles,
+nx.clustering, nx.average_clustering and nx.transitivity exactly on unweighted graphs.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def binary_adjacency(adj: sp.spmatrix) -> sp.csr_matrix:
+    """
+    Unweighted copy of a sparse adjacency matrix without self-loops or explicit zeros
+    --------------------------
+    Args:
+        adj (sp.spmatrix): Symmetric sparse adjacency matrix (e.g. from threshold_sparse).
+    Returns:
+        sp.csr_matrix: int32 matrix of ones with sorted indices
+    """
+    coo = sp.coo_matrix(adj)
+    keep = (coo.row != coo.col) & (coo.data != 0)
+    n = coo.shape[0]
+    binary = sp.csr_matrix((np.ones(np.count_nonzero(keep), dtype=np.int32), (coo.row[keep], coo.col[keep])), shape=(n, n))
+    binary.sum_duplicates()
+    binary.data[:] = 1
+    return binary
+
+
+def _block_triangles(a: sp.csr_matrix, start: int, stop: int) -> np.ndarray:
+    rows = a[start:stop]
+    closed = (rows @ a).multiply(rows) # closed two-paths i - k - j with an edge i - j
+    return np.asarray(closed.sum(axis=1)).ravel() // 2
+
+
+def triangle_counts(adj: sp.spmatrix, block_size: int = 1024, n_jobs: int = None) -> np.ndarray:
+    """
+    Number of triangles through every node (nx.triangles)
+    --------------------------
+    Args:
+        adj (sp.spmatrix): Symmetric sparse adjacency matrix.
+        block_size (int): Number of rows multiplied per block.
+        n_jobs (int): Number of worker threads (default: all CPUs).
+    Returns:
+        np.ndarray: int64 triangle count per node
+    """
+    a = binary_adjacency(adj)
+    n = a.shape[0]
+    starts = range(0, n, block_size)
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        blocks = pool.map(lambda start: _block_triangles(a, start, min(start + block_size, n)), starts)
+        return np.concatenate([np.zeros(0, dtype=np.int64), *blocks]).astype(np.int64)
+
+
+def local_clustering(
+    adj: sp.spmatrix,
+    triangles: np.ndarray = None,
+    block_size: int = 1024,
+    n_jobs: int = None
+) -> np.ndarray:
+    """
+    Local clustering coefficient of every node (nx.clustering on the unweighted graph)
+    --------------------------
+    Args:
+        adj (sp.spmatrix): Symmetric sparse adjacency matrix.
+        triangles (np.ndarray): Precomputed triangle_counts(adj), computed if None.
+        block_size (int): Number of rows multiplied per block.
+        n_jobs (int): Number of worker threads (default: all CPUs).
+    Returns:
+        np.ndarray: float64 clustering coefficient per node (0 for degree < 2)
+    """
+    if triangles is None:
+        triangles = triangle_counts(adj, block_size, n_jobs)
+    degrees = np.diff(binary_adjacency(adj).indptr).astype(np.int64)
+    pairs = degrees * (degrees - 1)
+    # same division as NetworkX: (2 x triangles) / (d x (d - 1))
+    return np.divide(2 * triangles, pairs, out=np.zeros(len(degrees)), where=triangles > 0)
+
+
+def average_clustering(
+    adj: sp.spmatrix,
+    connected_only: bool = False,
+    count_zeros: bool = True,
+    block_size: int = 1024,
+    n_jobs: int = None
+) -> float:
+    """
+    Average local clustering coefficient (nx.average_clustering)
+    --------------------------
+    Args:
+        adj (sp.spmatrix): Symmetric sparse adjacency matrix.
+        connected_only (bool): Average over nodes with at least one edge only, like a graph built
+            by construct_network; otherwise over all N nodes, like nx.from_numpy_array.
+        count_zeros (bool): Include nodes with zero clustering in the average.
+        block_size (int): Number of rows multiplied per block.
+        n_jobs (int): Number of worker threads (default: all CPUs).
+    Returns:
+        float: Average clustering coefficient
+    """
+    clustering = local_clustering(adj, block_size=block_size, n_jobs=n_jobs)
+    if connected_only:
+        clustering = clustering[np.diff(binary_adjacency(adj).indptr) > 0]
+    if not count_zeros:
+        clustering = clustering[clustering > 0]
+    # summed sequentially in node order, as NetworkX does, so the result is bit-identical
+    return sum(clustering.tolist()) / len(clustering)
+
+
+def transitivity(adj: sp.spmatrix, block_size: int = 1024, n_jobs: int = None) -> float:
+    """
+    Global clustering coefficient: 3 x triangles / connected triples (nx.transitivity)
+    --------------------------
+    Args:
+        adj (sp.spmatrix): Symmetric sparse adjacency matrix.
+        block_size (int): Number of rows multiplied per block.
+        n_jobs (int): Number of worker threads (default: all CPUs).
+    Returns:
+        float: Transitivity of the graph
+    """
+    triangles = int(triangle_counts(adj, block_size, n_jobs).sum()) * 2
+    degrees = np.diff(binary_adjacency(adj).indptr).astype(np.int64)
+    triples = int((degrees * (degrees - 1)).sum())
+    return 0 if triangles == 0 else triangles / triples